@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import time
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.http import Request
+from scrapy.utils.job import job_dir
+from scrapy.utils.request import fingerprint
+from w3lib.url import canonicalize_url
+
+from onet_scraper.utils.bloom import AgingBloomFilter
+from onet_scraper.utils.canonical import UrlCanonicalizer
+
+logger = logging.getLogger(__name__)
+
+
+class CanonicalRequestFingerprinter:
+    """
+    Fingerprints requests by their UrlCanonicalizer dedupe key.
+
+    Variants of one URL and one article linked from different sections get the
+    same fingerprint, so the dupefilter lets only the first of them through.
+    Requests other than body-less GETs keep Scrapy's default fingerprint.
+    """
+
+    def __init__(self, canonicalizer: UrlCanonicalizer):
+        self.canonicalizer = canonicalizer
+        # Fixed per request: a redirect learned later must not change a queued request's fingerprint
+        self._cache: WeakKeyDictionary[Request, bytes] = WeakKeyDictionary()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(UrlCanonicalizer.from_crawler(crawler))
+
+    def fingerprint(self, request: Request) -> bytes:
+        if request.method != "GET" or request.body:
+            return fingerprint(request)
+        cached = self._cache.get(request)
+        if cached is None:
+            cached = self._cache[request] = hashlib.sha1(self.canonicalizer.dedupe_key(request.url).encode("utf-8")).digest()
+        return cached
+
+
+class BloomDupeFilter(RFPDupeFilter):
+    """
+    Duplicate filter for long-running crawls with a bounded memory footprint.
+
+    Request fingerprints go into an AgingBloomFilter instead of an ever-growing set:
+    memory depends on the request rate within DUPEFILTER_BLOOM_MAX_AGE, not on how
+    long the crawler has been running, at the price of DUPEFILTER_BLOOM_ERROR_RATE
+    false positives. With a snapshot path (DUPEFILTER_BLOOM_SNAPSHOT, or
+    JOBDIR/requests.bloom) the filter is written to disk every
+    DUPEFILTER_BLOOM_SNAPSHOT_INTERVAL seconds and on close, and restored on start.
+
+    With CanonicalRequestFingerprinter, the URL each request was linked as is
+    remembered too, and duplicates under a URL Scrapy's own fingerprint has not
+    seen count as fetches avoided (dupefilter/canonical/avoided). Those keys only
+    feed the stat, so they live in a separate, coarser filter (`variants`,
+    DUPEFILTER_BLOOM_VARIANT_ERROR_RATE) that never fills the deduplicating one.
+    """
+
+    def __init__(
+        self,
+        bloom: AgingBloomFilter,
+        snapshot_path: str | None = None,
+        snapshot_interval: float = 300.0,
+        debug: bool = False,
+        *,
+        fingerprinter: Any = None,
+        stats: Any = None,
+        variant_error_rate: float = 1e-3,
+    ) -> None:
+        super().__init__(None, debug, fingerprinter=fingerprinter)
+        self.bloom = bloom
+        self.variants: AgingBloomFilter | None = None
+        if isinstance(self.fingerprinter, CanonicalRequestFingerprinter):
+            self.variants = AgingBloomFilter(
+                capacity=bloom.capacity, error_rate=variant_error_rate, max_age=bloom.max_age, slices=bloom.max_slices
+            )
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.stats = stats
+        self._last_snapshot = time.monotonic()
+        if snapshot_path:
+            self.load()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        snapshot_path = settings.get("DUPEFILTER_BLOOM_SNAPSHOT") or None
+        jobdir = job_dir(settings)
+        if snapshot_path is None and jobdir:
+            snapshot_path = os.path.join(jobdir, "requests.bloom")
+        return cls(
+            AgingBloomFilter(
+                capacity=settings.getint("DUPEFILTER_BLOOM_CAPACITY", 100_000),
+                error_rate=settings.getfloat("DUPEFILTER_BLOOM_ERROR_RATE", 1e-6),
+                max_age=settings.getfloat("DUPEFILTER_BLOOM_MAX_AGE", 0.0),
+                slices=settings.getint("DUPEFILTER_BLOOM_SLICES", 4),
+            ),
+            snapshot_path=snapshot_path,
+            snapshot_interval=settings.getfloat("DUPEFILTER_BLOOM_SNAPSHOT_INTERVAL", 300.0),
+            debug=settings.getbool("DUPEFILTER_DEBUG"),
+            fingerprinter=crawler.request_fingerprinter,
+            stats=crawler.stats,
+            variant_error_rate=settings.getfloat("DUPEFILTER_BLOOM_VARIANT_ERROR_RATE", 1e-3),
+        )
+
+    def request_seen(self, request: Request) -> bool:
+        new_variant = self._add_variant(request)
+        if not self.bloom.add(self.fingerprinter.fingerprint(request)):
+            if new_variant and self.stats is not None:
+                self.stats.inc_value("dupefilter/canonical/avoided")
+            return True
+        if self.snapshot_path and time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+            self.save()
+        return False
+
+    def _add_variant(self, request: Request) -> bool:
+        """Remembers the URL the request was linked as (as Scrapy's default dedupe sees it); True if new."""
+        if self.variants is None:
+            return False
+        url = request.meta.get("canonical_from", request.url)
+        return self.variants.add(hashlib.sha1(canonicalize_url(url).encode()).digest())
+
+    def _update_stats(self) -> None:
+        if self.stats is None:
+            return
+        self.stats.set_value("dupefilter/bloom/fingerprints", len(self.bloom))
+        self.stats.set_value("dupefilter/bloom/bytes", self.bloom.nbytes)
+
+    def load(self) -> None:
+        assert self.snapshot_path is not None
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                self.bloom.load_bytes(f.read())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable dupefilter snapshot {self.snapshot_path}: {e}")
+            return
+        logger.info(f"BloomDupeFilter: restored {len(self.bloom)} fingerprints from {self.snapshot_path}")
+
+    def save(self) -> None:
+        assert self.snapshot_path is not None
+        self._last_snapshot = time.monotonic()
+        self._update_stats()
+        temp_path = f"{self.snapshot_path}.tmp"
+        try:
+            directory = os.path.dirname(self.snapshot_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(self.bloom.to_bytes())
+            # Never leave a half-written snapshot behind
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            logger.error(f"Failed to save dupefilter snapshot to {self.snapshot_path}: {e}")
+
+    def close(self, reason: str) -> None:
+        self._update_stats()
+        if self.snapshot_path:
+            self.save()
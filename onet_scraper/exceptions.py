@@ -0,0 +1,33 @@
+from enum import Enum
+
+from scrapy.exceptions import IgnoreRequest
+
+
+class FailureReason(str, Enum):
+    """Why a download through Tor ultimately failed."""
+
+    BLOCKED = "blocked"  # 403 / 503 from Onet
+    SOFT_BAN = "soft_ban"  # Article request redirected to the homepage
+    CONNECTION = "connection"  # Tor circuit, proxy or network error
+    RETRY_BUDGET = "retry_budget"  # Global retry-rate cap reached before the request could retry
+    TOR_UNAVAILABLE = "tor_unavailable"  # Tor could not be reached, started or bootstrapped
+    NOT_HTML = "not_html"  # Content-Type was not HTML; aborted before the body was downloaded
+    TOO_LARGE = "too_large"  # Body exceeded the size limit; aborted mid-transfer
+    STALE = "stale"  # Article publication date older than the freshness window; aborted mid-transfer
+
+
+class TorRequestFailed(IgnoreRequest):
+    """
+    Raised by TorMiddleware once a request has exhausted its retries.
+
+    Subclasses IgnoreRequest so Scrapy's RetryMiddleware does not retry it a second time;
+    spiders can inspect `reason` in an errback.
+    """
+
+    def __init__(self, reason: FailureReason, url: str, attempts: int, detail: str = ""):
+        self.reason = reason
+        self.url = url
+        self.attempts = attempts
+        self.detail = detail
+        message = f"{reason.value} after {attempts} attempt(s): {url}"
+        super().__init__(f"{message} ({detail})" if detail else message)
@@ -1,26 +1,102 @@
 import asyncio
+import dataclasses
 import logging
-from typing import Any
-
-from curl_cffi import requests as curl_requests
-from scrapy.exceptions import CloseSpider
-from scrapy.http import HtmlResponse
-from stem import Signal
-from stem.control import Controller
+import time
+from typing import Any, NamedTuple, cast
+
+from curl_cffi.const import CurlInfo
+from scrapy import signals
+from scrapy.http import HtmlResponse, Request
+
+from onet_scraper.exceptions import FailureReason, TorRequestFailed
+from onet_scraper.utils.body_guard import DEFAULT_CONTENT_TYPES, BodyGuard, BodyRejected
+from onet_scraper.utils.canonical import UrlCanonicalizer
+from onet_scraper.utils.date_scanner import StaleDateScanner
+from onet_scraper.utils.hedging import HedgeBudget, LatencyTracker
+from onet_scraper.utils.histograms import StreamingHistogram
+from onet_scraper.utils.profile_selector import RoundRobinSelector, ThompsonSelector, selector_from_settings
+from onet_scraper.utils.retry import RetryBudget, RetryPolicy
+from onet_scraper.utils.rotation import RotationPolicy
+from onet_scraper.utils.routing import Route, RouteTable
+from onet_scraper.utils.session_pool import AsyncSessionPool, SessionPool
+from onet_scraper.utils.throttle import AimdThrottle
+from onet_scraper.utils.tor_bootstrap import TorBootstrap, TorUnavailable
+from onet_scraper.utils.tor_control import TorController
+from onet_scraper.utils.tor_lanes import LanePool, TorLane
 
 logger = logging.getLogger(__name__)
 
 
+class FetchResult(NamedTuple):
+    """Outcome of one curl_cffi transfer."""
+
+    status: int
+    body: bytes
+    url: str
+    headers: dict[str, Any]
+    # Network timings in seconds (connect, appconnect, starttransfer, total) and bytes received
+    timings: dict[str, float] | None = None
+
+
+# curl timing info reported per transfer, see https://curl.se/libcurl/c/curl_easy_getinfo.html
+TIMING_INFOS = {
+    "connect": CurlInfo.CONNECT_TIME,
+    "appconnect": CurlInfo.APPCONNECT_TIME,
+    "starttransfer": CurlInfo.STARTTRANSFER_TIME,
+    "total": CurlInfo.TOTAL_TIME,
+}
+
+
+# Failures that another lane or profile cannot fix
+_FINAL_REASONS = frozenset({FailureReason.NOT_HTML, FailureReason.TOO_LARGE, FailureReason.STALE})
+# Final outcomes that are the intended result rather than a failure
+_SKIP_REASONS = frozenset({FailureReason.STALE})
+
+
+def _fetch_result(response: Any, body: bytes | None = None) -> FetchResult:
+    body = response.content if body is None else body
+    infos = getattr(response, "infos", None) or {}
+    timings = {name: float(infos[info]) for name, info in TIMING_INFOS.items() if info in infos}
+    timings["bytes"] = float(getattr(response, "download_size", 0) or len(body))
+    return FetchResult(response.status_code, body, str(response.url), dict(response.headers), timings)
+
+
+class _AttemptFailed(Exception):
+    """One download attempt was blocked or failed; TorMiddleware decides whether to retry."""
+
+    def __init__(self, reason: FailureReason, detail: str = ""):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+
+
 class TorMiddleware:
     """
     Middleware to bypass anti-bot protections using curl_cffi + Tor Network.
     Features:
     - TLS fingerprint impersonation (Chrome/Safari)
     - Automatic IP rotation via Tor Control Port on 403 blocks
-
-    Refactored to use synchronous curl_cffi in a thread pool with configurable timeouts.
+    - Keep-alive curl_cffi sessions pooled per (profile, circuit)
+    - Requests dispatched across independent Tor lanes, each with its own delay and ban state
+    - Coalesced, rate-limited NEWNYM over one persistent control connection per Tor instance
+    - Optional AIMD throttle adapting each lane's delay and concurrency to bans and latency
+    - In-place retries with jittered exponential backoff, a new lane and profile per attempt,
+      a per-request budget (TOR_MAX_RETRIES) and a global retry-rate cap; final failures
+      raise TorRequestFailed with a typed reason
+    - Optional hedging: a request slower than the running latency percentile is duplicated
+      on another lane, the first success wins and the loser is cancelled
+    - Per-transfer curl timings (connect, TLS, first byte, total, bytes) as streaming histograms
+      per profile and per lane in stats, and in response.meta["tor_timing"]
+
+    Two download engines are available (TOR_DOWNLOAD_ENGINE):
+    - "thread": synchronous curl_cffi in the default thread pool (fallback)
+    - "asyncio": native curl_cffi AsyncSession bounded by global and per-circuit semaphores
     """
 
+    DOWNLOAD_ENGINES = ("thread", "asyncio")
+    # Timing histograms are pushed to Scrapy stats every N transfers (and on close)
+    TIMING_FLUSH_EVERY = 100
+
     BROWSER_PROFILES: list[str] = [
         "chrome110",
         "chrome116",
@@ -48,220 +124,791 @@ class TorMiddleware:
         password: str | None = None,
         timeout: int = 30,
         max_retries: int = 3,
+        session_pool: SessionPool | None = None,
+        stats: Any = None,
+        engine: str = "thread",
+        async_session_pool: AsyncSessionPool | None = None,
+        max_concurrency: int = 64,
+        max_per_circuit: int = 8,
+        lanes: LanePool | None = None,
+        control_host: str = "127.0.0.1",
+        circuit_timeout: float = 0.0,
+        throttle: AimdThrottle | None = None,
+        retry_policy: RetryPolicy | None = None,
+        retry_budget: RetryBudget | None = None,
+        hedge_enabled: bool = False,
+        hedge_percentile: float = 90.0,
+        hedge_budget: HedgeBudget | None = None,
+        latency_tracker: LatencyTracker | None = None,
+        profile_selector: RoundRobinSelector | ThompsonSelector | None = None,
+        tor_binary: str | None = None,
+        torrc: str = "torrc",
+        bootstrap_timeout: float = 60.0,
+        rotation_policy: RotationPolicy | None = None,
+        prewarm_url: str | None = None,
+        routes: RouteTable | None = None,
+        direct_lanes: LanePool | None = None,
+        max_body_size: int = 0,
+        content_types: tuple[str, ...] = DEFAULT_CONTENT_TYPES,
+        stale_abort: bool = True,
     ):
-        self._profile_index = 0
+        if engine not in self.DOWNLOAD_ENGINES:
+            raise ValueError(f"Unknown TOR_DOWNLOAD_ENGINE {engine!r}, expected one of {self.DOWNLOAD_ENGINES}")
+        self.profile_selector = profile_selector or RoundRobinSelector(self.BROWSER_PROFILES)
         self.tor_proxy = tor_proxy
         self.control_port = control_port
         self.password = password
-        self.timeout = timeout
+        self.control_host = control_host
+        self.circuit_timeout = circuit_timeout
+        self._controllers: dict[int, TorController] = {}
+        self.throttle = throttle
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=max_retries)
+        self.retry_budget = retry_budget or RetryBudget()
+        self.rotation_policy = rotation_policy
+        self.prewarm_url = prewarm_url
+        # lane name -> generation whose spare circuit has been (or is being) built
+        self._prewarmed: dict[str, int] = {}
+        self._background_tasks: set[asyncio.Future] = set()
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget or HedgeBudget()
+        # Successful attempt latencies; the hedge threshold is learned from them
+        self.latency_tracker = latency_tracker or LatencyTracker()
+        # Per request: latency of the first attempt vs. latency actually delivered
+        self._primary_latency = LatencyTracker(size=2000, min_samples=1)
+        self._effective_latency = LatencyTracker(size=2000, min_samples=1)
+        # (metric, "profile" | "lane", name) -> histogram
+        self._timing_histograms: dict[tuple[str, str, str], StreamingHistogram] = {}
+        self._timing_samples = 0
         self.timeout = timeout
         self.max_retries = max_retries
+        self.session_pool = session_pool or SessionPool(proxy=tor_proxy)
+        self.stats = stats
+        self.engine = engine
+        self.async_session_pool = async_session_pool or AsyncSessionPool(proxy=tor_proxy, max_clients=max_per_circuit)
+        self.max_per_circuit = max_per_circuit
+        self._global_semaphore = asyncio.Semaphore(max_concurrency)
+        self._circuit_semaphores: dict[tuple[str, int], asyncio.Semaphore] = {}
+        # Transfers holding or waiting for each circuit's semaphore
+        self._circuit_users: dict[tuple[str, int], int] = {}
+        self.lanes = lanes or LanePool(
+            [TorLane(name="lane0", proxy=tor_proxy, control_port=control_port, delay=0.0)], ban_cooldown=0.0
+        )
+        socks_host, socks_port = self._parse_proxy_host_port()
+        self.bootstrap = TorBootstrap(
+            socks_host,
+            socks_port,
+            self._controller(control_port),
+            binary=tor_binary,
+            torrc=torrc,
+            timeout=bootstrap_timeout,
+        )
+        self._bootstrap_pending = False
+        self._bootstrap_failure_logged = False
+        self._started_at = time.monotonic()
+        self._first_request_sent = False
+        # Hybrid routing: routes allowed to skip Tor go out on the direct lane first
+        self.routes = routes
+        self.direct_lanes = direct_lanes or LanePool([TorLane(name="direct", proxy="", delay=1.0)], ban_cooldown=0.0)
+        if throttle is not None:
+            for lane in self.direct_lanes.lanes:
+                # The direct lane adapts from its own budget (TOR_DIRECT_*), not the Tor lanes' one
+                throttle.seed(lane.name, lane.delay, lane.max_in_flight)
+        self._route_latency: dict[tuple[str, str], StreamingHistogram] = {}
+        # Streamed downloads abort once a body is not HTML or grows past max_body_size (0 = unlimited)
+        self.max_body_size = max_body_size
+        self.content_types = content_types
+        # Requests carrying meta["freshness_days"] also abort once their article date proves stale
+        self.stale_abort = stale_abort
         self.check_tor_connection()
 
     def check_tor_connection(self):
-        """Checks if Tor is listening on the configured SOCKS port, starts it if missing."""
-
-        host, port = self._parse_proxy_host_port()
-
-        if self._is_port_open(host, port):
-            logger.info("Tor is already running and accessible.")
-            return
-
-        logger.warning(f"Tor is NOT running at {host}:{port}. Attempting to start it automatically...")
+        """
+        Arms the Tor bootstrap (attach to a running Tor or launch one).
 
-        if self._try_start_tor():
-            # Wait for Tor to bootstrap
-            if self._wait_for_port(host, port, timeout=20):
-                logger.info("Tor started successfully!")
-                return
-            else:
-                error_msg = "Tor started but port 9050 is still not accessible after 20s."
-        else:
-            error_msg = "Could not find 'tor/tor.exe' or failed to launch process."
+        Nothing blocks here: the bootstrap starts when the spider opens and the
+        first request waits for it, so the crawl begins with the first usable circuit.
+        """
+        self._bootstrap_pending = True
 
-        # Final Error if recovery failed
-        final_msg = (
-            f"\n\n{'!' * 60}\nCRITICAL ERROR: {error_msg}\nPlease start Tor manually before running the scraper.\n{'!' * 60}\n"
-        )
-        print(final_msg)
-        logger.critical(final_msg)
-        raise CloseSpider(final_msg)
+    async def _ensure_tor_ready(self, request, spider):
+        try:
+            await self.bootstrap.ensure_ready()
+        except TorUnavailable as e:
+            if not self._bootstrap_failure_logged:
+                self._bootstrap_failure_logged = True
+                final_msg = (
+                    f"\n\n{'!' * 60}\nCRITICAL ERROR: {e}\nPlease start Tor manually before running the scraper.\n{'!' * 60}\n"
+                )
+                logger.critical(final_msg)
+                self._close_spider(spider, FailureReason.TOR_UNAVAILABLE.value)
+            raise TorRequestFailed(FailureReason.TOR_UNAVAILABLE, request.url, 0, str(e)) from e
+        if self._bootstrap_pending:
+            self._bootstrap_pending = False
+            if self.stats is not None and self.bootstrap.seconds is not None:
+                self.stats.set_value("tor/bootstrap/seconds", round(self.bootstrap.seconds, 3))
+                self.stats.set_value("tor/bootstrap/launched", self.bootstrap.launched)
+
+    def _close_spider(self, spider, reason: str):
+        """Stops the crawl instead of draining the whole frontier into failures."""
+        # Closing waits for in-flight downloads, including the caller's, so it cannot be awaited here
+        task = asyncio.ensure_future(spider.crawler.engine.close_spider_async(reason=reason))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
     def _parse_proxy_host_port(self):
         if "://" in self.tor_proxy:
             host_port = self.tor_proxy.split("://")[1]
         else:
             host_port = self.tor_proxy
-        host, port = host_port.split(":")
+        host, port = host_port.rsplit("@", 1)[-1].rsplit(":", 1)
         return host, int(port)
 
-    def _is_port_open(self, host, port):
-        import socket
-
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(1.0)
-        result = sock.connect_ex((host, port))
-        sock.close()
-        return result == 0
-
-    def _wait_for_port(self, host, port, timeout=20):
-        import time
-
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            if self._is_port_open(host, port):
-                return True
-            time.sleep(1)
-            print(f"Waiting for Tor to start... ({int(time.time() - start_time)}s)")
-        return False
-
-    def _try_start_tor(self):
-        import os
-        import subprocess
-
-        # Check standard location relative to project root
-        # Assuming we are in onet_scraper/middlewares.py -> go up two levels to root
-        # Project Root: c:\Users\user\Desktop\onet-scraper-pro-main
-        # Tor Path:     c:\Users\user\Desktop\onet-scraper-pro-main\tor\tor.exe
-
-        # Current file path
-        # current_dir = os.path.dirname(os.path.abspath(__file__))
-        # project_root = os.path.dirname(os.path.dirname(current_dir))  # Up from onet_scraper to root (Unused)
-
-        tor_exe = os.path.join("tor", "tor.exe")
-        torrc = "torrc"
-
-        if not os.path.exists(tor_exe):
-            # Fallback: try absolute check based on CWD (often root)
-            tor_exe = os.path.abspath("tor/tor.exe")
-
-        if not os.path.exists(tor_exe):
-            logger.error(f"Tor executable not found at: {tor_exe}")
-            return False
-
-        try:
-            logger.info(f"Starting Tor from: {tor_exe}")
-            # Start hidden process
-            subprocess.Popen(
-                [tor_exe, "-f", torrc],
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
-            return True
-        except Exception as e:
-            logger.error(f"Failed to launch start Tor process: {e}")
-            return False
-
     @classmethod
     def from_crawler(cls, crawler):
-        return cls(
-            tor_proxy=crawler.settings.get("TOR_PROXY", "socks5://127.0.0.1:9050"),
+        tor_proxy = crawler.settings.get("TOR_PROXY", "socks5://127.0.0.1:9050")
+        middleware = cls(
+            tor_proxy=tor_proxy,
             control_port=crawler.settings.getint("TOR_CONTROL_PORT", 9051),
             password=crawler.settings.get("TOR_PASSWORD", None),
             timeout=crawler.settings.getint("TOR_CONNECTION_TIMEOUT", 30),
             max_retries=crawler.settings.getint("TOR_MAX_RETRIES", 3),
+            session_pool=SessionPool.from_settings(crawler.settings, proxy=tor_proxy),
+            stats=crawler.stats,
+            engine=crawler.settings.get("TOR_DOWNLOAD_ENGINE", "thread"),
+            async_session_pool=AsyncSessionPool.from_settings(crawler.settings, proxy=tor_proxy),
+            max_concurrency=crawler.settings.getint("TOR_ASYNC_MAX_CONCURRENCY", 64),
+            max_per_circuit=crawler.settings.getint("TOR_ASYNC_MAX_PER_CIRCUIT", 8),
+            lanes=LanePool.from_settings(
+                crawler.settings, tor_proxy=tor_proxy, control_port=crawler.settings.getint("TOR_CONTROL_PORT", 9051)
+            ),
+            control_host=crawler.settings.get("TOR_CONTROL_HOST", "127.0.0.1"),
+            circuit_timeout=crawler.settings.getfloat("TOR_NEWNYM_CIRCUIT_TIMEOUT", 10.0),
+            throttle=AimdThrottle.from_settings(crawler.settings) if crawler.settings.getbool("TOR_THROTTLE_ENABLED") else None,
+            retry_policy=RetryPolicy.from_settings(crawler.settings),
+            retry_budget=RetryBudget.from_settings(crawler.settings),
+            hedge_enabled=crawler.settings.getbool("TOR_HEDGE_ENABLED", False),
+            hedge_percentile=crawler.settings.getfloat("TOR_HEDGE_PERCENTILE", 90.0),
+            hedge_budget=HedgeBudget(max_ratio=crawler.settings.getfloat("TOR_HEDGE_MAX_RATIO", 0.1)),
+            latency_tracker=LatencyTracker(min_samples=crawler.settings.getint("TOR_HEDGE_MIN_SAMPLES", 20)),
+            profile_selector=selector_from_settings(crawler.settings, cls.BROWSER_PROFILES),
+            tor_binary=crawler.settings.get("TOR_BINARY") or None,
+            torrc=crawler.settings.get("TOR_TORRC", "torrc"),
+            bootstrap_timeout=crawler.settings.getfloat("TOR_BOOTSTRAP_TIMEOUT", 60.0),
+            rotation_policy=(
+                RotationPolicy.from_settings(crawler.settings) if crawler.settings.getbool("TOR_ROTATION_ENABLED") else None
+            ),
+            prewarm_url=crawler.settings.get("TOR_ROTATION_PREWARM_URL") or None,
+            routes=RouteTable.from_settings(crawler.settings) if crawler.settings.getbool("TOR_ROUTING_ENABLED") else None,
+            direct_lanes=LanePool(
+                [
+                    TorLane(
+                        name="direct",
+                        proxy=crawler.settings.get("TOR_DIRECT_PROXY", ""),
+                        delay=crawler.settings.getfloat("TOR_DIRECT_DELAY", 1.0),
+                        max_in_flight=crawler.settings.getint("TOR_DIRECT_CONCURRENCY", 2),
+                    )
+                ],
+                ban_cooldown=0.0,
+            ),
+            max_body_size=crawler.settings.getint("TOR_MAX_BODY_SIZE", 4 * 1024 * 1024),
+            content_types=tuple(crawler.settings.getlist("TOR_ALLOWED_CONTENT_TYPES", list(DEFAULT_CONTENT_TYPES))),
+            stale_abort=crawler.settings.getbool("TOR_STREAM_STALE_ABORT", True),
         )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider):
+        if self._bootstrap_pending:
+            # Bootstrap while the scheduler fills up; the first request joins it
+            self.bootstrap.start()
+
+    async def spider_closed(self, spider):
+        self._update_pool_stats()
+        self._update_newnym_stats()
+        self._update_hedge_stats()
+        self._update_timing_stats()
+        self._update_rotation_stats()
+        self._update_route_stats()
+        self.profile_selector.save()
+        self.session_pool.close_all()
+        await self.async_session_pool.close_all()
+        for controller in self._controllers.values():
+            controller.close()
+        await self.bootstrap.close()
+
+    def _update_pool_stats(self):
+        if self.stats is None:
+            return
+        pool = self.async_session_pool if self.engine == "asyncio" else self.session_pool
+        self.stats.set_value("tor/pool/requests", pool.requests)
+        self.stats.set_value("tor/pool/connections_reused", pool.connections_reused)
+        self.stats.set_value("tor/pool/sessions_created", pool.sessions_created)
+        self.stats.set_value("tor/pool/sessions_evicted", pool.sessions_evicted)
+        self.stats.set_value("tor/pool/reuse_ratio", round(pool.reuse_ratio, 3))
+
+    def _update_newnym_stats(self):
+        if self.stats is None:
+            return
+        controllers = self._controllers.values()
+        self.stats.set_value("tor/newnym/requested", sum(c.renewals_requested for c in controllers))
+        self.stats.set_value("tor/newnym/sent", sum(c.renewals_sent for c in controllers))
+        self.stats.set_value("tor/newnym/failed", sum(c.renewals_failed for c in controllers))
+        self.stats.set_value("tor/newnym/coalesced", sum(c.renewals_coalesced for c in controllers))
+
+    def _update_hedge_stats(self):
+        if self.stats is None or not self.hedge_enabled:
+            return
+        self.stats.set_value("tor/hedge/rate", round(self.hedge_budget.rate, 4))
+        primary_p99 = self._primary_latency.percentile(99)
+        effective_p99 = self._effective_latency.percentile(99)
+        if primary_p99 is None or effective_p99 is None:
+            return
+        # Cancelled primaries only contribute their latency so far, so the saving is a lower bound
+        self.stats.set_value("tor/hedge/p99_primary", round(primary_p99, 3))
+        self.stats.set_value("tor/hedge/p99_effective", round(effective_p99, 3))
+        self.stats.set_value("tor/hedge/p99_saved", round(max(0.0, primary_p99 - effective_p99), 3))
 
-    def _get_next_profile(self) -> str:
-        profile = self.BROWSER_PROFILES[self._profile_index]
-        self._profile_index = (self._profile_index + 1) % len(self.BROWSER_PROFILES)
-        return profile
+    def _update_rotation_stats(self):
+        if self.stats is None or self.rotation_policy is None:
+            return
+        policy = self.rotation_policy
+        self.stats.set_value("tor/rotation/bans_recorded", policy.bans)
+        self.stats.set_value("tor/rotation/retired_recorded", policy.retired)
+        if policy.request_limit is not None:
+            self.stats.set_value("tor/rotation/request_limit", policy.request_limit)
+        if policy.age_limit is not None:
+            self.stats.set_value("tor/rotation/age_limit", round(policy.age_limit, 1))
+
+    def _record_route(self, route: Route | None, lane: TorLane, started: float, success: bool):
+        if route is None:
+            return
+        via = "direct" if self._is_direct(lane) else "tor"
+        self._inc_stat(f"tor/routes/{route.name}/{via}/requests")
+        self._inc_stat(f"tor/routes/{route.name}/{via}/{'success' if success else 'failed'}")
+        if success:
+            histogram = self._route_latency.get((route.name, via))
+            if histogram is None:
+                histogram = self._route_latency[(route.name, via)] = StreamingHistogram()
+            histogram.add(time.monotonic() - started)
+
+    def _update_route_stats(self):
+        if self.stats is None or self.routes is None:
+            return
+        for (name, via), histogram in self._route_latency.items():
+            self.stats.set_value(f"tor/routes/{name}/{via}/latency", histogram.summary())
+        for route in self.routes.routes:
+            if route.demoted:
+                self.stats.set_value(f"tor/routes/{route.name}/demoted", True)
+
+    def _record_timing(self, timings: dict[str, float], profile: str, lane: TorLane) -> dict[str, Any]:
+        """Adds one transfer's timings to the per-profile and per-lane histograms."""
+        for metric, value in timings.items():
+            for group, key in (("profile", profile), ("lane", lane.name)):
+                histogram = self._timing_histograms.get((metric, group, key))
+                if histogram is None:
+                    histogram = StreamingHistogram(min_value=1.0 if metric == "bytes" else 0.001)
+                    self._timing_histograms[(metric, group, key)] = histogram
+                histogram.add(value)
+        self._timing_samples += 1
+        if self._timing_samples % self.TIMING_FLUSH_EVERY == 0:
+            self._update_timing_stats()
+        return {**timings, "profile": profile, "lane": lane.name}
+
+    def _update_timing_stats(self):
+        if self.stats is None:
+            return
+        for (metric, group, key), histogram in self._timing_histograms.items():
+            self.stats.set_value(f"tor/timing/{metric}/{group}/{key}", histogram.summary())
 
-    def _sync_renew_identity(self):
-        """Synchronous Tor identity renewal."""
-        try:
-            with Controller.from_port(port=self.control_port) as controller:
-                if self.password:
-                    controller.authenticate(password=self.password)
-                else:
-                    controller.authenticate()  # Cookie auth
-                controller.signal(Signal.NEWNYM)
-        except Exception as e:
-            logger.error(f"Failed to renew Tor identity: {e}")
+    def _throttle_feedback(self, lane: TorLane, latency: float | None = None, banned: bool = False):
+        """Feeds a lane's outcome to the AIMD throttle and applies the new limits to the lane."""
+        if self.throttle is None:
+            return
+        state = self.throttle.on_ban(lane.name) if banned else self.throttle.on_success(lane.name, latency or 0.0)
+        lane.delay = state.delay
+        lane.max_in_flight = state.concurrency
+        if self.stats is not None:
+            prefix = f"tor/throttle/{lane.name}"
+            self.stats.set_value(f"{prefix}/delay", round(state.delay, 3))
+            self.stats.set_value(f"{prefix}/concurrency", state.concurrency)
+            self.stats.set_value(f"{prefix}/increases", state.increases)
+            self.stats.set_value(f"{prefix}/decreases", state.decreases)
+            if state.latency_ewma is not None:
+                self.stats.set_value(f"{prefix}/latency_ewma", round(state.latency_ewma, 3))
+
+    def _inc_stat(self, key: str, count: int = 1):
+        if self.stats is not None:
+            self.stats.inc_value(key, count)
+
+    def _get_next_profile(self, lane: TorLane | None = None) -> str:
+        return self.profile_selector.choose(lane.name if lane else None)
+
+    def _is_direct(self, lane: TorLane) -> bool:
+        return lane in self.direct_lanes.lanes
+
+    def _controller(self, control_port: int | None) -> TorController:
+        """One persistent control connection per Tor instance."""
+        port = control_port or self.control_port
+        controller = self._controllers.get(port)
+        if controller is None:
+            controller = self._controllers[port] = TorController(
+                control_port=port,
+                password=self.password,
+                host=self.control_host,
+                circuit_timeout=self.circuit_timeout,
+            )
+        return controller
 
-    async def _renew_tor_identity(self):
-        """Signals Tor to change identity (get new IP) - async wrapper."""
-        await asyncio.to_thread(self._sync_renew_identity)
+    async def _renew_tor_identity(self, lane: TorLane | None = None, since: float | None = None, proactive: bool = False):
+        """
+        Moves one lane to a new identity (get new IP).
 
-    def _sync_make_request(self, url: str, profile: str) -> tuple[int, bytes, str, dict[str, Any]]:
+        `since` is when the failing request was sent: if the lane has already been
+        rotated after that moment, the failure belongs to the old identity and no
+        further renewal is needed. A `proactive` rotation retires a healthy identity,
+        so the lane keeps its slot instead of cooling down.
+        """
+        lane = lane or self.lanes.default
+        if since is not None and lane.rotated_at > since:
+            return
+        if not lane.isolation:
+            # Isolated lanes get a fresh circuit from new SOCKS credentials alone
+            await self._controller(lane.control_port).renew()
+            self._update_newnym_stats()
+            if since is not None and lane.rotated_at > since:
+                # Another waiter on the same NEWNYM already rotated this lane
+                return
+        # Keep-alive connections stay pinned to the old circuit (and exit IP), so drop them
+        old_circuit = self.lanes.rotate(lane, cooldown=not proactive)
+        if self.rotation_policy is not None:
+            self.rotation_policy.on_retire(old_circuit)
+        self.session_pool.close_circuit(old_circuit)
+        if not self._circuit_users.get(old_circuit):
+            # Otherwise the last transfer still on the old circuit drops its cap
+            self._circuit_semaphores.pop(old_circuit, None)
+        await self.async_session_pool.close_circuit(old_circuit)
+
+    def _body_guard(self, request=None) -> BodyGuard:
+        max_bytes = self.max_body_size
+        content_types = self.content_types
+        scanner = None
+        if request is not None:
+            # Same per-request override as Scrapy's own downloader
+            max_bytes = request.meta.get("download_maxsize", max_bytes)
+            content_types = tuple(request.meta.get("allowed_content_types", content_types))
+            days_limit = request.meta.get("freshness_days")
+            if self.stale_abort and days_limit is not None:
+                scanner = StaleDateScanner(days_limit)
+        return BodyGuard(max_bytes=max_bytes, content_types=content_types, scanner=scanner)
+
+    def _sync_make_request(
+        self, url: str, profile: str, lane: TorLane | None = None, guard: BodyGuard | None = None
+    ) -> FetchResult:
         """
-        Synchronous HTTP request via curl_cffi with Tor proxy.
-        Returns: (status_code, content, final_url, headers)
+        Synchronous HTTP request via a pooled curl_cffi session with Tor proxy.
+
+        The body is streamed into the guard through curl's write callback rather than
+        `stream=True`, which would clone the handle and lose the pooled connection.
         """
+        lane = lane or self.lanes.default
+        guard = guard or self._body_guard()
+        circuit = lane.circuit
+        session = self.session_pool.acquire(profile, circuit, proxy=lane.proxy_url)
+        curl = session.curl
+
+        def on_chunk(chunk: bytes) -> int:
+            # Runs inside curl; raising aborts the transfer
+            if not guard.headers_checked:
+                content_type = curl.getinfo(CurlInfo.CONTENT_TYPE) or b""
+                # Content-Encoding is not exposed here, so mid-body aborts save an unknown amount
+                guard.check_headers(
+                    curl.getinfo(CurlInfo.RESPONSE_CODE),
+                    content_type.decode("latin-1") if isinstance(content_type, bytes) else content_type,
+                    curl.getinfo(CurlInfo.CONTENT_LENGTH_DOWNLOAD_T),
+                )
+            guard.feed(chunk)
+            return len(chunk)
+
         try:
-            response = curl_requests.get(
-                url,
-                impersonate=profile,  # type: ignore
-                proxies={"http": self.tor_proxy, "https": self.tor_proxy},
-                timeout=self.timeout,
-                allow_redirects=True,
-            )
-            return (
-                response.status_code,
-                response.content,
-                str(response.url),
-                dict(response.headers),
-            )
-        except Exception as e:
-            # Re-raise to be caught by the caller
-            raise e
+            response = session.get(url, timeout=self.timeout, allow_redirects=True, content_callback=on_chunk)
+        except Exception:
+            if guard.rejected is not None:
+                # We aborted on purpose: curl dropped that connection, the session itself is fine
+                self.session_pool.release(profile, circuit, session)
+                raise guard.rejected
+            # Connection state is unknown after a failure, never hand it out again
+            self.session_pool.discard(session)
+            raise
+        self.session_pool.release(profile, circuit, session, response)
+        if circuit != lane.circuit:
+            # Identity was rotated mid-flight; the session we just returned is stale
+            self.session_pool.close_circuit(circuit)
+        return _fetch_result(response, guard.body)
+
+    def _circuit_semaphore(self, circuit: tuple[str, int]) -> asyncio.Semaphore:
+        semaphore = self._circuit_semaphores.get(circuit)
+        if semaphore is None:
+            semaphore = self._circuit_semaphores[circuit] = asyncio.Semaphore(self.max_per_circuit)
+        return semaphore
+
+    async def _async_make_request(
+        self, url: str, profile: str, lane: TorLane | None = None, guard: BodyGuard | None = None
+    ) -> FetchResult:
+        """Native asyncio HTTP request via a pooled curl_cffi AsyncSession with Tor proxy, streamed into the guard."""
+        lane = lane or self.lanes.default
+        guard = guard or self._body_guard()
+        circuit = lane.circuit
+        # Sessions of rotated circuits are never asked for again; close them like the threaded pool does
+        await self.async_session_pool.evict_idle()
+        self._circuit_users[circuit] = self._circuit_users.get(circuit, 0) + 1
+        try:
+            async with self._global_semaphore, self._circuit_semaphore(circuit):
+                session = self.async_session_pool.get(profile, circuit, proxy=lane.proxy_url)
+                response = None
+                try:
+                    started = time.monotonic()
+                    response = await session.get(url, timeout=self.timeout, allow_redirects=True, stream=True)
+                    try:
+                        guard.check_headers(
+                            response.status_code,
+                            response.headers.get("Content-Type"),
+                            response.headers.get("Content-Length"),
+                            response.headers.get("Content-Encoding", ""),
+                        )
+                        async for chunk in response.aiter_content():
+                            guard.feed(chunk)
+                    finally:
+                        # Mid-body this aborts the transfer; the curl handle goes back to the session
+                        await response.aclose()
+                    elapsed = time.monotonic() - started
+                finally:
+                    self.async_session_pool.release(profile, circuit, response)
+        finally:
+            users = self._circuit_users.pop(circuit) - 1
+            if users:
+                self._circuit_users[circuit] = users
+            elif circuit != lane.circuit:
+                # The lane moved on while this transfer ran; nothing queues on the old circuit any more
+                self._circuit_semaphores.pop(circuit, None)
+        result = _fetch_result(response, guard.body)
+        if result.timings is not None:
+            # A streamed response's infos are read at the headers; the transfer ends here
+            result.timings["total"] = elapsed
+        return result
+
+    async def _fetch(self, url: str, profile: str, lane: TorLane, guard: BodyGuard | None = None) -> FetchResult:
+        """Dispatches the download to the configured engine."""
+        if self.engine == "asyncio":
+            return await self._async_make_request(url, profile, lane, guard)
+        # Run synchronous request in a thread to avoid blocking the event loop
+        return await asyncio.to_thread(self._sync_make_request, url, profile, lane, guard)
 
     async def process_request(self, request, spider) -> HtmlResponse | None:
         if "onet.pl" not in request.url:
             return None
 
-        profile = self._get_next_profile()
-        spider.logger.debug(f"TorMiddleware: [{profile}] {request.url}")
+        if self._bootstrap_pending:
+            await self._ensure_tor_ready(request, spider)
+        if not self._first_request_sent:
+            self._first_request_sent = True
+            startup = time.monotonic() - self._started_at
+            spider.logger.info(f"TorMiddleware: first request {startup:.1f}s after startup")
+            if self.stats is not None:
+                self.stats.set_value("tor/startup/first_request_seconds", round(startup, 3))
+
+        self.retry_budget.record_request()
+        self.hedge_budget.record_request()
+        route = self.routes.classify(request.url) if self.routes is not None else None
+        tried_lanes: set[str] = set()
+        attempt = 0
+        while True:
+            # Every retry goes out on a different lane (circuit) and browser profile
+            if route is not None and route.via_direct and self.direct_lanes.default.name not in tried_lanes:
+                lane = await self.direct_lanes.acquire()
+            else:
+                lane = await self.lanes.acquire(exclude=tried_lanes)
+            tried_lanes.add(lane.name)
+            profile = self._get_next_profile(lane)
+            await self._rotate_ahead_of_ban(lane, spider)
+            started = time.monotonic()
+            try:
+                response, timing = await self._download_hedged(request, spider, lane, profile, tried_lanes)
+                self._record_route(route, lane, started, success=True)
+                request.meta["tor_timing"] = timing
+                return response
+            except _AttemptFailed as failure:
+                reason, detail = failure.reason, failure.detail
+                self._record_route(route, lane, started, success=reason in _SKIP_REASONS)
+
+            if reason not in _FINAL_REASONS and self._is_direct(lane):
+                # Falling back from the direct lane to Tor is not a retry: no backoff, no retry budget
+                self._inc_stat("tor/routes/fallbacks")
+                continue
+            attempt += 1
+            if reason in _FINAL_REASONS:
+                raise self._give_up(spider, reason, request, attempt, detail)
+            if attempt > self.retry_policy.max_retries:
+                raise self._give_up(spider, reason, request, attempt, detail)
+            if not self.retry_budget.try_acquire():
+                raise self._give_up(spider, FailureReason.RETRY_BUDGET, request, attempt, f"last: {reason.value}")
+
+            delay = self.retry_policy.backoff(attempt)
+            self._inc_stat("tor/retry/count")
+            self._inc_stat(f"tor/retry/reason/{reason.value}")
+            spider.logger.info(f"TorMiddleware: retry {attempt}/{self.retry_policy.max_retries} in {delay:.1f}s ({reason.value})")
+            await asyncio.sleep(delay)
+
+    async def _rotate_ahead_of_ban(self, lane: TorLane, spider):
+        """Retires the lane's identity just before the rotation policy expects a ban."""
+        policy = self.rotation_policy
+        if policy is None or self._is_direct(lane):
+            return
+        if policy.should_rotate(lane.circuit):
+            usage = policy.usage(lane.circuit)
+            spider.logger.info(
+                f"TorMiddleware: rotating {lane.name} ahead of a ban "
+                f"({usage.requests} requests, {usage.age:.0f}s on this identity)"
+            )
+            self._inc_stat("tor/rotation/proactive")
+            await self._renew_tor_identity(lane, proactive=True)
+            self._update_rotation_stats()
+        elif (
+            lane.isolation
+            and self.prewarm_url
+            and policy.should_prewarm(lane.circuit)
+            and self._prewarmed.get(lane.name) != lane.generation + 1
+        ):
+            self._prewarmed[lane.name] = lane.generation + 1
+            task = asyncio.ensure_future(self._prewarm_spare(lane))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    async def _prewarm_spare(self, lane: TorLane):
+        """
+        Builds the lane's next circuit while the current one still works.
 
+        Isolated lanes rotate by switching SOCKS credentials, so one cheap request with
+        the next generation's credentials makes Tor build that circuit now; the pooled
+        keep-alive connection it leaves behind is picked up after the rotation.
+        """
+        assert self.prewarm_url is not None
+        spare = dataclasses.replace(lane, generation=lane.generation + 1)
         try:
-            # Run synchronous request in a thread to avoid blocking the event loop
-            status_code, content, final_url, headers = await asyncio.to_thread(self._sync_make_request, request.url, profile)
-
-            # Detect soft ban: redirected to homepage when requesting an article
-            is_soft_ban = "wiadomosci" in request.url and final_url.rstrip("/") in [
-                "https://www.onet.pl",
-                "http://www.onet.pl",
-                "https://onet.pl",
-            ]
-
-            if status_code in [403, 503] or is_soft_ban:
-                ban_type = "Soft Ban (Redirect)" if is_soft_ban else f"Block ({status_code})"
-                spider.logger.warning(f"TorMiddleware: {ban_type}! Rotating IP and Retrying...")
-                await self._renew_tor_identity()
-
-                # Signal Scrapy to retry the request (by returning a Response with a retry-able status or raising DoNotProcess)
-                # But here we just return 504 (Gateway Timeout) to trigger Scrapy's retry middleware if enabled, or just fail.
-                # Returning 504 is a reasonable way to say "Proxy failed".
-                return HtmlResponse(
-                    url=request.url,
-                    status=504,
-                    request=request,
-                    body=b"Tor Soft Ban / Block",
-                    encoding="utf-8",
-                )
+            # Any answer will do, the point is the circuit
+            await self._fetch(self.prewarm_url, self._get_next_profile(lane), spare, BodyGuard(content_types=()))
+            self._inc_stat("tor/rotation/prewarmed")
+        except Exception as e:
+            logger.debug(f"TorMiddleware: pre-warming {lane.name} generation {spare.generation} failed: {e}")
+
+    def _give_up(self, spider, reason: FailureReason, request, attempts: int, detail: str) -> TorRequestFailed:
+        if reason in _SKIP_REASONS:
+            self._inc_stat(f"tor/skipped/{reason.value}")
+            spider.logger.info(f"TorMiddleware: skipped {request.url} ({reason.value}: {detail})")
+            return TorRequestFailed(reason, request.url, attempts, detail)
+        self._inc_stat("tor/failed/count")
+        self._inc_stat(f"tor/failed/reason/{reason.value}")
+        failure = TorRequestFailed(reason, request.url, attempts, detail)
+        spider.logger.warning(f"TorMiddleware: giving up: {failure}")
+        return failure
+
+    async def _download_hedged(
+        self, request, spider, lane: TorLane, profile: str, tried_lanes: set[str]
+    ) -> tuple[HtmlResponse, dict[str, Any]]:
+        """
+        Runs one attempt, duplicating it on another lane if it outlives the running
+        latency percentile and a lane it has not tried is free right now. The first
+        success wins and the other download is cancelled.
+        """
+        threshold = self.latency_tracker.percentile(self.hedge_percentile) if self.hedge_enabled else None
+        if threshold is None:
+            return await self._download(request, spider, lane, profile)
 
-            # curl_cffi handles decompression, so we must remove Content-Encoding
-            # to prevent Scrapy from trying to decompress it again.
-            headers.pop("Content-Encoding", None)
-            headers.pop("content-encoding", None)
-
-            return HtmlResponse(
-                url=final_url,
-                status=status_code,
-                body=content,
-                encoding="utf-8",
-                request=request,
-                headers=headers,
-            )
+        started = time.monotonic()
+        primary = asyncio.ensure_future(self._download(request, spider, lane, profile))
+        pending: set[asyncio.Future] = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=threshold)
+            # A hedge only helps on another lane that can send now; queueing behind the primary would not
+            hedge_lane = self.lanes.try_acquire(exclude=tried_lanes) if not done and self.hedge_budget.available else None
+            if hedge_lane is not None:
+                self.hedge_budget.try_acquire()
+                tried_lanes.add(hedge_lane.name)
+                hedge_profile = self._get_next_profile(hedge_lane)
+                await self._rotate_ahead_of_ban(hedge_lane, spider)
+                spider.logger.debug(f"TorMiddleware: hedging after {threshold:.1f}s on {hedge_lane.name}: {request.url}")
+                self._inc_stat("tor/hedge/issued")
+                pending.add(asyncio.ensure_future(self._download(request, spider, hedge_lane, hedge_profile)))
+
+            failure: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is not None:
+                        failure = failure or error
+                        continue
+                    self._record_hedge_latency(primary, started, time.monotonic() - started)
+                    if task is not primary:
+                        self._inc_stat("tor/hedge/won")
+                    return cast(tuple[HtmlResponse, dict[str, Any]], task.result())
+            assert failure is not None
+            raise failure
+        finally:
+            for task in pending:
+                self._drop_loser(task)
+
+    def _record_hedge_latency(self, primary: asyncio.Future, started: float, effective: float):
+        self._effective_latency.add(effective)
+        if primary.done():
+            self._primary_latency.add(effective)
+        elif self.engine == "asyncio":
+            # The primary is about to be cancelled; its latency so far is a lower bound
+            self._primary_latency.add(effective)
+        else:
+            # A worker thread cannot be interrupted, so its true latency is still observable
+            primary.add_done_callback(lambda _: self._primary_latency.add(time.monotonic() - started))
+        self._update_hedge_stats()
 
+    def _drop_loser(self, task: asyncio.Future):
+        if self.engine == "asyncio":
+            task.cancel()
+            return
+        # The thread keeps running until curl returns; discard its result once it does
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _download(self, request, spider, lane: TorLane, profile: str) -> tuple[HtmlResponse, dict[str, Any]]:
+        """
+        Single download attempt on one lane; raises _AttemptFailed on a ban or connection error.
+        Returns the response and the attempt's network timing (also recorded in the histograms).
+        """
+        sent_at = time.monotonic()
+        circuit = lane.circuit
+        direct = self._is_direct(lane)
+        spider.logger.debug(f"TorMiddleware: [{lane.name}/{profile}] {request.url}")
+        if self.rotation_policy is not None and not direct:
+            self.rotation_policy.on_request(circuit)
+
+        try:
+            result = await self._fetch(request.url, profile, lane, self._body_guard(request))
+        except BodyRejected as e:
+            spider.logger.info(f"TorMiddleware: aborted {request.url} after {e.received} bytes: {e.detail}")
+            self._inc_stat(f"tor/stream/aborted/{e.reason.value}")
+            if e.bytes_saved is None:
+                self._inc_stat("tor/stream/aborted/unknown_length")
+            else:
+                self._inc_stat("tor/stream/bytes_saved", e.bytes_saved)
+            raise _AttemptFailed(e.reason, e.detail) from e
         except Exception as e:
-            spider.logger.error(f"TorMiddleware Connection Error: {e}. Rotating IP...")
-            await self._renew_tor_identity()
-            return HtmlResponse(
-                url=request.url,
-                status=504,
-                request=request,
-                body=f"Tor Error: {str(e)}".encode("utf-8"),
-                encoding="utf-8",
-            )
+            self._throttle_feedback(lane, banned=True)
+            if direct:
+                spider.logger.error(f"TorMiddleware Connection Error on {lane.name}: {e}. Falling back to Tor...")
+            else:
+                spider.logger.error(f"TorMiddleware Connection Error on {lane.name}: {e}. Rotating IP...")
+                await self._renew_tor_identity(lane, since=sent_at)
+            raise _AttemptFailed(FailureReason.CONNECTION, str(e)) from e
+        finally:
+            (self.direct_lanes if direct else self.lanes).release(lane)
+        latency = time.monotonic() - sent_at
+        self._update_pool_stats()
+        status_code, content, final_url, headers = result.status, result.body, result.url, result.headers
+        timing = self._record_timing(result.timings or {}, profile, lane)
+
+        # Detect soft ban: redirected to homepage when requesting an article
+        is_soft_ban = "wiadomosci" in request.url and final_url.rstrip("/") in [
+            "https://www.onet.pl",
+            "http://www.onet.pl",
+            "https://onet.pl",
+        ]
+
+        if (status_code in [403, 503] or is_soft_ban) and direct:
+            ban_type = "Soft Ban (Redirect)" if is_soft_ban else f"Block ({status_code})"
+            spider.logger.warning(f"TorMiddleware: {ban_type} on the direct lane! Falling back to Tor...")
+            self._throttle_feedback(lane, banned=True)
+            if self.routes is not None:
+                route = self.routes.classify(request.url)
+                if self.routes.on_block(route):
+                    self._inc_stat(f"tor/routes/{route.name}/demotions")
+            raise _AttemptFailed(FailureReason.SOFT_BAN if is_soft_ban else FailureReason.BLOCKED, ban_type)
+
+        if status_code in [403, 503] or is_soft_ban:
+            ban_type = "Soft Ban (Redirect)" if is_soft_ban else f"Block ({status_code})"
+            spider.logger.warning(f"TorMiddleware: {ban_type} on {lane.name}! Rotating IP and Retrying...")
+            lane.bans += 1
+            self._inc_stat(f"tor/lanes/{lane.name}/bans")
+            self._inc_stat(f"tor/profiles/{profile}/bans")
+            self.profile_selector.update(profile, success=False, lane=lane.name)
+            if self.rotation_policy is not None:
+                self.rotation_policy.on_ban(circuit)
+            self._throttle_feedback(lane, banned=True)
+            await self._renew_tor_identity(lane, since=sent_at)
+            raise _AttemptFailed(FailureReason.SOFT_BAN if is_soft_ban else FailureReason.BLOCKED, ban_type)
+
+        self._throttle_feedback(lane, latency=latency)
+        self.latency_tracker.add(latency)
+        self.profile_selector.update(profile, success=True, latency=latency, lane=lane.name)
+
+        # curl_cffi handles decompression, so we must remove Content-Encoding
+        # to prevent Scrapy from trying to decompress it again.
+        headers.pop("Content-Encoding", None)
+        headers.pop("content-encoding", None)
+
+        response = HtmlResponse(
+            url=final_url,
+            status=status_code,
+            body=content,
+            encoding="utf-8",
+            request=request,
+            headers=headers,
+        )
+        return response, timing
+
+
+class CanonicalUrlMiddleware:
+    """
+    Spider middleware scheduling every request under its canonical URL.
+
+    Requests for a variant (tracking parameters, trailing slash, "www.", an address
+    known to redirect) are rewritten before they reach the scheduler; the URL as
+    linked stays in meta["canonical_from"], which BloomDupeFilter uses to count the
+    fetches canonicalization avoided. Redirects seen in responses are recorded in
+    the UrlCanonicalizer shared with CanonicalRequestFingerprinter, so later links
+    to the old address resolve to the final one.
+    """
+
+    def __init__(self, canonicalizer: UrlCanonicalizer, stats=None):
+        self.canonicalizer = canonicalizer
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        # Shares the redirect map with the fingerprinter when it is CanonicalRequestFingerprinter
+        canonicalizer = getattr(crawler.request_fingerprinter, "canonicalizer", None)
+        return cls(canonicalizer or UrlCanonicalizer.from_crawler(crawler), stats=crawler.stats)
+
+    def _inc_stat(self, key: str) -> None:
+        if self.stats is not None:
+            self.stats.inc_value(key)
+
+    def process_spider_input(self, response) -> None:
+        request = response.request
+        if request is not None and response.url != request.url and self.canonicalizer.record_redirect(request.url, response.url):
+            self._inc_stat("onet/canonical/redirects")
+
+    def _canonical(self, output: Any) -> Any:
+        if not isinstance(output, Request):
+            return output
+        url = self.canonicalizer.canonical(output.url)
+        if url == output.url:
+            return output
+        self._inc_stat("onet/canonical/rewritten")
+        return output.replace(url=url, meta={**output.meta, "canonical_from": output.meta.get("canonical_from", output.url)})
+
+    def process_spider_output(self, response, result):
+        for output in result:
+            yield self._canonical(output)
+
+    async def process_spider_output_async(self, response, result):
+        async for output in result:
+            yield self._canonical(output)
@@ -1,7 +1,10 @@
 import json
+import sqlite3
 from datetime import datetime
 from typing import Any
 
+from onet_scraper.utils.seen_store import SeenStore, article_keys
+
 
 class JsonWriterPipeline:
     def __init__(self):
@@ -49,3 +52,27 @@ class JsonWriterPipeline:
             # Optionally drop item or raise generic error
 
         return item
+
+
+class SeenStorePipeline:
+    """Records saved articles in the cross-run SeenStore so the next runs skip them."""
+
+    def __init__(self, store: SeenStore | None = None):
+        self.store = store
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(SeenStore.from_settings(crawler.settings))
+
+    def close_spider(self, spider: Any) -> None:
+        if self.store is not None:
+            self.store.close()
+
+    def process_item(self, item: Any, spider: Any) -> Any:
+        if self.store is None or not item.get("url"):
+            return item
+        try:
+            self.store.add(article_keys(item["url"], item.get("id")))
+        except sqlite3.Error as e:
+            spider.logger.error(f"Failed to record {item['url']} in the seen store: {e}")
+        return item
@@ -0,0 +1,249 @@
+import logging
+import os
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from scrapy.core.scheduler import Scheduler
+from scrapy.http import Request
+
+from onet_scraper.utils.checkpoint import CheckpointLog, PendingRequest, write_atomic
+from onet_scraper.utils.frontier import FrontierPolicy
+
+logger = logging.getLogger(__name__)
+
+# Spider counters carried over a resume
+CHECKPOINT_STATS_PREFIXES = ("onet/", "frontier/", "tor/skipped/")
+
+
+class FrontierScheduler(Scheduler):
+    """
+    Scrapy's scheduler with a FrontierPolicy in front of it.
+
+    The policy sets each tagged request's priority and bounds how many requests of
+    each class are queued. Requests over a class's bound wait in that class's
+    overflow, first in first out, and are queued as dequeuing frees slots; they
+    reach the dupefilter only then.
+
+    With FRONTIER_CHECKPOINT_DIR set, the queued requests, the dupefilter's Bloom
+    filter and the spider counters are checkpointed there every
+    FRONTIER_CHECKPOINT_INTERVAL seconds, and a crawl that did not finish resumes
+    from them. Checkpoints only append the requests queued and dequeued since the
+    previous one; encoding and writing happen in a worker thread. Restored requests
+    are kept as plain rows and only become Requests when dequeued, which keeps
+    resuming a large frontier fast.
+    """
+
+    frontier: FrontierPolicy
+    fingerprinter: Any = None
+    checkpoint: CheckpointLog | None = None
+    checkpoint_interval: float = 60.0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = super().from_crawler(crawler)
+        scheduler.frontier = FrontierPolicy.from_settings(crawler.settings)
+        scheduler.fingerprinter = crawler.request_fingerprinter
+        directory = crawler.settings.get("FRONTIER_CHECKPOINT_DIR")
+        if directory:
+            scheduler.checkpoint = CheckpointLog(os.path.join(directory, "frontier.ckpt"))
+            scheduler.checkpoint_interval = crawler.settings.getfloat("FRONTIER_CHECKPOINT_INTERVAL", 60.0)
+        return scheduler
+
+    @property
+    def bloom_path(self) -> str:
+        assert self.checkpoint is not None
+        return os.path.join(os.path.dirname(self.checkpoint.path), "requests.bloom")
+
+    def open(self, spider):
+        result = super().open(spider)
+        self.pending: dict[bytes, PendingRequest] = {}
+        self._added: dict[bytes, PendingRequest] = {}
+        self._removed: list[bytes] = []
+        self._restored: list[PendingRequest] = []
+        self._overflow: dict[str, deque[Request]] = {}
+        self._write_full = True
+        self._last_checkpoint = time.monotonic()
+        self._executor: ThreadPoolExecutor | None = None
+        self._inflight: Future | None = None
+        if self.checkpoint is not None:
+            self.resume()
+        return result
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self._restored) + sum(map(len, self._overflow.values()))
+
+    def enqueue_request(self, request: Request) -> bool:
+        kind = request.meta.get("frontier_class")
+        if not self.frontier.admit(request):
+            assert kind is not None
+            self._overflow.setdefault(kind, deque()).append(request)
+            if self.stats is not None:
+                self.stats.inc_value(f"frontier/deferred/{kind}")
+            if self.checkpoint is not None:
+                self._track(request)
+            return True
+        return self._enqueue(request, kind)
+
+    def _enqueue(self, request: Request, kind: str | None) -> bool:
+        if not super().enqueue_request(request):
+            return False
+        self.frontier.on_enqueued(request)
+        if kind is not None and self.stats is not None:
+            self.stats.inc_value(f"frontier/enqueued/{kind}")
+        if self.checkpoint is not None:
+            self._track(request)
+        return True
+
+    def next_request(self) -> Request | None:
+        while self._restored and self._restored[-1].priority >= self._queued_priority():
+            row = self._restored.pop()
+            # Removed under the stored fingerprint: fingerprints may depend on state a restart lost
+            self._untrack(row.fingerprint)
+            request = row.to_request(self.spider)
+            if request is None:
+                # Its callback was renamed or removed since the checkpoint
+                self._dequeued(row, row.kind)
+                continue
+            self._dequeued(request, row.kind)
+            if self.stats is not None:
+                self.stats.inc_value("scheduler/dequeued/checkpoint")
+                self.stats.inc_value("scheduler/dequeued")
+            return request
+        request = super().next_request()
+        if request is not None:
+            self._dequeued(request, request.meta.get("frontier_class"))
+            if self.checkpoint is not None:
+                self._untrack(self._fingerprint(request))
+        return request
+
+    def close(self, reason: str):
+        if self.checkpoint is not None:
+            self._wait_for_checkpoint()
+            if reason == "finished":
+                self.checkpoint.delete()
+                if os.path.exists(self.bloom_path):
+                    os.remove(self.bloom_path)
+            else:
+                self._write_checkpoint(*self._snapshot())
+            if self._executor is not None:
+                self._executor.shutdown()
+        return super().close(reason)
+
+    def _dequeued(self, request: Request | PendingRequest, kind: str | None) -> None:
+        self.frontier.on_dequeued(request)
+        overflow = self._overflow.get(kind) if kind is not None else None
+        while overflow and self.frontier.admit(overflow[0]):
+            deferred = overflow.popleft()
+            if not self._enqueue(deferred, kind) and self.checkpoint is not None:
+                # A duplicate after all; it was tracked when deferred
+                self._untrack(self._fingerprint(deferred))
+
+    def _queued_priority(self) -> float:
+        priorities = [-queue.curprio for queue in (self.mqs, self.dqs) if queue is not None and queue.curprio is not None]
+        return max(priorities, default=float("-inf"))
+
+    def _fingerprint(self, request: Request) -> bytes:
+        return bytes(self.fingerprinter.fingerprint(request))
+
+    def _track(self, request: Request) -> None:
+        fingerprint = self._fingerprint(request)
+        row = PendingRequest.from_request(request, fingerprint, self.spider)
+        if row is None:
+            if self.stats is not None:
+                self.stats.inc_value("frontier/checkpoint/unserializable")
+            return
+        self.pending[fingerprint] = row
+        self._added[fingerprint] = row
+        self._maybe_checkpoint()
+
+    def _untrack(self, fingerprint: bytes) -> None:
+        if self.pending.pop(fingerprint, None) is None:
+            return
+        if self._added.pop(fingerprint, None) is None:
+            self._removed.append(fingerprint)
+        self._maybe_checkpoint()
+
+    def resume(self) -> None:
+        assert self.checkpoint is not None
+        started = time.perf_counter()
+        state = self.checkpoint.load()
+        if state is None:
+            return
+        bloom = getattr(self.df, "bloom", None)
+        if bloom is not None and os.path.exists(self.bloom_path):
+            try:
+                with open(self.bloom_path, "rb") as f:
+                    bloom.load_bytes(f.read())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable dupefilter checkpoint {self.bloom_path}: {e}")
+
+        rows = sorted(state.pending.values(), key=lambda row: row.priority)
+        self._restored = rows
+        self.pending = state.pending
+        for row in rows:
+            self.frontier.on_enqueued(row)
+        # The file already holds these rows; later checkpoints append to it, unless it ends in a torn segment
+        self._write_full = state.damaged
+
+        if self.stats is not None:
+            for key, value in state.stats.items():
+                self.stats.inc_value(key, value)
+            self.stats.set_value("frontier/checkpoint/restored", len(rows))
+        logger.info(
+            f"FrontierScheduler: resumed {len(rows)} pending requests from {self.checkpoint.path} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    def _maybe_checkpoint(self) -> None:
+        if time.monotonic() - self._last_checkpoint < self.checkpoint_interval:
+            return
+        if self._inflight is not None and not self._inflight.done():
+            return
+        self._last_checkpoint = time.monotonic()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._inflight = self._executor.submit(self._write_checkpoint, *self._snapshot())
+
+    def _snapshot(self) -> tuple[bool, list[PendingRequest], list[bytes], dict[str, Any], bytes | None]:
+        """Copies everything a checkpoint writes; cheap enough for the reactor thread."""
+        assert self.checkpoint is not None
+        full = self._write_full or self.checkpoint.needs_compaction()
+        if full:
+            added, removed = list(self.pending.values()), []
+        else:
+            added, removed = list(self._added.values()), self._removed
+        self._added, self._removed = {}, []
+        self._write_full = False
+        stats: dict[str, Any] = {}
+        if self.stats is not None:
+            stats = {
+                key: value
+                for key, value in self.stats.get_stats().items()
+                if key.startswith(CHECKPOINT_STATS_PREFIXES) and isinstance(value, (int, float))
+            }
+        bloom = getattr(self.df, "bloom", None)
+        return full, added, removed, stats, bloom.to_raw() if bloom is not None else None
+
+    def _write_checkpoint(
+        self, full: bool, added: list[PendingRequest], removed: list[bytes], stats: dict[str, Any], bloom: bytes | None
+    ) -> None:
+        assert self.checkpoint is not None
+        try:
+            if full:
+                self.checkpoint.write_full(added, stats)
+            else:
+                self.checkpoint.append(added, removed, stats)
+            if bloom is not None:
+                write_atomic(self.bloom_path, zlib.compress(bloom, 1))
+        except OSError as e:
+            # The deltas are lost, so the next checkpoint rewrites everything
+            self._write_full = True
+            logger.error(f"Failed to write crawl checkpoint to {self.checkpoint.path}: {e}")
+
+    def _wait_for_checkpoint(self) -> None:
+        if self._inflight is not None:
+            self._inflight.result()
+            self._inflight = None
@@ -20,8 +20,10 @@ USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTM
 ROBOTSTXT_OBEY = True
 
 # Concurrency and throttling settings
-CONCURRENT_REQUESTS_PER_DOMAIN = 1
-DOWNLOAD_DELAY = 2  # Slower but safer for 24/7 server operation
+# Politeness is enforced per Tor lane by TorMiddleware (TOR_LANE_DELAY / TOR_LANE_CONCURRENCY),
+# so Scrapy only needs to let enough requests through to keep every lane busy.
+CONCURRENT_REQUESTS_PER_DOMAIN = 8
+DOWNLOAD_DELAY = 0
 
 # Disable cookies (enabled by default)
 COOKIES_ENABLED = False
@@ -42,16 +44,147 @@ DOWNLOADER_MIDDLEWARES = {
 # Tor Settings
 TOR_PROXY = "socks5://127.0.0.1:9050"
 TOR_CONTROL_PORT = 9051
+TOR_CONTROL_HOST = os.getenv("TOR_CONTROL_HOST", "127.0.0.1")
 TOR_PASSWORD = os.getenv("TOR_PASSWORD", "")
 TOR_CONNECTION_TIMEOUT = 30  # Timeout for Tor requests in seconds
-TOR_MAX_RETRIES = 3
+TOR_BINARY = os.getenv("TOR_BINARY", "")  # Tor to launch if none is running; default: `tor` on PATH, then tor/tor.exe
+TOR_TORRC = "torrc"
+TOR_BOOTSTRAP_TIMEOUT = 60  # Max seconds to wait for the first usable circuit
+TOR_MAX_BODY_SIZE = 4 * 1024 * 1024  # Bytes; larger bodies are aborted mid-stream (0 = unlimited)
+TOR_ALLOWED_CONTENT_TYPES = ["text/html", "application/xhtml+xml"]  # Other 2xx responses abort at the headers
+TOR_STREAM_STALE_ABORT = True  # Abort article downloads once their publication date proves too old
+TOR_MAX_RETRIES = 3  # Retries per request inside TorMiddleware, each on a new lane and profile
+TOR_RETRY_BACKOFF_BASE = 1.0  # Seconds; jittered exponential backoff between retries
+TOR_RETRY_BACKOFF_MAX = 30.0
+TOR_RETRY_BUDGET_RATIO = 0.2  # Global cap: retries may be at most 20% of requests in the window
+TOR_RETRY_BUDGET_MIN = 10
+TOR_RETRY_BUDGET_WINDOW = 60
+
+# Hedged requests: duplicate an attempt on another lane once it outlives the running latency percentile
+TOR_HEDGE_ENABLED = False
+TOR_HEDGE_PERCENTILE = 90
+TOR_HEDGE_MAX_RATIO = 0.1  # Hedges may add at most 10% extra requests
+TOR_HEDGE_MIN_SAMPLES = 20  # Latency samples needed before the first hedge
+
+# Browser profile selection: "thompson" (bandit learning ban rate and latency per profile) or "round_robin"
+TOR_PROFILE_STRATEGY = "thompson"
+TOR_PROFILE_PER_LANE = False  # Learn separate statistics for every lane
+TOR_PROFILE_STATE_FILE = "data/profile_stats.json"  # Learned statistics, kept between runs ("" to disable)
+
+# Proactive rotation: learn how many requests / seconds an identity survives before a ban
+# and retire it just before the point where TOR_ROTATION_BAN_RISK of identities get banned
+TOR_ROTATION_ENABLED = True
+TOR_ROTATION_BAN_RISK = 0.1
+TOR_ROTATION_MIN_BANS = 5  # Bans to observe before rotating proactively
+TOR_ROTATION_HISTORY = 100  # Identity lifetimes kept for the estimate
+# Isolated lanes (TOR_LANE_ISOLATION) build their next circuit ahead of time with this request ("" to disable)
+TOR_ROTATION_PREWARM_URL = "https://www.onet.pl/robots.txt"
+
+# Hybrid routing: URL routes marked "direct" (section listings by default) are fetched without Tor
+# first and demoted to Tor for good on the first block signal. Off by default: direct requests
+# expose this machine's IP. TOR_ROUTES = [{"name": ..., "pattern": regex, "direct": bool}, ...]
+TOR_ROUTING_ENABLED = False
+TOR_ROUTES: list[dict] = []  # Empty: listing pages direct, articles via Tor
+TOR_DIRECT_PROXY = os.getenv("TOR_DIRECT_PROXY", "")  # Local non-Tor proxy for the direct lane ("" = no proxy)
+TOR_DIRECT_DELAY = 1.0
+TOR_DIRECT_CONCURRENCY = 2
+TOR_ROUTE_DEMOTE_AFTER = 1  # Block signals before a route is moved to Tor permanently
+TOR_ROUTE_STATE_FILE = "data/route_state.json"  # Demoted routes, kept between runs
+
+TOR_NEWNYM_CIRCUIT_TIMEOUT = 10  # Max seconds to wait for a fresh circuit after NEWNYM
+TOR_SESSION_MAX_IDLE = 60  # Seconds an idle keep-alive session is kept before eviction
+TOR_SESSION_POOL_SIZE = 32  # Max idle sessions kept across all (profile, circuit) keys
+
+# Download engine: "thread" (curl_cffi in the thread pool) or "asyncio" (native AsyncSession).
+# With "asyncio", CONCURRENT_REQUESTS can be raised past the thread pool size;
+# the engine enforces its own global and per-circuit limits below.
+TOR_DOWNLOAD_ENGINE = os.getenv("TOR_DOWNLOAD_ENGINE", "thread")
+TOR_ASYNC_MAX_CONCURRENCY = 64
+TOR_ASYNC_MAX_PER_CIRCUIT = 8
+
+# Tor lanes: independent exit identities, each with its own delay budget and ban state.
+# Either list explicit lanes (separate Tor instances), e.g.
+#   TOR_LANES = [{"proxy": "socks5h://127.0.0.1:9060", "control_port": 9061}, ...]
+# or enable stream isolation to get TOR_LANE_COUNT lanes on TOR_PROXY via unique SOCKS credentials.
+TOR_LANES: list = []
+TOR_LANE_ISOLATION = False
+TOR_LANE_COUNT = 1
+TOR_LANE_DELAY = 2.0  # Seconds between requests on one lane (slower but safer for 24/7 operation)
+TOR_LANE_CONCURRENCY = 1  # Requests in flight per lane
+TOR_LANE_BAN_COOLDOWN = 5.0  # Seconds a rotated lane rests before taking traffic again
+
+# Adaptive AIMD throttle per lane: TOR_LANE_DELAY / TOR_LANE_CONCURRENCY are the starting point,
+# healthy responses raise concurrency and lower the delay additively, bans back off multiplicatively.
+TOR_THROTTLE_ENABLED = True
+TOR_THROTTLE_MIN_DELAY = 0.5
+TOR_THROTTLE_MAX_DELAY = 30.0
+TOR_THROTTLE_MAX_CONCURRENCY = 4
+TOR_THROTTLE_TARGET_LATENCY = 5.0  # Seconds; above this the throttle stops speeding up
+TOR_THROTTLE_WINDOW = 10  # Healthy responses needed per additive step
+
+# Article discovery for `scrapy crawl onet -a discovery=sitemap`: news sitemaps, sitemap indexes or RSS feeds
+ONET_DISCOVERY_FEEDS = [
+    "https://wiadomosci.onet.pl/sitemap-news.xml",
+    "https://wiadomosci.onet.pl/.feed",
+]
+
+# Duplicate filter with flat memory for 24/7 crawls: request fingerprints live in a time-sliced
+# scalable Bloom filter and are forgotten after DUPEFILTER_BLOOM_MAX_AGE seconds (0 = never)
+DUPEFILTER_CLASS = "onet_scraper.dupefilters.BloomDupeFilter"
+DUPEFILTER_BLOOM_CAPACITY = 100_000  # Fingerprints per filter before it grows
+DUPEFILTER_BLOOM_ERROR_RATE = 1e-6  # Chance of dropping a new request as a false duplicate
+DUPEFILTER_BLOOM_MAX_AGE = 7 * 24 * 3600
+DUPEFILTER_BLOOM_SLICES = 4  # Aging granularity: fingerprints expire a slice (MAX_AGE / SLICES) at a time
+DUPEFILTER_BLOOM_SNAPSHOT = ""  # Snapshot file restored on start ("" = JOBDIR/requests.bloom if JOBDIR is set)
+DUPEFILTER_BLOOM_SNAPSHOT_INTERVAL = 300  # Seconds between snapshots
+DUPEFILTER_BLOOM_VARIANT_ERROR_RATE = 1e-3  # Separate filter of linked URL variants, only for dupefilter/canonical/avoided
+
+# URL canonicalization: requests are scheduled under their canonical URL (no tracking parameters, fragments,
+# trailing slash or "www.", known redirects resolved) and articles are deduplicated by their ID
+REQUEST_FINGERPRINTER_CLASS = "onet_scraper.dupefilters.CanonicalRequestFingerprinter"
+SPIDER_MIDDLEWARES = {
+    "onet_scraper.middlewares.CanonicalUrlMiddleware": 550,
+}
+CANONICAL_TRACKING_PARAMS: list[str] = []  # Extra query parameters to drop (utm_*, fbclid, gclid... always are)
+CANONICAL_REDIRECT_MAP_SIZE = 100_000  # Redirects remembered
+
+# Continuous mode (`scrapy crawl onet -a mode=continuous`): listing pages are polled again at intervals
+# learned from how many new article links each poll finds (about ONET_REVISIT_TARGET_NEW per poll)
+ONET_REVISIT_MIN_INTERVAL = 60  # Seconds
+ONET_REVISIT_MAX_INTERVAL = 3600
+ONET_REVISIT_INITIAL_INTERVAL = 300
+ONET_REVISIT_TARGET_NEW = 1.0
+# A section whose listing went stale is not paginated until it shows fresh cards again or this expires
+ONET_PAGINATION_EXHAUSTED_TTL = 3600  # Seconds (0 = only fresh cards lift it)
+
+# Fresh articles linked from article pages ("related", "most read", "latest" cards) are followed too,
+# up to ONET_RELATED_DEPTH hops away from a listing (0 = only articles found on listings)
+ONET_RELATED_DEPTH = 1
+
+# Crawl frontier: articles are fetched before related articles found on article pages, then category
+# pages, pagination last; articles near the top of a listing (the newest) go first. Queued requests
+# per class are bounded by FRONTIER_MAX_PENDING; the rest wait in memory until the queue drains.
+SCHEDULER = "onet_scraper.scheduler.FrontierScheduler"
+FRONTIER_PRIORITIES = {"article": 100, "related": 75, "category": 50, "pagination": 0}
+FRONTIER_MAX_PENDING = {"related": 200, "category": 50, "pagination": 20}  # 0 = unbounded
+FRONTIER_POSITION_SLOTS = 20  # Link positions that earn an article a priority bonus
+# Checkpoint of the queued requests, dupefilter and spider counters, so a restarted container resumes
+# the crawl instead of starting over ("" = disabled). Removed when a crawl finishes.
+FRONTIER_CHECKPOINT_DIR = os.getenv("FRONTIER_CHECKPOINT_DIR", "")
+FRONTIER_CHECKPOINT_INTERVAL = 60  # Seconds between checkpoints
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
     "onet_scraper.pipelines.JsonWriterPipeline": 300,
+    "onet_scraper.pipelines.SeenStorePipeline": 400,
 }
 
+# Articles saved by earlier runs are not downloaded again ("" to disable).
+# Entries expire after ONET_SEEN_TTL_DAYS, one day past the spider's freshness window.
+ONET_SEEN_STORE = "data/seen.sqlite3"
+ONET_SEEN_TTL_DAYS = 4
+
 # Set settings whose default value is deprecated to a future-proof value
 FEED_EXPORT_ENCODING = "utf-8"
 
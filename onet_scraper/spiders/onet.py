@@ -1,9 +1,13 @@
 import json
 import re
-from collections.abc import Generator
+import time
+from collections.abc import AsyncIterator, Callable, Generator, Iterable, Iterator
 from typing import Any, cast
 
-from scrapy.http import Response, TextResponse
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from scrapy.http import HtmlResponse, Request, Response, TextResponse
+from scrapy.link import Link
 from scrapy.linkextractors import LinkExtractor
 from scrapy.spiders import CrawlSpider, Rule
 
@@ -11,7 +15,13 @@ from onet_scraper.items import ArticleItem
 from onet_scraper.loaders import ArticleLoader
 
 # SRP Utils
-from onet_scraper.utils.extractors import extract_json_ld, parse_is_recent
+from onet_scraper.utils.card_dates import harvest_card_dates, url_date
+from onet_scraper.utils.extractors import extract_json_ld, is_stale, parse_is_recent
+from onet_scraper.utils.feeds import iter_feed_entries
+from onet_scraper.utils.link_classifier import LinkClassifier
+from onet_scraper.utils.pagination import PaginationPruner
+from onet_scraper.utils.revisit import RevisitScheduler
+from onet_scraper.utils.seen_store import SeenStore, article_keys
 
 
 class OnetSpider(CrawlSpider):
@@ -27,8 +37,6 @@ class OnetSpider(CrawlSpider):
     custom_settings = {
         "USER_AGENT": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
         "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "DOWNLOAD_DELAY": 2.0,
-        "CONCURRENT_REQUESTS_PER_DOMAIN": 1,
         "DEPTH_LIMIT": 5,
         "CLOSESPIDER_PAGECOUNT": 0,  # 0 = Unlimited items
         "ROBOTSTXT_OBEY": False,
@@ -38,6 +46,26 @@ class OnetSpider(CrawlSpider):
     # Compiled Regexes for Performance
     ID_PATTERN = re.compile(r"/([a-z0-9]+)$")
 
+    ARTICLE_PATTERN = re.compile(r"wiadomosci\.onet\.pl/[a-z0-9-]+/[a-z0-9-]+/[a-z0-9]+")
+    ARTICLE_DENY = (r"#", r"autorzy", r"oferta", r"partner", r"reklama", r"promocje", r"sponsored")
+
+    # Articles older than this many days are skipped
+    FRESHNESS_DAYS = 3
+
+    # "crawl": category pages and pagination; "sitemap": news sitemaps / RSS from ONET_DISCOVERY_FEEDS
+    DISCOVERY_MODES = ("crawl", "sitemap")
+    # "once": crawl and close; "continuous": keep polling listing pages at learned intervals
+    RUN_MODES = ("once", "continuous")
+    FEED_CONTENT_TYPES = (
+        "application/xml",
+        "text/xml",
+        "application/rss+xml",
+        "application/atom+xml",
+        "application/x-gzip",
+        "application/gzip",
+        "application/octet-stream",
+    )
+
     rules = (
         Rule(
             LinkExtractor(allow=(r"archiwum", r"20\d\d-", r"pogoda", r"sport"), deny_domains=["przegladsportowy.onet.pl"]),
@@ -46,13 +74,14 @@ class OnetSpider(CrawlSpider):
         # Rule for Articles
         Rule(
             LinkExtractor(
-                allow=(r"wiadomosci\.onet\.pl/[a-z0-9-]+/[a-z0-9-]+/[a-z0-9]+"),
-                deny=(r"#", r"autorzy", r"oferta", r"partner", r"reklama", r"promocje", r"sponsored"),
+                allow=ARTICLE_PATTERN.pattern,
+                deny=ARTICLE_DENY,
                 restrict_css=(".ods-c-card-wrapper", ".ods-o-card"),
                 unique=True,
             ),
             callback="parse_item",
             follow=False,
+            process_request="mark_article",
         ),
         # Rule for Categories (Follow to find more articles)
         Rule(
@@ -60,16 +89,262 @@ class OnetSpider(CrawlSpider):
                 allow=(r"wiadomosci\.onet\.pl/[a-z0-9-]+$"),
                 deny=(r"szukaj", r"autorzy", r"redakcja", r"pogoda"),
             ),
+            callback="parse_listing",
             follow=True,
+            process_request="mark_category",
         ),
         # Rule for Pagination (Next Page)
-        Rule(LinkExtractor(allow=(r"wiadomosci.onet.pl"), restrict_xpaths='//a[contains(@class, "next")]'), follow=True),
+        Rule(
+            LinkExtractor(allow=(r"wiadomosci.onet.pl"), restrict_xpaths='//a[contains(@class, "next")]'),
+            follow=True,
+            process_request="follow_pagination",
+        ),
     )
 
     def skip_request(self, request: Any, response: Response) -> None:
         return None
 
-    def parse_item(self, response: Response) -> Generator[dict[str, Any], None, None]:
+    def __init__(self, *args: Any, discovery: str = "crawl", mode: str = "once", **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        if discovery not in self.DISCOVERY_MODES:
+            raise ValueError(f"Unknown discovery mode {discovery!r}, expected one of {self.DISCOVERY_MODES}")
+        if mode not in self.RUN_MODES:
+            raise ValueError(f"Unknown run mode {mode!r}, expected one of {self.RUN_MODES}")
+        self.discovery = discovery
+        self.mode = mode
+        self.revisits: RevisitScheduler | None = RevisitScheduler() if mode == "continuous" else None
+        # All rules' links from one pass over the page
+        self.link_classifier = LinkClassifier(rule.link_extractor for rule in self.rules)
+        self._article_rule = next(index for index, rule in enumerate(self.rules) if rule.callback == "parse_item")
+        self._page_links: tuple[Response | None, list[list[Link]]] = (None, [])
+        self._article_deny = [re.compile(pattern) for pattern in self.ARTICLE_DENY]
+        # Card dates of the listing page whose links are being extracted
+        self._card_dates: tuple[Response | None, dict[str, str]] = (None, {})
+        # Article links of that page handed out so far (their position on the page)
+        self._article_count: tuple[Response | None, int] = (None, 0)
+        self._started_at = time.monotonic()
+        self._first_item_at: float | None = None
+        self.pagination = PaginationPruner(days_limit=self.FRESHNESS_DAYS)
+        self.seen_store: SeenStore | None = None
+        # Hops of related-article links followed from article pages (0 = none)
+        self.related_depth = 0
+
+    @classmethod
+    def from_crawler(cls, crawler: Any, *args: Any, **kwargs: Any) -> "OnetSpider":
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # Articles saved by earlier runs (written by SeenStorePipeline)
+        spider.seen_store = SeenStore.from_settings(crawler.settings)
+        spider.related_depth = crawler.settings.getint("ONET_RELATED_DEPTH", 0)
+        spider.pagination.ttl = crawler.settings.getfloat("ONET_PAGINATION_EXHAUSTED_TTL", 3600.0)
+        crawler.signals.connect(spider.item_scraped, signal=signals.item_scraped)
+        if spider.mode == "continuous":
+            spider.revisits = RevisitScheduler.from_settings(crawler.settings)
+            crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        return spider
+
+    def item_scraped(self) -> None:
+        if self._first_item_at is None:
+            self._first_item_at = time.monotonic()
+            if self.crawler.stats is not None:
+                self.crawler.stats.set_value("onet/first_item_seconds", round(self._first_item_at - self._started_at, 2))
+
+    def spider_idle(self) -> None:
+        """In continuous mode, polls the listing pages that are due and keeps the spider open."""
+        assert self.revisits is not None and self.crawler.engine is not None
+        due = self.revisits.due()
+        for url in due:
+            self._inc_stat("onet/revisit/polls")
+            self.crawler.engine.crawl(Request(url, dont_filter=True, meta={"revisit": True, "frontier_class": "category"}))
+        if due and self.seen_store is not None:
+            # A long-running spider never reopens the store, so expire entries here
+            self.seen_store.purge()
+        raise DontCloseSpider
+
+    def parse_start_url(self, response: Response, **kwargs: Any) -> Any:
+        return self.parse_listing(response)
+
+    def parse_listing(self, response: Response) -> Any:
+        if self.revisits is None:
+            return []
+        links = {link.url for link in self._links_by_rule(response)[self._article_rule]}
+        if not getattr(self, "_follow_links", True):
+            # Otherwise _requests_to_follow reuses the links and releases them
+            self._release_page_links(response)
+        new = self.revisits.observe(response.url, links)
+        if new:
+            self._inc_stat("onet/revisit/new_links")
+        return []
+
+    async def start(self) -> AsyncIterator[Any]:
+        if self.discovery == "sitemap":
+            for url in self.settings.getlist("ONET_DISCOVERY_FEEDS"):
+                yield self._feed_request(url)
+            return
+        async for request in super().start():
+            yield request
+
+    def closed(self, reason: str) -> None:
+        # Compare runs of both modes by requests spent per saved article
+        if self.seen_store is not None:
+            self.seen_store.close()
+        stats = self.crawler.stats
+        if stats is None:
+            return
+        requests = stats.get_value("scheduler/enqueued", 0)
+        items = stats.get_value("item_scraped_count", 0)
+        stats.set_value("onet/discovery/mode", self.discovery)
+        if items:
+            stats.set_value("onet/discovery/requests_per_item", round(requests / items, 2))
+            minutes = (time.monotonic() - self._started_at) / 60
+            stats.set_value("onet/items_per_minute", round(items / max(minutes, 1 / 60), 2))
+        self.logger.info(f"Discovery '{self.discovery}': {requests} requests for {items} fresh articles")
+
+    def _inc_stat(self, key: str) -> None:
+        crawler = getattr(self, "crawler", None)
+        if crawler is not None and crawler.stats is not None:
+            crawler.stats.inc_value(key)
+
+    def _already_seen(self, url: str) -> bool:
+        if self.seen_store is None or not self.seen_store.contains_any(article_keys(url)):
+            return False
+        self._inc_stat("onet/skipped/seen")
+        return True
+
+    def _is_article(self, url: str) -> bool:
+        return bool(self.ARTICLE_PATTERN.search(url)) and not any(deny.search(url) for deny in self._article_deny)
+
+    def _feed_request(self, url: str) -> Request:
+        # Sitemaps are XML, which TorMiddleware would otherwise reject as not HTML
+        return Request(url, callback=self.parse_feed, meta={"allowed_content_types": self.FEED_CONTENT_TYPES})
+
+    def parse_feed(self, response: Response) -> Iterator[Request]:
+        """Schedules fresh articles listed in a news sitemap, sitemap index or RSS feed straight to parse_item."""
+        for entry in iter_feed_entries(response.body):
+            if is_stale(entry.date, days_limit=self.FRESHNESS_DAYS):
+                self._inc_stat("onet/skipped/feed_date")
+            elif entry.index:
+                yield self._feed_request(entry.url)
+            elif self._is_article(entry.url) and not self._already_seen(entry.url):
+                self._inc_stat("onet/discovery/feed_articles")
+                yield Request(
+                    entry.url,
+                    callback=self.parse_item,
+                    meta={"freshness_days": self.FRESHNESS_DAYS, "frontier_class": "article", "card_date": entry.date},
+                )
+
+    def _links_by_rule(self, response: Response) -> list[list[Link]]:
+        page, links = self._page_links
+        if page is not response:
+            # parse_listing and _requests_to_follow both need the links of the same page
+            links = self.link_classifier.extract(cast(TextResponse, response))
+            self._page_links = (response, links)
+        return links
+
+    def _release_page_links(self, response: Response) -> None:
+        """Drops the cached links, and the response with its parsed tree, once the page is done."""
+        if self._page_links[0] is response:
+            self._page_links = (None, [])
+
+    def _requests_to_follow(self, response: Response) -> Iterable[Request | None]:
+        """CrawlSpider's rule loop, fed by one LinkClassifier pass instead of one walk per rule."""
+        if not isinstance(response, HtmlResponse):
+            return
+        seen: set[Link] = set()
+        try:
+            for rule_index, (rule, rule_links) in enumerate(zip(self._rules, self._links_by_rule(response))):
+                process_links = cast(Callable[[list[Link]], list[Link]], rule.process_links)
+                process_request = cast(Callable[[Request, Response], Request | None], rule.process_request)
+                links = [link for link in rule_links if link not in seen]
+                for link in process_links(links):
+                    seen.add(link)
+                    # Links claimed by the skip rule only need to be marked as seen
+                    if process_request == self.skip_request:
+                        continue
+                    yield process_request(self._build_request(rule_index, link), response)
+        finally:
+            self._release_page_links(response)
+
+    def _page_card_dates(self, response: Response) -> dict[str, str]:
+        page, dates = self._card_dates
+        if page is not response:
+            # Links of one page are processed together; harvest its cards once
+            dates = harvest_card_dates(response)
+            self._card_dates = (response, dates)
+        return dates
+
+    def _next_position(self, response: Response) -> int:
+        page, count = self._article_count
+        count = count if page is response else 0
+        self._article_count = (response, count + 1)
+        return count
+
+    def _link_date(self, url: str, response: Response) -> tuple[str | None, str]:
+        """Returns the date known for an article link before fetching it, and where it came from."""
+        dates = self._page_card_dates(response)
+        if url in dates:
+            return dates[url], "card_date"
+        return url_date(url), "url_date"
+
+    def mark_article(self, request: Request, response: Response) -> Request | None:
+        if self._already_seen(request.url):
+            return None
+        # Drop links whose listing card (or URL) already shows they are too old
+        date, source = self._link_date(request.url, response)
+        if is_stale(date, days_limit=self.FRESHNESS_DAYS):
+            self._inc_stat(f"onet/skipped/{source}")
+            self.logger.debug(f"POMINIĘTO (STARY LINK, {source}): {date} | {request.url}")
+            return None
+        # Lets TorMiddleware abort the download as soon as the streamed date proves stale
+        request.meta["freshness_days"] = self.FRESHNESS_DAYS
+        # Links near the top of a listing are the newest; FrontierScheduler fetches them first
+        request.meta["frontier_class"] = "article"
+        request.meta["listing_position"] = self._next_position(response)
+        request.meta["card_date"] = date
+        return request
+
+    def related_requests(self, response: Response) -> Iterator[Request]:
+        """
+        Follows the "related", "most read" and "latest" cards of an article page.
+
+        They go through the article rule, like links on a listing, so the same
+        seen-store and card/URL date checks apply, but are queued as "related".
+        `meta["related_depth"]` counts hops from a listing; pages `related_depth`
+        hops away are not harvested.
+        """
+        if not self.related_depth or not isinstance(response, HtmlResponse):
+            return
+        depth = response.meta.get("related_depth", 0)
+        if depth >= self.related_depth:
+            return
+        links = self._links_by_rule(response)
+        # Article pages are not followed, so nothing else needs them
+        self._release_page_links(response)
+        # Links the skip rule claims are not followed as articles, as on listings
+        claimed = {link for rule_links in links[: self._article_rule] for link in rule_links}
+        for link in links[self._article_rule]:
+            if link in claimed or link.url == response.url:
+                continue
+            request = self.mark_article(self._build_request(self._article_rule, link), response)
+            if request is None:
+                continue
+            request.meta["frontier_class"] = "related"
+            request.meta["related_depth"] = depth + 1
+            self._inc_stat("onet/discovery/related_links")
+            yield request
+
+    def mark_category(self, request: Request, response: Response) -> Request:
+        request.meta["frontier_class"] = "category"
+        return request
+
+    def follow_pagination(self, request: Request, response: Response) -> Request | None:
+        # Older pages of a section whose newest article is already stale hold nothing fresh
+        if not self.pagination.should_follow(response.url, self._page_card_dates(response).values()):
+            self._inc_stat("onet/pagination/pruned")
+            return None
+        request.meta["frontier_class"] = "pagination"
+        return request
+
+    def parse_item(self, response: Response) -> Generator[dict[str, Any] | Request, None, None]:
         # 1. External Utils extraction (keep complex logic in utils)
         metadata = extract_json_ld(response)
 
@@ -86,7 +361,8 @@ class OnetSpider(CrawlSpider):
             )
 
         # Filter out old articles
-        if not parse_is_recent(date_to_check, days_limit=3):
+        if not parse_is_recent(date_to_check, days_limit=self.FRESHNESS_DAYS):
+            self._inc_stat("onet/skipped/article_date")
             self.logger.info(f"⚠️ POMINIĘTO (STARE): {date_to_check} | {response.url}")
             return
 
@@ -181,3 +457,6 @@ class OnetSpider(CrawlSpider):
         self.logger.info(f"✅ ZAPISANO: {article_date_str} | {response.url}")
 
         yield item.model_dump()
+
+        # 7. Fresh articles linked from this one
+        yield from self.related_requests(response)
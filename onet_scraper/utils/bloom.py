@@ -0,0 +1,192 @@
+import hashlib
+import math
+import struct
+import time
+import zlib
+from collections import deque
+
+LN2 = math.log(2)
+
+SNAPSHOT_MAGIC = b"OBLM"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<4sBdI")  # magic, version, max_age, slices
+_SLICE = struct.Struct("<dI")  # created, filters
+_FILTER = struct.Struct("<QdQQI")  # capacity, error_rate, count, num_bits, num_hashes
+
+
+def _digest(key: bytes) -> bytes:
+    # Request fingerprints are already SHA1 digests; anything shorter is hashed first
+    return key if len(key) >= 16 else hashlib.blake2b(key, digest_size=16).digest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for `capacity` keys at `error_rate` false positives."""
+
+    def __init__(self, capacity: int, error_rate: float, num_bits: int | None = None, num_hashes: int | None = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = num_bits or max(8, math.ceil(-capacity * math.log(error_rate) / LN2**2))
+        self.num_hashes = num_hashes or max(1, round(self.num_bits / capacity * LN2))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: bytes) -> list[int]:
+        # Kirsch-Mitzenmacher double hashing over two halves of the digest
+        digest = _digest(key)
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def add(self, key: bytes) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows by adding larger filters with tighter error rates.
+
+    Each new filter holds `growth` times the keys of the previous one at
+    `tightening` times its error rate, so the compound false-positive rate stays
+    under `error_rate` however many keys arrive.
+    """
+
+    def __init__(self, initial_capacity: int, error_rate: float, growth: int = 2, tightening: float = 0.5):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters: list[BloomFilter] = []
+
+    def __contains__(self, key: bytes) -> bool:
+        return any(key in bloom for bloom in reversed(self.filters))
+
+    def add(self, key: bytes) -> None:
+        if not self.filters or self.filters[-1].full:
+            index = len(self.filters)
+            self.filters.append(
+                BloomFilter(
+                    self.initial_capacity * self.growth**index,
+                    self.error_rate * (1 - self.tightening) * self.tightening**index,
+                )
+            )
+        self.filters[-1].add(key)
+
+    def __len__(self) -> int:
+        return sum(bloom.count for bloom in self.filters)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+
+class AgingBloomFilter:
+    """
+    Remembers keys for about `max_age` seconds in a bounded amount of memory.
+
+    Keys go into the newest of `slices` scalable filters; a new slice is started
+    every `max_age / slices` seconds and the oldest one is dropped, so a key is
+    forgotten between `max_age * (slices - 1) / slices` and `max_age` seconds
+    after it was added. `max_age` 0 keeps keys forever in a single slice.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100_000,
+        error_rate: float = 1e-6,
+        max_age: float = 0.0,
+        slices: int = 4,
+        clock=time.time,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_age = max_age
+        self.max_slices = max(1, slices) if max_age else 1
+        self.clock = clock
+        self.slices: deque[tuple[float, ScalableBloomFilter]] = deque()
+
+    def _slice_filter(self) -> ScalableBloomFilter:
+        # Lookups check every slice, so each slice gets its share of the error budget
+        return ScalableBloomFilter(self.capacity, self.error_rate / self.max_slices)
+
+    def _expire(self, now: float) -> None:
+        while len(self.slices) > self.max_slices or (self.slices and self.max_age and now - self.slices[0][0] >= self.max_age):
+            self.slices.popleft()
+
+    def _current(self) -> ScalableBloomFilter:
+        now = self.clock()
+        if not self.slices or (self.max_age and now - self.slices[-1][0] >= self.max_age / self.max_slices):
+            self.slices.append((now, self._slice_filter()))
+            self._expire(now)
+        return self.slices[-1][1]
+
+    def __contains__(self, key: bytes) -> bool:
+        self._current()
+        return any(key in bloom for _, bloom in self.slices)
+
+    def add(self, key: bytes) -> bool:
+        """Adds a key; returns False if it was (probably) present already."""
+        if key in self:
+            return False
+        self._current().add(key)
+        return True
+
+    def __len__(self) -> int:
+        return sum(len(bloom) for _, bloom in self.slices)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bloom.nbytes for _, bloom in self.slices)
+
+    def to_raw(self) -> bytes:
+        """Uncompressed snapshot: a quick copy that can be compressed off the reactor thread."""
+        parts = [_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.max_age, len(self.slices))]
+        for created, scalable in self.slices:
+            parts.append(_SLICE.pack(created, len(scalable.filters)))
+            for bloom in scalable.filters:
+                parts.append(_FILTER.pack(bloom.capacity, bloom.error_rate, bloom.count, bloom.num_bits, bloom.num_hashes))
+                parts.append(bytes(bloom.bits))
+        return b"".join(parts)
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(self.to_raw(), 1)
+
+    def load_bytes(self, data: bytes) -> None:
+        """Restores slices from `to_bytes`; raises ValueError on a corrupt or foreign snapshot."""
+        try:
+            raw = zlib.decompress(data)
+            magic, version, _, slice_count = _HEADER.unpack_from(raw, 0)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError("not a Bloom filter snapshot")
+            offset = _HEADER.size
+            slices: deque[tuple[float, ScalableBloomFilter]] = deque()
+            for _ in range(slice_count):
+                created, filter_count = _SLICE.unpack_from(raw, offset)
+                offset += _SLICE.size
+                scalable = self._slice_filter()
+                for _ in range(filter_count):
+                    capacity, error_rate, count, num_bits, num_hashes = _FILTER.unpack_from(raw, offset)
+                    offset += _FILTER.size
+                    bloom = BloomFilter(capacity, error_rate, num_bits, num_hashes)
+                    size = len(bloom.bits)
+                    if offset + size > len(raw):
+                        raise ValueError("truncated Bloom filter snapshot")
+                    bloom.bits[:] = raw[offset : offset + size]
+                    bloom.count = count
+                    offset += size
+                    scalable.filters.append(bloom)
+                slices.append((created, scalable))
+        except (zlib.error, struct.error) as e:
+            raise ValueError(f"corrupt Bloom filter snapshot: {e}") from e
+        self.slices = slices
+        # Keys that aged out while the crawler was stopped are forgotten now
+        self._expire(self.clock())
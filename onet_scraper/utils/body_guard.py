@@ -0,0 +1,100 @@
+from onet_scraper.exceptions import FailureReason
+from onet_scraper.utils.date_scanner import StaleDateScanner
+
+DEFAULT_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class BodyRejected(Exception):
+    """
+    A transfer was aborted by its BodyGuard; the rest of the body was never downloaded.
+
+    `bytes_saved` is the announced Content-Length minus what had arrived, or None
+    when the body's length was not announced (chunked responses) or cannot be
+    compared with what arrived.
+    """
+
+    def __init__(self, reason: FailureReason, detail: str, received: int = 0, bytes_saved: int | None = None):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+        self.received = received
+        self.bytes_saved = bytes_saved
+
+
+class BodyGuard:
+    """
+    Collects the body of one streamed transfer and aborts it as early as possible.
+
+    `check_headers` runs before the first body byte is accepted: a 2xx response
+    that is not HTML, or that announces more than `max_bytes`, is rejected
+    outright. `feed` then enforces `max_bytes` on what actually arrives. Error
+    responses (403/503...) are never rejected so ban detection still sees them.
+    With a `scanner`, an article whose publication date turns out to be stale is
+    rejected as soon as the date has arrived.
+    A rejection raises BodyRejected and is also kept in `rejected`, since some
+    callers (curl write callbacks) cannot propagate the exception itself.
+
+    `received` counts decoded body bytes while Content-Length counts bytes on the
+    wire, so the two are only compared when `check_headers` was told the body is
+    not compressed; otherwise what a mid-body abort saved is unknown.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 0,
+        content_types: tuple[str, ...] = DEFAULT_CONTENT_TYPES,
+        scanner: StaleDateScanner | None = None,
+    ):
+        self.max_bytes = max_bytes
+        self.content_types = content_types
+        self.scanner = scanner
+        self.headers_checked = False
+        self.enforce = True
+        self.expected: int | None = None
+        self.identity = False
+        self.rejected: BodyRejected | None = None
+        self._chunks: list[bytes] = []
+        self.received = 0
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(self._chunks)
+
+    def _reject(self, reason: FailureReason, detail: str) -> BodyRejected:
+        saved = None
+        if self.expected is not None and (self.received == 0 or self.identity):
+            saved = max(0, self.expected - self.received)
+        self.rejected = BodyRejected(reason, detail, self.received, saved)
+        return self.rejected
+
+    def check_headers(
+        self,
+        status: int,
+        content_type: str | None,
+        content_length: int | str | None,
+        content_encoding: str | None = None,
+    ) -> None:
+        self.headers_checked = True
+        # None: the caller cannot see the header; "" means it was absent
+        self.identity = content_encoding is not None and content_encoding.strip().lower() in ("", "identity")
+        self.enforce = 200 <= status < 300
+        try:
+            length = int(content_length) if content_length not in (None, "") else -1
+        except (TypeError, ValueError):
+            length = -1
+        self.expected = length if length >= 0 else None
+        if not self.enforce:
+            return
+        media_type = (content_type or "").split(";")[0].strip().lower()
+        if media_type and self.content_types and media_type not in self.content_types:
+            raise self._reject(FailureReason.NOT_HTML, f"Content-Type {media_type}")
+        if self.max_bytes and self.expected is not None and self.expected > self.max_bytes:
+            raise self._reject(FailureReason.TOO_LARGE, f"Content-Length {self.expected} > {self.max_bytes}")
+
+    def feed(self, chunk: bytes) -> None:
+        self.received += len(chunk)
+        if self.enforce and self.max_bytes and self.received > self.max_bytes:
+            raise self._reject(FailureReason.TOO_LARGE, f"body exceeded {self.max_bytes} bytes")
+        self._chunks.append(chunk)
+        if self.enforce and self.scanner is not None and self.scanner.feed(chunk):
+            raise self._reject(FailureReason.STALE, f"published {self.scanner.date}")
@@ -0,0 +1,107 @@
+import re
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+from w3lib.url import canonicalize_url
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = frozenset({"fbclid", "gclid", "dclid", "msclkid", "ocid", "srcc", "sc_cid", "_gl"})
+TRACKING_PREFIXES = ("utm_",)
+# Redirect chains followed when resolving a URL
+MAX_REDIRECT_HOPS = 5
+# Hosts canonicalized to https and without a "www." in front of a subdomain
+SITE_SUFFIX = "onet.pl"
+
+
+def canonical_url(url: str, tracking_params: frozenset[str] = TRACKING_PARAMS) -> str:
+    """
+    Collapses the variants Onet links the same page through: fragments, tracking
+    parameters, parameter order, a trailing slash, http vs https and a "www." in
+    front of a subdomain (www.wiadomosci.onet.pl -> wiadomosci.onet.pl).
+    """
+    scheme, netloc, path, query, _ = urlsplit(canonicalize_url(url))
+    host = netloc.lower()
+    if host == SITE_SUFFIX or host.endswith(f".{SITE_SUFFIX}"):
+        scheme = "https"
+        if host.startswith("www.") and host.count(".") > 2:
+            host = host[4:]
+    if query:
+        # Filtered without re-encoding, so the rest stays as canonicalize_url wrote it
+        params = []
+        for param in query.split("&"):
+            key = unquote(param.split("=", 1)[0]).lower()
+            if key not in tracking_params and not key.startswith(TRACKING_PREFIXES):
+                params.append(param)
+        query = "&".join(params)
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path or "/", query, ""))
+
+
+class UrlCanonicalizer:
+    """
+    Maps every URL of a page to one canonical URL and a dedupe key.
+
+    Besides `canonical_url`, redirects seen in responses are remembered (up to
+    `max_redirects`, least recently used first out), so a later link to the old
+    address resolves to where it ended up. Article URLs are deduplicated by the
+    article ID (`id_pattern` on the path), which is the same across sections.
+    """
+
+    def __init__(
+        self,
+        article_pattern: re.Pattern[str] | None = None,
+        id_pattern: re.Pattern[str] | None = None,
+        tracking_params: frozenset[str] = TRACKING_PARAMS,
+        max_redirects: int = 100_000,
+    ):
+        self.article_pattern = article_pattern
+        self.id_pattern = id_pattern
+        self.tracking_params = tracking_params
+        self.max_redirects = max_redirects
+        self.redirects: OrderedDict[str, str] = OrderedDict()
+
+    @classmethod
+    def from_crawler(cls, crawler) -> "UrlCanonicalizer":
+        settings = crawler.settings
+        return cls(
+            article_pattern=getattr(crawler.spidercls, "ARTICLE_PATTERN", None),
+            id_pattern=getattr(crawler.spidercls, "ID_PATTERN", None),
+            tracking_params=TRACKING_PARAMS | {param.lower() for param in settings.getlist("CANONICAL_TRACKING_PARAMS")},
+            max_redirects=settings.getint("CANONICAL_REDIRECT_MAP_SIZE", 100_000),
+        )
+
+    def canonical(self, url: str) -> str:
+        """The canonical URL, following recorded redirects."""
+        url = canonical_url(url, self.tracking_params)
+        for _ in range(MAX_REDIRECT_HOPS):
+            target = self.redirects.get(url)
+            if target is None:
+                break
+            self.redirects.move_to_end(url)
+            url = target
+        return url
+
+    def record_redirect(self, source: str, target: str) -> bool:
+        """Remembers that `source` ended up at `target`; returns False if there was nothing to learn."""
+        source, target = canonical_url(source, self.tracking_params), canonical_url(target, self.tracking_params)
+        # A redirect to the front page is a soft ban, not a new address
+        if source == target or urlsplit(target).path == "/":
+            return False
+        self.redirects[source] = target
+        self.redirects.move_to_end(source)
+        while len(self.redirects) > self.max_redirects:
+            self.redirects.popitem(last=False)
+        return True
+
+    def article_id(self, url: str) -> str | None:
+        if self.article_pattern is None or self.id_pattern is None or not self.article_pattern.search(url):
+            return None
+        match = self.id_pattern.search(urlsplit(url).path)
+        return match.group(1) if match else None
+
+    def dedupe_key(self, url: str) -> str:
+        """Returns "article:<id>" for articles, otherwise the canonical URL."""
+        url = self.canonical(url)
+        article_id = self.article_id(url)
+        return f"article:{article_id}" if article_id else url
@@ -0,0 +1,80 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from urllib.parse import urldefrag
+
+from scrapy.http import Response
+from w3lib.url import safe_url_string
+
+CARD_SELECTOR = ".ods-c-card-wrapper, .ods-o-card"
+# Where a card shows its date; the headline and lead may mention other dates
+DATE_SELECTOR = "time, [class*=date]"
+
+ISO_DATE = re.compile(r"(20\d\d)-(\d\d)-(\d\d)")
+DOTTED_DATE = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(20\d\d)\b")
+# "15 min temu", "2 godz. temu", "3 dni temu", "tydzień temu"
+RELATIVE_DATE = re.compile(r"\b(?:(\d+)\s*)?(min|godz|h\b|dzie|dni|tydz|tygod|mies)\w*\.?\s+temu\b", re.IGNORECASE)
+RELATIVE_UNITS = {
+    "min": timedelta(minutes=1),
+    "godz": timedelta(hours=1),
+    "h": timedelta(hours=1),
+    "dzie": timedelta(days=1),
+    "dni": timedelta(days=1),
+    "tydz": timedelta(weeks=1),
+    "tygod": timedelta(weeks=1),
+    "mies": timedelta(days=30),
+}
+TODAY_WORDS = re.compile(r"\bdzisiaj\b|\bdziś\b|\bchwilę temu\b|\bprzed chwilą\b", re.IGNORECASE)
+YESTERDAY_WORDS = re.compile(r"\bwczoraj\b", re.IGNORECASE)
+URL_DATE = re.compile(r"/(20\d\d)[/-](\d\d)[/-](\d\d)(?:/|$)")
+
+
+def parse_card_date(text: Optional[str], now: Optional[datetime] = None) -> Optional[str]:
+    """
+    Turns the date shown on a listing card into YYYY-MM-DD.
+    Understands ISO dates, DD.MM.YYYY and relative labels ("2 godz. temu", "3 dni temu", "wczoraj").
+    """
+    if not text:
+        return None
+    now = now or datetime.now()
+    match = ISO_DATE.search(text)
+    if match:
+        return "-".join(match.groups())
+    match = DOTTED_DATE.search(text)
+    if match:
+        day, month, year = (int(part) for part in match.groups())
+        return f"{year:04d}-{month:02d}-{day:02d}"
+    match = RELATIVE_DATE.search(text)
+    if match:
+        count, unit = match.groups()
+        return (now - int(count or 1) * RELATIVE_UNITS[unit.lower()]).strftime("%Y-%m-%d")
+    if YESTERDAY_WORDS.search(text):
+        return (now - timedelta(days=1)).strftime("%Y-%m-%d")
+    if TODAY_WORDS.search(text):
+        return now.strftime("%Y-%m-%d")
+    return None
+
+
+def url_date(url: str) -> Optional[str]:
+    """Returns the YYYY-MM-DD date encoded in an article URL path, if any."""
+    match = URL_DATE.search(url)
+    return "-".join(match.groups()) if match else None
+
+
+def harvest_card_dates(response: Response) -> Dict[str, str]:
+    """
+    Maps every link inside a listing card to the date shown on that card.
+    A machine-readable `datetime` attribute wins over the text of the card's
+    date element; the rest of the card (headline, lead) is never read.
+    """
+    dates: Dict[str, str] = {}
+    for card in response.css(CARD_SELECTOR):
+        date = parse_card_date(card.css("[datetime]::attr(datetime)").get())
+        if date is None:
+            date = parse_card_date(" ".join(card.css(DATE_SELECTOR).xpath(".//text()").getall()))
+        if date is None:
+            continue
+        for href in card.xpath("descendant-or-self::a/@href").getall():
+            # Keyed the way LinkExtractor spells request URLs
+            dates[safe_url_string(urldefrag(response.urljoin(href))[0])] = date
+    return dates
@@ -0,0 +1,248 @@
+import json
+import logging
+import os
+import struct
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from typing import Any
+
+from scrapy.http import Request
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"OCKP"
+_SEGMENT = struct.Struct("<4sBI")  # magic, kind, payload length
+
+FULL, ADD, REMOVE, STATS = 1, 2, 3, 4
+FINGERPRINT_SIZE = 20  # Scrapy request fingerprints are SHA1 digests
+
+
+@dataclass(slots=True)
+class PendingRequest:
+    """
+    A queued request as stored in a checkpoint.
+
+    Only what ordering and admission need is kept as fields; the rest of the
+    request stays JSON-encoded until the request is dequeued, so restoring a large
+    frontier does not build a Request (or decode a meta dict) per entry.
+    """
+
+    fingerprint: bytes
+    priority: int
+    kind: str | None  # meta["frontier_class"]
+    data: bytes  # JSON: url, callback, errback, dont_filter, meta, cb_kwargs
+
+    @property
+    def meta(self) -> dict[str, Any]:
+        # FrontierPolicy.on_enqueued only reads the request class
+        return {"frontier_class": self.kind}
+
+    @classmethod
+    def from_request(cls, request: Request, fingerprint: bytes, spider) -> "PendingRequest | None":
+        """None for requests a checkpoint cannot rebuild (bodies, callbacks that are not spider methods)."""
+        if request.method != "GET" or request.body:
+            return None
+        names: list[str | None] = []
+        for function in (request.callback, request.errback):
+            if function is None:
+                names.append(None)
+            elif getattr(function, "__self__", None) is spider:
+                names.append(function.__name__)
+            else:
+                return None
+        # Encoded now: middlewares keep writing to meta while a checkpoint is written in another thread
+        data = [request.url, names[0], names[1], request.dont_filter, _json_safe(request.meta), _json_safe(request.cb_kwargs)]
+        return cls(fingerprint, request.priority, request.meta.get("frontier_class"), json.dumps(data).encode("utf-8"))
+
+    def to_request(self, spider) -> Request | None:
+        """None if a callback no longer exists on the spider."""
+        url, callback, errback, dont_filter, meta, cb_kwargs = json.loads(self.data)
+        try:
+            return Request(
+                url,
+                callback=getattr(spider, callback) if callback else None,
+                errback=getattr(spider, errback) if errback else None,
+                priority=self.priority,
+                dont_filter=dont_filter,
+                meta=meta,
+                cb_kwargs=cb_kwargs,
+            )
+        except AttributeError:
+            return None
+
+
+@dataclass
+class CheckpointState:
+    pending: dict[bytes, PendingRequest] = field(default_factory=dict)
+    stats: dict[str, Any] = field(default_factory=dict)
+    # The file ends in a torn segment; appending after it would make later segments unreachable
+    damaged: bool = False
+
+
+def _json_safe(values: dict[str, Any]) -> dict[str, Any]:
+    try:
+        json.dumps(values)
+        return values
+    except (TypeError, ValueError):
+        pass
+    # Middlewares put objects into meta; only plain values survive a restart
+    safe = {}
+    for key, value in values.items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        safe[key] = value
+    return safe
+
+
+def encode_requests(requests: list[PendingRequest]) -> bytes:
+    """
+    Columnar payload: count, fingerprints, priorities, JSON list of classes, row
+    offsets and the concatenated row data. Decoding is a handful of C-level
+    passes plus one slice per row.
+    """
+    priorities = array("q", (request.priority for request in requests))
+    offsets = array("I", [0])
+    for request in requests:
+        offsets.append(offsets[-1] + len(request.data))
+    kinds = json.dumps([request.kind for request in requests]).encode("utf-8")
+    return b"".join(
+        [
+            struct.pack("<II", len(requests), len(kinds)),
+            b"".join(request.fingerprint for request in requests),
+            priorities.tobytes(),
+            kinds,
+            offsets.tobytes(),
+            b"".join(request.data for request in requests),
+        ]
+    )
+
+
+def decode_requests(payload: bytes) -> list[PendingRequest]:
+    count, kinds_size = struct.unpack_from("<II", payload, 0)
+    offset = 8
+    fingerprints = payload[offset : offset + count * FINGERPRINT_SIZE]
+    offset += count * FINGERPRINT_SIZE
+    priorities = array("q")
+    priorities.frombytes(payload[offset : offset + count * priorities.itemsize])
+    offset += count * priorities.itemsize
+    kinds = json.loads(payload[offset : offset + kinds_size])
+    offset += kinds_size
+    offsets = array("I")
+    offsets.frombytes(payload[offset : offset + (count + 1) * offsets.itemsize])
+    blob = payload[offset + (count + 1) * offsets.itemsize :]
+    return [
+        PendingRequest(
+            fingerprints[i * FINGERPRINT_SIZE : (i + 1) * FINGERPRINT_SIZE],
+            priorities[i],
+            kinds[i],
+            blob[offsets[i] : offsets[i + 1]],
+        )
+        for i in range(count)
+    ]
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Writes aside and swaps the file in, so a crash never leaves half of it behind."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class CheckpointLog:
+    """
+    Append-only checkpoint file of compressed segments.
+
+    A FULL segment holds every pending request; later ADD / REMOVE segments hold
+    only what changed since the previous checkpoint, so a periodic checkpoint
+    costs as much as the frontier churn, not its size. Once the appended deltas
+    outgrow `compact_ratio` times the last full segment, the next checkpoint
+    rewrites the file as a single FULL segment (written aside, then swapped in).
+    """
+
+    def __init__(self, path: str, compact_ratio: float = 2.0, min_compact_size: int = 1 << 20):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.min_compact_size = min_compact_size
+        self._full_size = 0
+
+    @staticmethod
+    def _segment(kind: int, payload: bytes) -> bytes:
+        data = zlib.compress(payload, 1)
+        return _SEGMENT.pack(MAGIC, kind, len(data)) + data
+
+    def needs_compaction(self) -> bool:
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return True
+        return size > max(self.min_compact_size, self._full_size * self.compact_ratio)
+
+    def write_full(self, requests: list[PendingRequest], stats: dict[str, Any]) -> None:
+        data = self._segment(FULL, encode_requests(requests)) + self._segment(STATS, json.dumps(stats).encode("utf-8"))
+        write_atomic(self.path, data)
+        self._full_size = len(data)
+
+    def append(self, added: list[PendingRequest], removed: list[bytes], stats: dict[str, Any]) -> None:
+        data = b""
+        if removed:
+            data += self._segment(REMOVE, b"".join(removed))
+        if added:
+            data += self._segment(ADD, encode_requests(added))
+        data += self._segment(STATS, json.dumps(stats).encode("utf-8"))
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self) -> CheckpointState | None:
+        """
+        Replays the file; a torn last segment (crash mid-write) is ignored and
+        reported in `CheckpointState.damaged`. The next write must then be
+        `write_full`, since segments appended after the tear are never read.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            data = f.read()
+        state = CheckpointState()
+        offset = 0
+        while offset + _SEGMENT.size <= len(data):
+            magic, kind, length = _SEGMENT.unpack_from(data, offset)
+            start = offset + _SEGMENT.size
+            if magic != MAGIC or start + length > len(data):
+                break
+            try:
+                payload = zlib.decompress(data[start : start + length])
+            except zlib.error:
+                break
+            offset = start + length
+            if kind == FULL:
+                state.pending = {request.fingerprint: request for request in decode_requests(payload)}
+                self._full_size = offset
+            elif kind == ADD:
+                state.pending.update((request.fingerprint, request) for request in decode_requests(payload))
+            elif kind == REMOVE:
+                for i in range(0, len(payload), FINGERPRINT_SIZE):
+                    state.pending.pop(payload[i : i + FINGERPRINT_SIZE], None)
+            elif kind == STATS:
+                state.stats = json.loads(payload)
+        if offset < len(data):
+            logger.warning(f"CheckpointLog: ignoring damaged tail of {self.path} at byte {offset}")
+            state.damaged = True
+        return state
+
+    def delete(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self._full_size = 0
@@ -0,0 +1,48 @@
+import re
+
+from onet_scraper.utils.extractors import is_stale, parse_date
+
+# The same two sources OnetSpider.parse_item reads the publication date from
+JSON_LD_DATE = re.compile(rb'"datePublished"\s*:\s*"([^"]{10,40})"')
+VISUAL_DATE = re.compile(rb"ods-m-date-authorship__publication[^>]*>\s*([^<]{10,60})<")
+
+
+class StaleDateScanner:
+    """
+    Looks for an article's publication date in a body that is still arriving.
+
+    Each chunk is searched for the JSON-LD `datePublished` or the visual
+    `ods-m-date-authorship__publication` date, keeping a short tail of the previous
+    chunk so a marker split across chunks is still found. The first date that
+    parses decides; `feed` returns True once it is known to be older than
+    `days_limit`. Dates that do not parse (the visual date reads "Dzisiaj 10:00" on
+    fresh articles) are skipped. Scanning stops after `max_scan_bytes`, since the
+    date sits near the top of an article page.
+    """
+
+    TAIL = 256
+
+    def __init__(self, days_limit: int = 3, max_scan_bytes: int = 512 * 1024):
+        self.days_limit = days_limit
+        self.max_scan_bytes = max_scan_bytes
+        self.date: str | None = None
+        self.done = False
+        self._tail = b""
+        self._scanned = 0
+
+    def feed(self, chunk: bytes) -> bool:
+        if self.done:
+            return False
+        window = self._tail + chunk
+        self._scanned += len(chunk)
+        for pattern in (JSON_LD_DATE, VISUAL_DATE):
+            for match in pattern.finditer(window):
+                date = match.group(1).decode("utf-8", "replace").strip()
+                if parse_date(date) is not None:
+                    self.done = True
+                    self.date = date
+                    return is_stale(self.date, self.days_limit)
+        if self._scanned >= self.max_scan_bytes:
+            self.done = True
+        self._tail = window[-self.TAIL :]
+        return False
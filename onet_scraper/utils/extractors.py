@@ -68,21 +68,39 @@ def extract_json_ld(response: Response) -> Dict[str, Optional[str]]:
     return metadata
 
 
-def parse_is_recent(date_str: Optional[str], days_limit: int = 3) -> bool:
+def parse_date(date_str: Optional[str]) -> Optional[datetime]:
     """
-    Checks if a date string (YYYY-MM-DD...) is within the last `days_limit` days.
+    Parses the day part of a date string (YYYY-MM-DD, optionally followed by a time).
+    Returns None if it is missing or malformed.
     """
     if not date_str:
-        return False
+        return None
     try:
         if "T" in date_str:
             date_str = date_str.split("T")[0]
         else:
             date_str = date_str[:10]
 
-        article_date = datetime.strptime(date_str, "%Y-%m-%d")
-        today = datetime.now()
-        days_diff = (today - article_date).days
-        return 0 <= days_diff <= days_limit
+        return datetime.strptime(date_str, "%Y-%m-%d")
     except ValueError:
+        return None
+
+
+def parse_is_recent(date_str: Optional[str], days_limit: int = 3) -> bool:
+    """
+    Checks if a date string (YYYY-MM-DD...) is within the last `days_limit` days.
+    """
+    article_date = parse_date(date_str)
+    if article_date is None:
         return False
+    days_diff = (datetime.now() - article_date).days
+    return 0 <= days_diff <= days_limit
+
+
+def is_stale(date_str: Optional[str], days_limit: int = 3) -> bool:
+    """
+    Checks if a date string is known to be older than `days_limit` days.
+    Unlike `not parse_is_recent(...)`, a missing or malformed date is not stale.
+    """
+    article_date = parse_date(date_str)
+    return article_date is not None and (datetime.now() - article_date).days > days_limit
@@ -0,0 +1,82 @@
+import gzip
+import io
+from collections.abc import Iterator
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from lxml import etree
+
+# Elements holding one feed entry: sitemap index, sitemap/news sitemap, RSS, Atom
+ENTRY_TAGS = {"sitemap", "url", "item", "entry"}
+# Best date first: news publication date, then modification / feed dates
+DATE_TAGS = ("publication_date", "pubDate", "published", "date", "lastmod", "updated")
+
+
+@dataclass
+class FeedEntry:
+    url: str
+    date: Optional[str] = None
+    index: bool = False  # Points to another sitemap rather than a page
+
+
+def _local(tag) -> str:
+    return etree.QName(tag).localname if isinstance(tag, str) else ""
+
+
+def _normalize_date(value: Optional[str]) -> Optional[str]:
+    """ISO dates pass through; RSS (RFC 822) dates become ISO."""
+    if not value:
+        return None
+    value = value.strip()
+    if value[:4].isdigit():
+        return value
+    try:
+        return parsedate_to_datetime(value).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def _entry(element) -> Optional[FeedEntry]:
+    children: dict[str, str] = {}
+    for child in element:
+        name = _local(child.tag)
+        if name == "link" and child.get("href"):
+            # Atom links carry the URL in an attribute
+            children.setdefault(name, child.get("href"))
+        elif child.text and child.text.strip():
+            children.setdefault(name, child.text.strip())
+        # news:news wraps the publication date one level down
+        for grandchild in child:
+            if grandchild.text and grandchild.text.strip():
+                children.setdefault(_local(grandchild.tag), grandchild.text.strip())
+    url = children.get("loc") or children.get("link")
+    if not url:
+        return None
+    date = next((children[tag] for tag in DATE_TAGS if tag in children), None)
+    return FeedEntry(url=url, date=_normalize_date(date), index=_local(element.tag) == "sitemap")
+
+
+def iter_feed_entries(body: bytes) -> Iterator[FeedEntry]:
+    """
+    Streams the entries of a sitemap, sitemap index, news sitemap, RSS or Atom feed.
+
+    Parsed with iterparse and each entry is freed once read, so a large sitemap is
+    never held as a whole tree. Gzipped sitemaps are unpacked first.
+    """
+    if body[:2] == b"\x1f\x8b":
+        body = gzip.decompress(body)
+    parser = etree.iterparse(io.BytesIO(body), events=("end",), recover=True, resolve_entities=False)
+    try:
+        for _, element in parser:
+            if _local(element.tag) not in ENTRY_TAGS:
+                continue
+            entry = _entry(element)
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+            if entry is not None:
+                yield entry
+    except etree.XMLSyntaxError:
+        # Truncated or empty feed: keep what was read
+        return
@@ -0,0 +1,50 @@
+import math
+from collections import deque
+
+
+class LatencyTracker:
+    """Latency percentiles over the most recent `size` samples (a sliding window)."""
+
+    def __init__(self, size: int = 500, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def percentile(self, q: float) -> float | None:
+        """Nearest-rank percentile (q in 0-100); None until enough samples were seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+
+class HedgeBudget:
+    """Caps hedged (duplicate) requests at `max_ratio` of all requests."""
+
+    def __init__(self, max_ratio: float = 0.1):
+        self.max_ratio = max_ratio
+        self.requests = 0
+        self.hedges = 0
+
+    @property
+    def rate(self) -> float:
+        return self.hedges / self.requests if self.requests else 0.0
+
+    def record_request(self) -> None:
+        self.requests += 1
+
+    @property
+    def available(self) -> bool:
+        return self.hedges + 1 <= self.max_ratio * self.requests
+
+    def try_acquire(self) -> bool:
+        if not self.available:
+            return False
+        self.hedges += 1
+        return True
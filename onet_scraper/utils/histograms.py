@@ -0,0 +1,63 @@
+import math
+
+
+class StreamingHistogram:
+    """
+    Fixed-memory histogram with log-spaced buckets.
+
+    Every bucket spans a `growth` ratio (1.1 = 10%), so quantiles carry at most that
+    relative error no matter how many samples are added. Values at or below
+    `min_value` share the first bucket.
+    """
+
+    def __init__(self, min_value: float = 0.001, growth: float = 1.1):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self._buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def add(self, value: float) -> None:
+        if value < 0 or math.isnan(value):
+            return
+        index = 0 if value <= self.min_value else int(math.log(value / self.min_value) / self._log_growth) + 1
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def _bucket_value(self, index: int) -> float:
+        if index == 0:
+            return self.min_value
+        # Geometric midpoint of [min * g^(i-1), min * g^i]
+        return float(self.min_value * self.growth ** (index - 0.5))
+
+    def quantile(self, q: float) -> float | None:
+        """Approximate quantile, q in 0-1."""
+        if not self.count:
+            return None
+        target = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= target:
+                value = self._bucket_value(index)
+                # Never report outside the observed range
+                return min(max(value, self.min or value), self.max or value)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4),
+            "p50": round(self.quantile(0.5) or 0.0, 4),
+            "p90": round(self.quantile(0.9) or 0.0, 4),
+            "p99": round(self.quantile(0.99) or 0.0, 4),
+            "max": round(self.max or 0.0, 4),
+        }
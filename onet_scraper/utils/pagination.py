@@ -0,0 +1,55 @@
+import logging
+import time
+from collections.abc import Iterable
+from urllib.parse import urlparse
+
+from onet_scraper.utils.extractors import is_stale
+
+logger = logging.getLogger(__name__)
+
+
+class PaginationPruner:
+    """
+    Stops following a section's pagination once it runs out of fresh articles.
+
+    Listing pages are ordered newest first, so when the newest card date on a page
+    is already outside the freshness window, every later page of that section is
+    too. The section is then marked exhausted and its "next" links are not
+    followed. Pages without any card dates say nothing and are followed.
+
+    The mark is lifted when a page of the section shows a fresh card again (in
+    continuous mode the first page is polled repeatedly) or `ttl` seconds after
+    it was set (0 = never).
+    """
+
+    def __init__(self, days_limit: int = 3, ttl: float = 3600.0):
+        self.days_limit = days_limit
+        self.ttl = ttl
+        # section -> when it was marked exhausted
+        self.exhausted: dict[str, float] = {}
+
+    @staticmethod
+    def section(url: str) -> str:
+        """First path segment of a listing URL ("" for the front page)."""
+        return urlparse(url).path.strip("/").split("/")[0]
+
+    def should_follow(self, page_url: str, card_dates: Iterable[str], now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        section = self.section(page_url)
+        # YYYY-MM-DD strings sort chronologically
+        newest = max(card_dates, default=None)
+        stale = newest is not None and is_stale(newest, self.days_limit)
+        marked_at = self.exhausted.get(section)
+        if marked_at is not None:
+            if newest is not None and not stale:
+                logger.info(f"PaginationPruner: section '{section or '/'}' has fresh articles again ({page_url})")
+            elif self.ttl and now - marked_at > self.ttl:
+                logger.debug(f"PaginationPruner: exhausted mark of section '{section or '/'}' expired")
+            else:
+                return False
+            del self.exhausted[section]
+        if stale:
+            self.exhausted[section] = now
+            logger.info(f"PaginationPruner: section '{section or '/'}' exhausted, newest article {newest} ({page_url})")
+            return False
+        return True
@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import random
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger(__name__)
+
+
+class RoundRobinSelector:
+    """Cycles through browser profiles in order (the original TorMiddleware behaviour)."""
+
+    def __init__(self, profiles: list[str]):
+        self.profiles = profiles
+        self._index = 0
+
+    def choose(self, lane: str | None = None) -> str:
+        profile = self.profiles[self._index]
+        self._index = (self._index + 1) % len(self.profiles)
+        return profile
+
+    def update(self, profile: str, success: bool, latency: float | None = None, lane: str | None = None) -> None:
+        pass
+
+    def save(self) -> None:
+        pass
+
+
+@dataclass
+class ArmStats:
+    successes: float = 0.0
+    failures: float = 0.0
+    latency_ewma: float | None = None
+
+
+class ThompsonSelector:
+    """
+    Thompson-sampling bandit over browser profiles.
+
+    Each profile (optionally per lane) keeps a Beta(successes + 1, failures + 1)
+    posterior of not being banned. A draw from it is scaled by a latency factor,
+    `target / (target + latency_ewma)`, so fast profiles win ties and slow ones
+    still get explored now and then. Old evidence is down-weighted once an arm
+    has `max_observations` so the selector follows changes in Onet's filtering.
+    What was learned is kept in a small JSON state file between runs.
+    """
+
+    def __init__(
+        self,
+        profiles: list[str],
+        state_file: str | None = None,
+        per_lane: bool = False,
+        latency_target: float = 5.0,
+        max_observations: float = 200.0,
+        ewma_alpha: float = 0.2,
+        rng: random.Random | None = None,
+    ):
+        self.profiles = profiles
+        self.state_file = state_file
+        self.per_lane = per_lane
+        self.latency_target = latency_target
+        self.max_observations = max_observations
+        self.ewma_alpha = ewma_alpha
+        self.rng = rng or random.Random()
+        self.arms: dict[str, ArmStats] = {}
+        self.load()
+
+    def _key(self, profile: str, lane: str | None) -> str:
+        return f"{lane}|{profile}" if self.per_lane and lane else profile
+
+    def _arm(self, profile: str, lane: str | None) -> ArmStats:
+        key = self._key(profile, lane)
+        arm = self.arms.get(key)
+        if arm is None:
+            arm = self.arms[key] = ArmStats()
+        return arm
+
+    def _score(self, arm: ArmStats) -> float:
+        sample = self.rng.betavariate(arm.successes + 1, arm.failures + 1)
+        if arm.latency_ewma is None:
+            return sample
+        return sample * self.latency_target / (self.latency_target + arm.latency_ewma)
+
+    def choose(self, lane: str | None = None) -> str:
+        return max(self.profiles, key=lambda profile: self._score(self._arm(profile, lane)))
+
+    def update(self, profile: str, success: bool, latency: float | None = None, lane: str | None = None) -> None:
+        arm = self._arm(profile, lane)
+        if success:
+            arm.successes += 1
+        else:
+            arm.failures += 1
+        if latency is not None:
+            arm.latency_ewma = (
+                latency if arm.latency_ewma is None else self.ewma_alpha * latency + (1 - self.ewma_alpha) * arm.latency_ewma
+            )
+        total = arm.successes + arm.failures
+        if total > self.max_observations:
+            scale = self.max_observations / total
+            arm.successes *= scale
+            arm.failures *= scale
+
+    def load(self) -> None:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.arms = {key: ArmStats(**values) for key, values in data.get("arms", {}).items()}
+            logger.info(f"Loaded profile statistics for {len(self.arms)} arms from {self.state_file}")
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable profile state file {self.state_file}: {e}")
+            self.arms = {}
+
+    def save(self) -> None:
+        if not self.state_file:
+            return
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"arms": {key: asdict(arm) for key, arm in self.arms.items()}}, f, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.error(f"Failed to save profile state to {self.state_file}: {e}")
+
+
+def selector_from_settings(settings, profiles: list[str]) -> RoundRobinSelector | ThompsonSelector:
+    strategy = settings.get("TOR_PROFILE_STRATEGY", "round_robin")
+    if strategy == "round_robin":
+        return RoundRobinSelector(profiles)
+    if strategy == "thompson":
+        return ThompsonSelector(
+            profiles,
+            state_file=settings.get("TOR_PROFILE_STATE_FILE") or None,
+            per_lane=settings.getbool("TOR_PROFILE_PER_LANE", False),
+            latency_target=settings.getfloat("TOR_THROTTLE_TARGET_LATENCY", 5.0),
+        )
+    raise ValueError(f"Unknown TOR_PROFILE_STRATEGY {strategy!r}, expected 'round_robin' or 'thompson'")
@@ -0,0 +1,70 @@
+import random
+import time
+from collections import deque
+
+
+class RetryPolicy:
+    """Per-request retry budget with jittered exponential backoff ("full jitter")."""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_settings(cls, settings) -> "RetryPolicy":
+        return cls(
+            max_retries=settings.getint("TOR_MAX_RETRIES", 3),
+            base_delay=settings.getfloat("TOR_RETRY_BACKOFF_BASE", 1.0),
+            max_delay=settings.getfloat("TOR_RETRY_BACKOFF_MAX", 30.0),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (1-based)."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+class RetryBudget:
+    """
+    Global retry-rate cap over a sliding time window.
+
+    Retries are allowed while they stay under `ratio` of the requests seen in the
+    window, with `min_retries` always available so a quiet crawl can still retry.
+    This keeps a ban wave from turning into a retry storm.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window: float = 60.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+
+    @classmethod
+    def from_settings(cls, settings) -> "RetryBudget":
+        return cls(
+            ratio=settings.getfloat("TOR_RETRY_BUDGET_RATIO", 0.2),
+            min_retries=settings.getint("TOR_RETRY_BUDGET_MIN", 10),
+            window=settings.getfloat("TOR_RETRY_BUDGET_WINDOW", 60.0),
+        )
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._trim(now)
+        self._requests.append(now)
+
+    def try_acquire(self, now: float | None = None) -> bool:
+        """Takes one retry from the budget; False when the cap is reached."""
+        now = time.monotonic() if now is None else now
+        self._trim(now)
+        allowed = max(self.min_retries, self.ratio * len(self._requests))
+        if len(self._retries) >= allowed:
+            return False
+        self._retries.append(now)
+        return True
@@ -0,0 +1,90 @@
+import logging
+import time
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PageState:
+    interval: float
+    next_due: float
+    last_polled: float
+    links: set[str] = field(default_factory=set)
+    rate: float | None = None  # New article links per second (EWMA)
+    polls: int = 0
+
+
+class RevisitScheduler:
+    """
+    Decides when each listing page is polled again in continuous mode.
+
+    Every poll compares the page's article links with the previous poll; the new
+    ones per second since then feed an EWMA change rate, and the next interval is
+    the time the page needs to produce `target_new` new articles at that rate,
+    clamped to [`min_interval`, `max_interval`]. A poll that finds nothing new
+    doubles the interval, so quiet regional sections drift towards `max_interval`
+    while the front page is polled every few minutes.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 60.0,
+        max_interval: float = 3600.0,
+        initial_interval: float = 300.0,
+        target_new: float = 1.0,
+        alpha: float = 0.3,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.target_new = target_new
+        self.alpha = alpha
+        self.pages: dict[str, PageState] = {}
+
+    @classmethod
+    def from_settings(cls, settings) -> "RevisitScheduler":
+        return cls(
+            min_interval=settings.getfloat("ONET_REVISIT_MIN_INTERVAL", 60.0),
+            max_interval=settings.getfloat("ONET_REVISIT_MAX_INTERVAL", 3600.0),
+            initial_interval=settings.getfloat("ONET_REVISIT_INITIAL_INTERVAL", 300.0),
+            target_new=settings.getfloat("ONET_REVISIT_TARGET_NEW", 1.0),
+        )
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def observe(self, url: str, links: set[str], now: float | None = None) -> int:
+        """Records a poll of `url` that found `links`; returns how many of them are new."""
+        now = time.time() if now is None else now
+        page = self.pages.get(url)
+        if page is None:
+            # First sight only sets the baseline
+            interval = self._clamp(self.initial_interval)
+            self.pages[url] = PageState(interval=interval, next_due=now + interval, last_polled=now, links=links, polls=1)
+            return 0
+
+        new = len(links - page.links)
+        elapsed = max(1.0, now - page.last_polled)
+        sample = new / elapsed
+        page.rate = sample if page.rate is None else self.alpha * sample + (1 - self.alpha) * page.rate
+        if new:
+            page.interval = self._clamp(self.target_new / page.rate)
+        else:
+            page.interval = self._clamp(page.interval * 2)
+        page.links = links
+        page.last_polled = now
+        page.next_due = now + page.interval
+        page.polls += 1
+        logger.debug(f"RevisitScheduler: {url} had {new} new links, next poll in {page.interval:.0f}s")
+        return new
+
+    def due(self, now: float | None = None) -> list[str]:
+        """Pages to poll now, most overdue first."""
+        now = time.time() if now is None else now
+        ready = sorted((page.next_due, url) for url, page in self.pages.items() if page.next_due <= now)
+        for _, url in ready:
+            # Pushed back until the poll is observed, so a failed poll is retried one interval later
+            page = self.pages[url]
+            page.next_due = now + page.interval
+        return [url for _, url in ready]
@@ -0,0 +1,140 @@
+import logging
+import time
+from collections import deque
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IdentityUsage:
+    requests: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.started
+
+
+def survival_quantile(observations: "deque[tuple[float, bool]]", risk: float) -> float | None:
+    """
+    Kaplan-Meier estimate of the lifetime by which a `risk` share of identities is banned.
+
+    `observations` are (lifetime, banned) pairs; identities retired before a ban are
+    censored, i.e. only known to have lived at least that long. Returns None while
+    the data does not show that much risk yet.
+    """
+    survival = 1.0
+    ordered = sorted(observations)
+    at_risk = len(ordered)
+    index = 0
+    while index < len(ordered):
+        lifetime = ordered[index][0]
+        banned = retired = 0
+        while index < len(ordered) and ordered[index][0] == lifetime:
+            banned += ordered[index][1]
+            retired += not ordered[index][1]
+            index += 1
+        if banned:
+            survival *= 1 - banned / at_risk
+            if survival <= 1 - risk:
+                return lifetime
+        at_risk -= banned + retired
+    return None
+
+
+class RotationPolicy:
+    """
+    Retires Tor identities just before they are likely to be banned.
+
+    Every identity (lane circuit) counts its requests and age. When it gets banned,
+    both are recorded; identities retired without a ban are recorded as censored.
+    Once `min_bans` bans have been seen, the request count and age at which
+    `ban_risk` of identities are banned become the rotation limits, and an identity
+    is retired one request before its limit. Identities close to the limit
+    (`prewarm_fraction`) are reported so a spare circuit can be built in advance.
+
+    An age limit under `min_age_limit` seconds is ignored: identities banned that
+    quickly were banned for what they requested, which the request limit covers.
+    """
+
+    def __init__(
+        self,
+        ban_risk: float = 0.1,
+        min_bans: int = 5,
+        history: int = 100,
+        prewarm_fraction: float = 0.8,
+        min_age_limit: float = 30.0,
+    ):
+        self.ban_risk = ban_risk
+        self.min_bans = min_bans
+        self.prewarm_fraction = prewarm_fraction
+        self.min_age_limit = min_age_limit
+        self._by_requests: deque[tuple[float, bool]] = deque(maxlen=history)
+        self._by_age: deque[tuple[float, bool]] = deque(maxlen=history)
+        self._usage: dict[Hashable, IdentityUsage] = {}
+        self.request_limit: float | None = None
+        self.age_limit: float | None = None
+        self.bans = 0
+        self.retired = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> "RotationPolicy":
+        return cls(
+            ban_risk=settings.getfloat("TOR_ROTATION_BAN_RISK", 0.1),
+            min_bans=settings.getint("TOR_ROTATION_MIN_BANS", 5),
+            history=settings.getint("TOR_ROTATION_HISTORY", 100),
+        )
+
+    def usage(self, circuit: Hashable) -> IdentityUsage:
+        usage = self._usage.get(circuit)
+        if usage is None:
+            usage = self._usage[circuit] = IdentityUsage()
+        return usage
+
+    def on_request(self, circuit: Hashable) -> None:
+        self.usage(circuit).requests += 1
+
+    def on_ban(self, circuit: Hashable) -> None:
+        usage = self._usage.pop(circuit, None)
+        if usage is None:
+            return
+        self.bans += 1
+        self._record(usage, banned=True)
+
+    def on_retire(self, circuit: Hashable) -> None:
+        """The identity was rotated for any reason other than a ban it recorded."""
+        usage = self._usage.pop(circuit, None)
+        if usage is None or not usage.requests:
+            return
+        self.retired += 1
+        self._record(usage, banned=False)
+
+    def _record(self, usage: IdentityUsage, banned: bool) -> None:
+        self._by_requests.append((usage.requests, banned))
+        self._by_age.append((usage.age, banned))
+        if sum(banned for _, banned in self._by_requests) < self.min_bans:
+            self.request_limit = self.age_limit = None
+            return
+        self.request_limit = survival_quantile(self._by_requests, self.ban_risk)
+        self.age_limit = survival_quantile(self._by_age, self.ban_risk)
+        logger.debug(f"RotationPolicy: limits requests={self.request_limit} age={self.age_limit}")
+
+    def _fraction_used(self, circuit: Hashable) -> float:
+        usage = self._usage.get(circuit)
+        if usage is None:
+            return 0.0
+        fractions = [0.0]
+        if self.request_limit is not None:
+            # The request about to be sent counts too
+            fractions.append((usage.requests + 1) / max(1.0, self.request_limit - 1))
+        if self.age_limit is not None and self.age_limit >= self.min_age_limit:
+            fractions.append(usage.age / self.age_limit)
+        return max(fractions)
+
+    def should_rotate(self, circuit: Hashable) -> bool:
+        return self._fraction_used(circuit) > 1.0
+
+    def should_prewarm(self, circuit: Hashable) -> bool:
+        return self._fraction_used(circuit) >= self.prewarm_fraction
@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTES: list[dict[str, Any]] = [
+    # Section front pages and their pagination: cheap to fetch, rarely protected
+    {"name": "listing", "pattern": r"^https?://wiadomosci\.onet\.pl/([a-z0-9-]+/?)?(\?.*)?$", "direct": True},
+    {"name": "article", "pattern": r"wiadomosci\.onet\.pl/[a-z0-9-]+/[a-z0-9-]+/[a-z0-9]+", "direct": False},
+]
+
+
+@dataclass
+class Route:
+    name: str
+    pattern: re.Pattern
+    direct: bool = False
+    demoted: bool = False
+    strikes: int = 0
+
+    @property
+    def via_direct(self) -> bool:
+        return self.direct and not self.demoted
+
+
+class RouteTable:
+    """
+    Classifies URLs into routes and decides which ones may skip Tor.
+
+    A route marked `direct` is tried on the direct lane (no proxy, or a local
+    non-Tor proxy) first. Once it collects `demote_after` block signals (403/503
+    or a soft-ban redirect) it is demoted to Tor for good; demotions are kept in a
+    JSON state file so the next run does not have to rediscover them.
+    URLs matching no route go through Tor.
+    """
+
+    def __init__(self, routes: list[Route], demote_after: int = 1, state_file: str | None = None):
+        self.routes = routes
+        self.demote_after = demote_after
+        self.state_file = state_file
+        self.fallback = Route(name="other", pattern=re.compile(""))
+        self.load()
+
+    @classmethod
+    def from_settings(cls, settings) -> "RouteTable":
+        specs = settings.getlist("TOR_ROUTES") or DEFAULT_ROUTES
+        routes = [Route(spec["name"], re.compile(spec["pattern"]), direct=spec.get("direct", False)) for spec in specs]
+        return cls(
+            routes,
+            demote_after=settings.getint("TOR_ROUTE_DEMOTE_AFTER", 1),
+            state_file=settings.get("TOR_ROUTE_STATE_FILE") or None,
+        )
+
+    def classify(self, url: str) -> Route:
+        for route in self.routes:
+            if route.pattern.search(url):
+                return route
+        return self.fallback
+
+    def on_block(self, route: Route) -> bool:
+        """Records a block signal seen on the direct lane; returns True if the route was just demoted."""
+        route.strikes += 1
+        if route.demoted or route.strikes < self.demote_after:
+            return False
+        route.demoted = True
+        logger.warning(f"RouteTable: route '{route.name}' demoted to Tor after {route.strikes} block(s)")
+        self.save()
+        return True
+
+    def load(self) -> None:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                demoted = set(json.load(f).get("demoted", []))
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable route state file {self.state_file}: {e}")
+            return
+        for route in self.routes:
+            route.demoted = route.name in demoted
+
+    def save(self) -> None:
+        if not self.state_file:
+            return
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.state_file, "w", encoding="utf-8") as f:
+                json.dump({"demoted": sorted(route.name for route in self.routes if route.demoted)}, f, indent=2)
+        except OSError as e:
+            logger.error(f"Failed to save route state to {self.state_file}: {e}")
@@ -0,0 +1,83 @@
+import logging
+import os
+import re
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Trailing path segment of an article URL, e.g. .../tytul-artykulu/xyz123
+URL_ID_PATTERN = re.compile(r"/([a-z0-9]+)$")
+
+
+def article_keys(url: str, article_id: str | None = None) -> list[str]:
+    """
+    Store keys for one article: its canonical URL (host and path, without scheme,
+    query or fragment) and its ID, both the explicit one and the one in the URL.
+    """
+    parts = urlsplit(url)
+    path = parts.path.rstrip("/")
+    keys = [f"url:{parts.netloc.lower()}{path}"]
+    match = URL_ID_PATTERN.search(path)
+    for candidate in (article_id, match.group(1) if match else None):
+        if candidate and f"id:{candidate}" not in keys:
+            keys.append(f"id:{candidate}")
+    return keys
+
+
+class SeenStore:
+    """
+    Articles saved by earlier runs, kept in SQLite so later runs do not download them again.
+
+    Entries expire after `ttl` seconds. By then an article has left the freshness
+    window, so it would be skipped anyway, and the store stays small.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        if path != ":memory:":
+            # Pipeline and spider hold separate connections to the same file
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+        self.purge()
+
+    @classmethod
+    def from_settings(cls, settings) -> "SeenStore | None":
+        path = settings.get("ONET_SEEN_STORE")
+        if not path:
+            return None
+        return cls(path, ttl=settings.getfloat("ONET_SEEN_TTL_DAYS", 4) * 86400)
+
+    def add(self, keys: list[str], now: float | None = None) -> None:
+        now = time.time() if now is None else now
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO seen (key, seen_at) VALUES (?, ?)", [(key, now) for key in keys])
+
+    def contains_any(self, keys: list[str], now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        placeholders = ",".join("?" * len(keys))
+        row = self.conn.execute(
+            f"SELECT 1 FROM seen WHERE key IN ({placeholders}) AND seen_at > ? LIMIT 1", [*keys, now - self.ttl]
+        ).fetchone()
+        return row is not None
+
+    def purge(self, now: float | None = None) -> int:
+        now = time.time() if now is None else now
+        with self.conn:
+            removed = self.conn.execute("DELETE FROM seen WHERE seen_at <= ?", (now - self.ttl,)).rowcount
+        if removed:
+            logger.debug(f"SeenStore: expired {removed} entries from {self.path}")
+        return removed
+
+    def __len__(self) -> int:
+        return int(self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0])
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,260 @@
+import logging
+import threading
+import time
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from curl_cffi import requests as curl_requests
+from curl_cffi.const import CurlInfo
+
+logger = logging.getLogger(__name__)
+
+# Key of a pooled session: (browser profile, circuit identifier)
+PoolKey = tuple[str, Hashable]
+
+# Connection reuse counter plus the timings TorMiddleware records per transfer
+CURL_INFOS = [
+    CurlInfo.NUM_CONNECTS,
+    CurlInfo.CONNECT_TIME,
+    CurlInfo.APPCONNECT_TIME,
+    CurlInfo.STARTTRANSFER_TIME,
+    CurlInfo.TOTAL_TIME,
+]
+
+
+class _PoolCounters:
+    """Connection reuse counters shared by the threaded and asyncio pools."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_reused = 0
+        self.sessions_created = 0
+        self.sessions_evicted = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.connections_reused / self.requests if self.requests else 0.0
+
+    def _record(self, response: Any) -> None:
+        self.requests += 1
+        if response is None:
+            return
+        # libcurl reports 0 new connections when the transfer reused a live one
+        num_connects = getattr(response, "infos", {}).get(CurlInfo.NUM_CONNECTS)
+        if num_connects == 0:
+            self.connections_reused += 1
+
+
+class SessionPool(_PoolCounters):
+    """
+    Keep-alive pool of curl_cffi sessions keyed by (browser profile, circuit).
+
+    A curl handle is not thread-safe, so sessions are checked out exclusively and
+    returned after the transfer. Reusing a session keeps its SOCKS + TLS connection
+    through the Tor circuit alive, which saves several round-trips per request.
+    """
+
+    def __init__(
+        self,
+        proxy: str,
+        max_idle: float = 60.0,
+        max_sessions: int = 32,
+        session_factory: Callable[..., Any] | None = None,
+    ):
+        super().__init__()
+        self.proxy = proxy
+        self.max_idle = max_idle
+        self.max_sessions = max_sessions
+        self._session_factory = session_factory or curl_requests.Session
+        self._idle: dict[PoolKey, list[tuple[Any, float]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings, proxy: str) -> "SessionPool":
+        return cls(
+            proxy=proxy,
+            max_idle=settings.getfloat("TOR_SESSION_MAX_IDLE", 60.0),
+            max_sessions=settings.getint("TOR_SESSION_POOL_SIZE", 32),
+        )
+
+    def _new_session(self, profile: str, proxy: str) -> Any:
+        with self._lock:
+            self.sessions_created += 1
+        return self._session_factory(
+            impersonate=profile,
+            # An empty proxy means a direct connection
+            proxies={"http": proxy, "https": proxy} if proxy else None,
+            curl_infos=CURL_INFOS,
+        )
+
+    def acquire(self, profile: str, circuit: Hashable = 0, proxy: str | None = None) -> Any:
+        """Checks out an idle session for the key or creates a new one."""
+        key = (profile, circuit)
+        with self._lock:
+            self._evict_idle_locked(time.monotonic())
+            idle = self._idle.get(key)
+            if idle:
+                session, _ = idle.pop()
+                return session
+        return self._new_session(profile, self.proxy if proxy is None else proxy)
+
+    def release(self, profile: str, circuit: Hashable, session: Any, response: Any = None) -> None:
+        """Returns a session to the pool and records whether its connection was reused."""
+        key = (profile, circuit)
+        with self._lock:
+            self._record(response)
+            if self._idle_count_locked() >= self.max_sessions:
+                self._close(session)
+                self.sessions_evicted += 1
+                return
+            self._idle.setdefault(key, []).append((session, time.monotonic()))
+
+    def discard(self, session: Any) -> None:
+        """Drops a session whose connection may be broken (timeout, proxy error)."""
+        with self._lock:
+            self.requests += 1
+        self._close(session)
+
+    def close_circuit(self, circuit: Hashable) -> None:
+        """Tears down every idle session bound to a circuit (e.g. after NEWNYM)."""
+        with self._lock:
+            keys = [key for key in self._idle if key[1] == circuit]
+            sessions = [session for key in keys for session, _ in self._idle.pop(key)]
+        for session in sessions:
+            self._close(session)
+        if sessions:
+            logger.debug(f"SessionPool: closed {len(sessions)} sessions for circuit {circuit!r}")
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions = [session for idle in self._idle.values() for session, _ in idle]
+            self._idle.clear()
+        for session in sessions:
+            self._close(session)
+
+    def evict_idle(self, now: float | None = None) -> None:
+        with self._lock:
+            self._evict_idle_locked(time.monotonic() if now is None else now)
+
+    def _evict_idle_locked(self, now: float) -> None:
+        for key in list(self._idle):
+            fresh = []
+            for session, released_at in self._idle[key]:
+                if now - released_at > self.max_idle:
+                    self._close(session)
+                    self.sessions_evicted += 1
+                else:
+                    fresh.append((session, released_at))
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+
+    def _idle_count_locked(self) -> int:
+        return sum(len(idle) for idle in self._idle.values())
+
+    @staticmethod
+    def _close(session: Any) -> None:
+        try:
+            session.close()
+        except Exception as e:
+            logger.debug(f"SessionPool: error closing session: {e}")
+
+
+class AsyncSessionPool(_PoolCounters):
+    """
+    Pool of curl_cffi AsyncSessions keyed by (browser profile, circuit).
+
+    An AsyncSession multiplexes many transfers on one curl multi handle, so a single
+    session per key is shared by all concurrent requests; no checkout is needed.
+    Transfers still report back through `release`, so a session is only evicted
+    once nothing uses it and it has been idle for `max_idle` seconds. Closing a
+    session aborts its transfers, so sessions of a retired circuit that are still
+    in use are closed by the first `evict_idle` after their last transfer ends.
+    """
+
+    def __init__(
+        self,
+        proxy: str,
+        max_idle: float = 60.0,
+        max_clients: int = 10,
+        session_factory: Callable[..., Any] | None = None,
+    ):
+        super().__init__()
+        self.proxy = proxy
+        self.max_idle = max_idle
+        self.max_clients = max_clients
+        self._session_factory = session_factory or curl_requests.AsyncSession
+        self._sessions: dict[PoolKey, Any] = {}
+        self._last_used: dict[PoolKey, float] = {}
+        self._active: dict[PoolKey, int] = {}
+        # Sessions of retired circuits waiting for their transfers to end
+        self._retired: set[PoolKey] = set()
+
+    @classmethod
+    def from_settings(cls, settings, proxy: str) -> "AsyncSessionPool":
+        return cls(
+            proxy=proxy,
+            max_idle=settings.getfloat("TOR_SESSION_MAX_IDLE", 60.0),
+            max_clients=settings.getint("TOR_ASYNC_MAX_PER_CIRCUIT", 8),
+        )
+
+    def get(self, profile: str, circuit: Hashable = 0, proxy: str | None = None) -> Any:
+        key = (profile, circuit)
+        session = self._sessions.get(key)
+        if session is None:
+            self.sessions_created += 1
+            proxy = self.proxy if proxy is None else proxy
+            session = self._session_factory(
+                impersonate=profile,
+                # An empty proxy means a direct connection
+                proxies={"http": proxy, "https": proxy} if proxy else None,
+                curl_infos=CURL_INFOS,
+                max_clients=self.max_clients,
+            )
+            self._sessions[key] = session
+        self._last_used[key] = time.monotonic()
+        self._active[key] = self._active.get(key, 0) + 1
+        return session
+
+    def release(self, profile: str, circuit: Hashable = 0, response: Any = None) -> None:
+        """Ends a transfer started with `get` and records whether its connection was reused."""
+        key = (profile, circuit)
+        self._record(response)
+        active = self._active.pop(key, 0) - 1
+        if active > 0:
+            self._active[key] = active
+        if key in self._sessions:
+            self._last_used[key] = time.monotonic()
+
+    async def close_circuit(self, circuit: Hashable) -> None:
+        """Closes a circuit's sessions; ones with transfers still running are closed once those end."""
+        for key in [key for key in self._sessions if key[1] == circuit]:
+            if self._active.get(key):
+                self._retired.add(key)
+            else:
+                await self._close_key(key)
+
+    async def close_all(self) -> None:
+        for key in list(self._sessions):
+            await self._close_key(key)
+
+    async def evict_idle(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        for key in [key for key in self._retired if not self._active.get(key)]:
+            await self._close_key(key)
+        for key, last_used in list(self._last_used.items()):
+            if now - last_used > self.max_idle and not self._active.get(key):
+                await self._close_key(key)
+                self.sessions_evicted += 1
+
+    async def _close_key(self, key: PoolKey) -> None:
+        session = self._sessions.pop(key, None)
+        self._last_used.pop(key, None)
+        self._retired.discard(key)
+        if session is None:
+            return
+        try:
+            await session.close()
+        except Exception as e:
+            logger.debug(f"AsyncSessionPool: error closing session: {e}")
@@ -0,0 +1,107 @@
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ThrottleState:
+    delay: float
+    concurrency: int
+    latency_ewma: float | None = None
+    healthy_streak: int = 0
+    increases: int = 0
+    decreases: int = 0
+
+
+class AimdThrottle:
+    """
+    Additive-increase / multiplicative-decrease throttle, tracked per lane.
+
+    While responses are healthy and latency stays under the target, every `window`
+    responses add one concurrent slot and take `delay_step` seconds off the delay.
+    A ban (403/503/soft ban) or a connection error halves concurrency and multiplies
+    the delay by `backoff_factor`. Latency above the target only stops the increase,
+    so a slow exit does not get hammered but is not punished like a ban either.
+    """
+
+    def __init__(
+        self,
+        start_delay: float = 2.0,
+        start_concurrency: int = 1,
+        min_delay: float = 0.5,
+        max_delay: float = 30.0,
+        max_concurrency: int = 4,
+        target_latency: float = 5.0,
+        delay_step: float = 0.25,
+        backoff_factor: float = 2.0,
+        window: int = 10,
+        ewma_alpha: float = 0.3,
+    ):
+        self.start_delay = start_delay
+        self.start_concurrency = start_concurrency
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.delay_step = delay_step
+        self.backoff_factor = backoff_factor
+        self.window = window
+        self.ewma_alpha = ewma_alpha
+        self.states: dict[str, ThrottleState] = {}
+
+    @classmethod
+    def from_settings(cls, settings) -> "AimdThrottle":
+        return cls(
+            start_delay=settings.getfloat("TOR_LANE_DELAY", 2.0),
+            start_concurrency=settings.getint("TOR_LANE_CONCURRENCY", 1),
+            min_delay=settings.getfloat("TOR_THROTTLE_MIN_DELAY", 0.5),
+            max_delay=settings.getfloat("TOR_THROTTLE_MAX_DELAY", 30.0),
+            max_concurrency=settings.getint("TOR_THROTTLE_MAX_CONCURRENCY", 4),
+            target_latency=settings.getfloat("TOR_THROTTLE_TARGET_LATENCY", 5.0),
+            delay_step=settings.getfloat("TOR_THROTTLE_DELAY_STEP", 0.25),
+            backoff_factor=settings.getfloat("TOR_THROTTLE_BACKOFF_FACTOR", 2.0),
+            window=settings.getint("TOR_THROTTLE_WINDOW", 10),
+        )
+
+    def state(self, key: str) -> ThrottleState:
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = ThrottleState(delay=self.start_delay, concurrency=self.start_concurrency)
+        return state
+
+    def seed(self, key: str, delay: float, concurrency: int) -> ThrottleState:
+        """Starts a key from its own budget instead of `start_delay` / `start_concurrency`."""
+        state = self.states[key] = ThrottleState(delay=delay, concurrency=concurrency)
+        return state
+
+    def on_success(self, key: str, latency: float) -> ThrottleState:
+        state = self.state(key)
+        if state.latency_ewma is None:
+            state.latency_ewma = latency
+        else:
+            state.latency_ewma = self.ewma_alpha * latency + (1 - self.ewma_alpha) * state.latency_ewma
+
+        if state.latency_ewma > self.target_latency:
+            state.healthy_streak = 0
+            return state
+
+        state.healthy_streak += 1
+        if state.healthy_streak >= self.window:
+            state.healthy_streak = 0
+            new_concurrency = min(self.max_concurrency, state.concurrency + 1)
+            new_delay = max(self.min_delay, state.delay - self.delay_step)
+            if (new_concurrency, new_delay) != (state.concurrency, state.delay):
+                state.concurrency, state.delay = new_concurrency, new_delay
+                state.increases += 1
+                logger.debug(f"AimdThrottle: {key} up -> delay={state.delay:.2f}s concurrency={state.concurrency}")
+        return state
+
+    def on_ban(self, key: str) -> ThrottleState:
+        state = self.state(key)
+        state.healthy_streak = 0
+        state.concurrency = max(1, state.concurrency // 2)
+        state.delay = min(self.max_delay, max(state.delay, self.min_delay) * self.backoff_factor)
+        state.decreases += 1
+        logger.info(f"AimdThrottle: {key} backoff -> delay={state.delay:.2f}s concurrency={state.concurrency}")
+        return state
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+import time
+
+from onet_scraper.utils.tor_control import TorController
+
+logger = logging.getLogger(__name__)
+
+
+class TorUnavailable(Exception):
+    """Tor could neither be reached nor started."""
+
+
+class TorBootstrap:
+    """
+    Attaches to a running Tor or launches one, without blocking the reactor.
+
+    The SOCKS port is probed once. If nothing listens there, Tor is started from
+    the configured binary, `tor` on PATH or the legacy `tor/tor.exe`, and its
+    output is read until the control listener is open. Readiness is then taken
+    from the control port's bootstrap status events: the first usable circuit,
+    not an open port, ends the wait. Concurrent callers share one bootstrap.
+    """
+
+    def __init__(
+        self,
+        socks_host: str,
+        socks_port: int,
+        controller: TorController,
+        binary: str | None = None,
+        torrc: str = "torrc",
+        timeout: float = 60.0,
+    ):
+        self.socks_host = socks_host
+        self.socks_port = socks_port
+        self.controller = controller
+        self.binary = binary
+        self.torrc = torrc
+        self.timeout = timeout
+        self.process: asyncio.subprocess.Process | None = None
+        self.seconds: float | None = None
+        self._ready: asyncio.Future | None = None
+        self._drain_task: asyncio.Task | None = None
+
+    @property
+    def launched(self) -> bool:
+        return self.process is not None
+
+    def find_binary(self) -> str | None:
+        if self.binary:
+            return shutil.which(self.binary) or (self.binary if os.path.exists(self.binary) else None)
+        legacy = os.path.abspath(os.path.join("tor", "tor.exe"))
+        return shutil.which("tor") or (legacy if os.path.exists(legacy) else None)
+
+    def start(self) -> asyncio.Future:
+        """Starts the bootstrap in the background (once)."""
+        if self._ready is None:
+            self._ready = asyncio.ensure_future(self._bootstrap())
+            # The outcome is re-raised to every waiter; do not also report it as unretrieved
+            self._ready.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return self._ready
+
+    async def ensure_ready(self) -> None:
+        """Returns once Tor has a usable circuit; raises TorUnavailable if it never gets one."""
+        # Shielded so one cancelled request cannot abort the bootstrap everybody waits for
+        await asyncio.shield(self.start())
+
+    async def _bootstrap(self) -> None:
+        started = time.monotonic()
+        if await self._socks_open():
+            logger.info(f"Tor is already running at {self.socks_host}:{self.socks_port}, attaching.")
+        else:
+            logger.warning(f"Tor is NOT running at {self.socks_host}:{self.socks_port}. Starting it...")
+            await self._launch()
+
+        try:
+            established = await self.controller.wait_until_established(self.timeout)
+        except Exception as e:
+            if self.launched:
+                raise TorUnavailable(f"Tor was started but its control port is unusable: {e}") from e
+            # An attached Tor without a reachable control port (e.g. another container) is taken as is
+            logger.warning(f"Tor control port unavailable ({e}); assuming the running Tor is bootstrapped.")
+            established = True
+
+        if not established:
+            raise TorUnavailable(f"Tor did not establish a circuit within {self.timeout:.0f}s")
+        self.seconds = time.monotonic() - started
+        logger.info(f"Tor is ready after {self.seconds:.1f}s.")
+
+    async def _socks_open(self) -> bool:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(self.socks_host, self.socks_port), 1.0)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+    async def _launch(self) -> None:
+        binary = self.find_binary()
+        if binary is None:
+            raise TorUnavailable("Could not find a Tor binary (TOR_BINARY, 'tor' on PATH or tor/tor.exe)")
+
+        logger.info(f"Starting Tor from: {binary}")
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                binary,
+                "-f",
+                self.torrc,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+        except OSError as e:
+            raise TorUnavailable(f"Failed to launch Tor: {e}") from e
+
+        # The control listener opens within a second of start; bootstrap progress is followed from there
+        try:
+            await asyncio.wait_for(self._read_until("Opened Control listener"), self.timeout)
+        except asyncio.TimeoutError as e:
+            raise TorUnavailable(f"Tor did not open its control port within {self.timeout:.0f}s") from e
+        # Keep reading so Tor never blocks on a full pipe
+        self._drain_task = asyncio.ensure_future(self._read_until(None))
+
+    async def _read_until(self, marker: str | None) -> None:
+        assert self.process is not None and self.process.stdout is not None
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                if marker is not None:
+                    raise TorUnavailable(f"Tor exited with code {await self.process.wait()}")
+                return
+            text = line.decode(errors="replace").rstrip()
+            logger.debug(f"tor: {text}")
+            if marker is not None and marker in text:
+                return
+
+    async def close(self) -> None:
+        """Stops the Tor process if this bootstrap started it."""
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), 10.0)
+            except asyncio.TimeoutError:
+                self.process.kill()
+        if self._drain_task is not None:
+            # Ends by itself at EOF now that Tor is gone
+            try:
+                await asyncio.wait_for(self._drain_task, 5.0)
+            except asyncio.TimeoutError:
+                pass
+            self._drain_task = None
+        self.process = None
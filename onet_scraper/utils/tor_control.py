@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any
+
+from stem import CircStatus, Signal
+from stem.control import Controller, EventType
+
+logger = logging.getLogger(__name__)
+
+
+class TorController:
+    """
+    Long-lived, authenticated Tor control connection with coalesced NEWNYM.
+
+    Concurrent renewal requests share one in-flight NEWNYM. Before signalling, the
+    controller waits out Tor's NEWNYM rate limit; afterwards it waits until a new
+    circuit has been built so callers do not retry on a circuit that is not there yet.
+    """
+
+    def __init__(
+        self,
+        control_port: int = 9051,
+        password: str | None = None,
+        host: str = "127.0.0.1",
+        circuit_timeout: float = 10.0,
+    ):
+        self.control_port = control_port
+        self.password = password
+        self.host = host
+        self.circuit_timeout = circuit_timeout
+        self._controller: Any = None
+        self._lock = threading.Lock()
+        self._inflight: asyncio.Future | None = None
+        self._last_circuit_built = 0.0
+        self.last_renewal = 0.0
+        self.bootstrap_progress = 0
+
+        # Counters exposed to Scrapy stats
+        self.renewals_requested = 0
+        self.renewals_sent = 0
+        self.renewals_failed = 0
+
+    @property
+    def renewals_coalesced(self) -> int:
+        return self.renewals_requested - self.renewals_sent - self.renewals_failed
+
+    def _connect(self) -> Any:
+        """Returns the live controller, (re)connecting and authenticating when needed."""
+        with self._lock:
+            controller = self._controller
+            if controller is not None and controller.is_alive():
+                return controller
+            controller = Controller.from_port(address=self.host, port=self.control_port)
+            if self.password:
+                controller.authenticate(password=self.password)
+            else:
+                controller.authenticate()  # Cookie auth
+            controller.add_event_listener(self._on_circuit_event, EventType.CIRC)
+            self._controller = controller
+            return controller
+
+    def _on_circuit_event(self, event: Any) -> None:
+        # Called from stem's event thread
+        if event.status == CircStatus.BUILT:
+            self._last_circuit_built = time.monotonic()
+
+    def _sync_newnym_wait(self) -> float:
+        return float(self._connect().get_newnym_wait())
+
+    def _sync_signal_newnym(self) -> None:
+        self._connect().signal(Signal.NEWNYM)
+
+    def close(self) -> None:
+        with self._lock:
+            controller, self._controller = self._controller, None
+        if controller is not None:
+            try:
+                controller.close()
+            except Exception as e:
+                logger.debug(f"TorController: error closing control connection: {e}")
+
+    async def renew(self) -> bool:
+        """Requests a new identity, joining the renewal already in flight if there is one."""
+        self.renewals_requested += 1
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._renew())
+        # Shielded so one cancelled waiter cannot abort the NEWNYM everybody shares
+        return await asyncio.shield(self._inflight)
+
+    async def _renew(self) -> bool:
+        try:
+            wait = await asyncio.to_thread(self._sync_newnym_wait)
+            if wait > 0:
+                logger.debug(f"TorController: NEWNYM rate limited, waiting {wait:.1f}s")
+                await asyncio.sleep(wait)
+            signalled_at = time.monotonic()
+            await asyncio.to_thread(self._sync_signal_newnym)
+            self.renewals_sent += 1
+            await self._wait_for_circuit(signalled_at)
+            self.last_renewal = time.monotonic()
+            return True
+        except Exception as e:
+            self.renewals_failed += 1
+            logger.error(f"Failed to renew Tor identity: {e}")
+            # The connection may be broken; reconnect on the next renewal
+            self.close()
+            return False
+
+    async def wait_until_established(self, timeout: float = 60.0) -> bool:
+        """
+        Waits until Tor reports a usable circuit, following STATUS_CLIENT events
+        (bootstrap progress, CIRCUIT_ESTABLISHED) rather than polling the SOCKS port.
+        Returns False if that does not happen within `timeout` seconds.
+        """
+        controller = await asyncio.to_thread(self._connect)
+        loop = asyncio.get_running_loop()
+        established = asyncio.Event()
+
+        def on_status(event: Any) -> None:
+            if event.action == "BOOTSTRAP":
+                progress = int(event.arguments.get("PROGRESS", 0))
+                if progress > self.bootstrap_progress:
+                    self.bootstrap_progress = progress
+                    logger.info(f"Tor bootstrap {progress}%: {event.arguments.get('SUMMARY', '')}")
+                if progress >= 100:
+                    established.set()
+            elif event.action == "CIRCUIT_ESTABLISHED":
+                established.set()
+
+        def listener(event: Any) -> None:
+            # Called from stem's event thread
+            loop.call_soon_threadsafe(on_status, event)
+
+        # Subscribe before asking, so an event fired in between is not lost
+        await asyncio.to_thread(controller.add_event_listener, listener, EventType.STATUS_CLIENT)
+        try:
+            if await asyncio.to_thread(controller.get_info, "status/circuit-established", "0") == "1":
+                self.bootstrap_progress = 100
+                return True
+            await asyncio.wait_for(established.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            await asyncio.to_thread(controller.remove_event_listener, listener)
+
+    async def _wait_for_circuit(self, since: float) -> None:
+        deadline = time.monotonic() + self.circuit_timeout
+        while self._last_circuit_built <= since and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
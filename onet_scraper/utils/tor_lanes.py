@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TorLane:
+    """
+    One independent Tor exit identity with its own delay budget and ban state.
+
+    A lane is either a separate SOCKS port/instance (rotated with NEWNYM on its own
+    control port) or an isolated stream group on a shared instance: Tor puts streams
+    with different SOCKS credentials on different circuits (IsolateSOCKSAuth), so
+    such a lane rotates simply by switching to fresh credentials.
+    """
+
+    name: str
+    proxy: str
+    control_port: int | None = None
+    isolation: bool = False
+    delay: float = 2.0
+    max_in_flight: int = 1
+
+    generation: int = 0
+    rotated_at: float = 0.0
+    in_flight: int = 0
+    next_slot: float = 0.0
+    requests: int = 0
+    bans: int = 0
+
+    @property
+    def circuit(self) -> tuple[str, int]:
+        """Identifier of the lane's current circuit, used to key pooled sessions."""
+        return (self.name, self.generation)
+
+    @property
+    def proxy_url(self) -> str:
+        return self.proxy_url_for(self.generation)
+
+    def proxy_url_for(self, generation: int) -> str:
+        if not self.isolation:
+            return self.proxy
+        scheme, _, host_port = self.proxy.rpartition("://")
+        credentials = f"{self.name}-{generation}:x"
+        return f"{scheme}://{credentials}@{host_port}" if scheme else f"{credentials}@{host_port}"
+
+
+class LanePool:
+    """
+    Dispatches requests across Tor lanes.
+
+    Each lane admits at most `max_in_flight` requests and one new request per `delay`
+    seconds, so aggregate throughput grows with the number of lanes while the
+    per-identity politeness budget stays the same.
+    """
+
+    def __init__(self, lanes: list[TorLane], ban_cooldown: float = 5.0, randomize_delay: bool = True):
+        if not lanes:
+            raise ValueError("LanePool needs at least one lane")
+        self.lanes = lanes
+        self.ban_cooldown = ban_cooldown
+        self.randomize_delay = randomize_delay
+        self._released: asyncio.Event | None = None
+
+    @classmethod
+    def from_settings(cls, settings, tor_proxy: str, control_port: int) -> "LanePool":
+        delay = settings.getfloat("TOR_LANE_DELAY", 2.0)
+        max_in_flight = settings.getint("TOR_LANE_CONCURRENCY", 1)
+        lanes: list[TorLane] = []
+
+        for index, spec in enumerate(settings.getlist("TOR_LANES", [])):
+            # Either "socks5h://host:port" or {"proxy": ..., "control_port": ...}
+            spec = spec if isinstance(spec, dict) else {"proxy": spec}
+            lanes.append(
+                TorLane(
+                    name=spec.get("name", f"lane{index}"),
+                    proxy=spec["proxy"],
+                    control_port=spec.get("control_port"),
+                    isolation=spec.get("isolation", False),
+                    delay=delay,
+                    max_in_flight=max_in_flight,
+                )
+            )
+
+        if not lanes:
+            isolation = settings.getbool("TOR_LANE_ISOLATION", False)
+            count = max(1, settings.getint("TOR_LANE_COUNT", 1)) if isolation else 1
+            lanes = [
+                TorLane(
+                    name=f"lane{index}",
+                    proxy=tor_proxy,
+                    control_port=control_port,
+                    isolation=isolation,
+                    delay=delay,
+                    max_in_flight=max_in_flight,
+                )
+                for index in range(count)
+            ]
+
+        return cls(
+            lanes,
+            ban_cooldown=settings.getfloat("TOR_LANE_BAN_COOLDOWN", 5.0),
+            randomize_delay=settings.getbool("RANDOMIZE_DOWNLOAD_DELAY", True),
+        )
+
+    @property
+    def default(self) -> TorLane:
+        return self.lanes[0]
+
+    def _event(self) -> asyncio.Event:
+        if self._released is None:
+            self._released = asyncio.Event()
+        return self._released
+
+    def _pick(self, exclude: Any) -> TorLane | None:
+        candidates = [lane for lane in self.lanes if lane.in_flight < lane.max_in_flight and lane.name not in exclude]
+        if not candidates:
+            # Excluding lanes is a preference, never a reason to stall
+            candidates = [lane for lane in self.lanes if lane.in_flight < lane.max_in_flight]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda lane: (lane.next_slot, lane.in_flight))
+
+    async def acquire(self, exclude: Any = ()) -> TorLane:
+        """Reserves a slot on the lane that can send soonest and waits for that slot."""
+        while True:
+            lane = self._pick(exclude)
+            if lane is not None:
+                break
+            event = self._event()
+            event.clear()
+            await event.wait()
+
+        now = time.monotonic()
+        slot = self._reserve(lane, now)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        return lane
+
+    def try_acquire(self, exclude: Any = ()) -> TorLane | None:
+        """Reserves a slot on a lane outside `exclude` that can send right now; None if there is none."""
+        now = time.monotonic()
+        candidates = [
+            lane
+            for lane in self.lanes
+            if lane.name not in exclude and lane.in_flight < lane.max_in_flight and lane.next_slot <= now
+        ]
+        if not candidates:
+            return None
+        lane = min(candidates, key=lambda lane: (lane.next_slot, lane.in_flight))
+        self._reserve(lane, now)
+        return lane
+
+    def _reserve(self, lane: TorLane, now: float) -> float:
+        """Takes the lane's next slot and returns when it opens."""
+        slot = max(now, lane.next_slot)
+        delay = lane.delay * random.uniform(0.5, 1.5) if self.randomize_delay else lane.delay
+        lane.next_slot = slot + delay
+        lane.in_flight += 1
+        lane.requests += 1
+        return slot
+
+    def release(self, lane: TorLane) -> None:
+        lane.in_flight = max(0, lane.in_flight - 1)
+        self._event().set()
+
+    def rotate(self, lane: TorLane, cooldown: bool = True) -> tuple[str, int]:
+        """Moves a lane to a new circuit and returns the circuit it left."""
+        old_circuit = lane.circuit
+        lane.generation += 1
+        lane.rotated_at = time.monotonic()
+        if cooldown:
+            # Give the new circuit a moment before the lane takes traffic again
+            lane.next_slot = max(lane.next_slot, time.monotonic() + self.ban_cooldown)
+        logger.info(f"LanePool: rotated {lane.name} to generation {lane.generation}")
+        return old_circuit
@@ -0,0 +1,58 @@
+import sys
+import time
+from pathlib import Path
+
+from scrapy.http import HtmlResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from onet_scraper.spiders.onet import OnetSpider  # noqa: E402
+
+
+def build_listing(cards=60, nav_links=120):
+    """A listing page shaped like wiadomosci.onet.pl: navigation, article cards, pagination."""
+    nav = "".join(f'<li><a href="/sekcja-{i}">Sekcja {i}</a></li>' for i in range(nav_links))
+    card_html = "".join(
+        f'<div class="ods-c-card-wrapper"><a href="/kraj/tytul-artykulu-{i}/abc{i}"><img src="/img/{i}.jpg"></a>'
+        f'<a href="/kraj/tytul-artykulu-{i}/abc{i}"><h3>Tytuł artykułu {i}</h3><span class="date">2026-10-18</span></a></div>'
+        for i in range(cards)
+    )
+    html = (
+        f"<html><body><nav><ul>{nav}</ul></nav><main>{card_html}</main>"
+        f'<a href="/archiwum/2026-10-17">Archiwum</a><a class="ods-pagination__next" href="/kraj?page=2">Dalej</a>'
+        "</body></html>"
+    )
+    return html.encode("utf-8")
+
+
+def responses(body, count):
+    pages = [HtmlResponse(url="https://wiadomosci.onet.pl/kraj", body=body, encoding="utf-8") for _ in range(count)]
+    for page in pages:
+        page.selector  # Parse outside the timed part; both variants share it
+    return pages
+
+
+def benchmark(pages=200):
+    spider = OnetSpider()
+    body = build_listing()
+
+    pages_before, pages_after = responses(body, pages), responses(body, pages)
+
+    started = time.perf_counter()
+    for response in pages_before:
+        for rule in spider.rules:
+            rule.link_extractor.extract_links(response)
+    before = (time.perf_counter() - started) / pages
+
+    started = time.perf_counter()
+    for response in pages_after:
+        spider.link_classifier.extract(response)
+    after = (time.perf_counter() - started) / pages
+
+    print(f"Per-page link extraction over {pages} pages ({len(body)} bytes each):")
+    print(f"  4 LinkExtractors: {before * 1000:.2f} ms")
+    print(f"  LinkClassifier:   {after * 1000:.2f} ms ({before / after:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock
+
+from scrapy.http import Request
+from scrapy.utils.request import RequestFingerprinter
+
+from onet_scraper.dupefilters import BloomDupeFilter, CanonicalRequestFingerprinter
+from onet_scraper.spiders.onet import OnetSpider
+from onet_scraper.utils.bloom import AgingBloomFilter
+from onet_scraper.utils.canonical import UrlCanonicalizer
+
+
+def make_filter(snapshot_path=None):
+    return BloomDupeFilter(AgingBloomFilter(capacity=100, error_rate=1e-6), snapshot_path, fingerprinter=RequestFingerprinter())
+
+
+def test_filters_repeated_requests():
+    dupefilter = make_filter()
+
+    assert not dupefilter.request_seen(Request("https://wiadomosci.onet.pl/kraj/a/abc1"))
+    assert dupefilter.request_seen(Request("https://wiadomosci.onet.pl/kraj/a/abc1"))
+    assert not dupefilter.request_seen(Request("https://wiadomosci.onet.pl/kraj/b/abc2"))
+
+
+def test_snapshot_survives_restart(tmp_path):
+    path = str(tmp_path / "job" / "requests.bloom")
+    first = make_filter(path)
+    first.request_seen(Request("https://wiadomosci.onet.pl/kraj/a/abc1"))
+    first.close("shutdown")
+
+    second = make_filter(path)
+    assert second.request_seen(Request("https://wiadomosci.onet.pl/kraj/a/abc1"))
+    assert not (tmp_path / "job" / "requests.bloom.tmp").exists()
+
+
+def test_unreadable_snapshot_ignored(tmp_path):
+    path = tmp_path / "requests.bloom"
+    path.write_bytes(b"garbage")
+
+    dupefilter = make_filter(str(path))
+
+    assert not dupefilter.request_seen(Request("https://wiadomosci.onet.pl/kraj/a/abc1"))
+
+
+def test_canonical_fingerprints_count_avoided_fetches():
+    stats = MagicMock()
+    canonicalizer = UrlCanonicalizer(OnetSpider.ARTICLE_PATTERN, OnetSpider.ID_PATTERN)
+    dupefilter = BloomDupeFilter(AgingBloomFilter(), fingerprinter=CanonicalRequestFingerprinter(canonicalizer), stats=stats)
+
+    assert not dupefilter.request_seen(Request("https://wiadomosci.onet.pl/kraj/tytul/abc1"))
+    # Repeating the same link is filtered by any dupefilter, so it is not counted
+    assert dupefilter.request_seen(Request("https://wiadomosci.onet.pl/kraj/tytul/abc1"))
+    stats.inc_value.assert_not_called()
+    # Variants are what canonicalization saves
+    assert dupefilter.request_seen(Request("https://wiadomosci.onet.pl/kraj/tytul/abc1/?utm_source=fb"))
+    assert dupefilter.request_seen(Request("https://wiadomosci.onet.pl/swiat/inny-tytul/abc1"))
+    assert dupefilter.request_seen(
+        Request(
+            "https://wiadomosci.onet.pl/kraj/tytul/abc1", meta={"canonical_from": "http://wiadomosci.onet.pl/kraj/tytul/abc1#x"}
+        )
+    )
+
+    assert stats.inc_value.call_count == 3
+    stats.inc_value.assert_called_with("dupefilter/canonical/avoided")
+    # The variants only feed the stat and stay out of the deduplicating filter
+    assert len(dupefilter.bloom) == 1
@@ -1,9 +1,20 @@
-from unittest.mock import MagicMock, patch
+import asyncio
+import re
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from scrapy.http import HtmlResponse, Request
 
-from onet_scraper.middlewares import TorMiddleware
+from onet_scraper.exceptions import FailureReason, TorRequestFailed
+from onet_scraper.middlewares import CanonicalUrlMiddleware, FetchResult, TorMiddleware
+from onet_scraper.utils.canonical import UrlCanonicalizer
+from onet_scraper.utils.profile_selector import ThompsonSelector
+from onet_scraper.utils.retry import RetryBudget, RetryPolicy
+from onet_scraper.utils.rotation import RotationPolicy
+from onet_scraper.utils.routing import Route, RouteTable
+from onet_scraper.utils.throttle import AimdThrottle
+from onet_scraper.utils.tor_bootstrap import TorUnavailable
+from onet_scraper.utils.tor_lanes import LanePool, TorLane
 
 
 @pytest.fixture
@@ -38,7 +49,7 @@ async def test_process_request_intercepts_onet(middleware, spider):
     request = Request(url="https://wiadomosci.onet.pl/artykul")
 
     # Mock the synchronous request result (status, content, url, headers)
-    mock_result: tuple[int, bytes, str, dict[str, str]] = (
+    mock_result = FetchResult(
         200,
         b"<html>Test Content</html>",
         "https://wiadomosci.onet.pl/artykul",
@@ -55,31 +66,70 @@ async def test_process_request_intercepts_onet(middleware, spider):
 
 @pytest.mark.asyncio
 async def test_tor_rotation_on_403(middleware, spider):
-    """Verify that NEWNYM signal is sent on 403."""
+    """Verify that NEWNYM signal is sent on 403 and the final failure carries a typed reason."""
     request = Request(url="https://wiadomosci.onet.pl/blocked")
+    middleware.retry_policy = RetryPolicy(max_retries=1, base_delay=0.0)
 
     # Mock 403 response
-    mock_result: tuple[int, bytes, str, dict[str, str]] = (403, b"Access Denied", "https://wiadomosci.onet.pl/blocked", {})
-
-    # Mock stem Controller
-    mock_controller = MagicMock()
-    mock_controller_enter = MagicMock(return_value=mock_controller)
+    mock_result = FetchResult(403, b"Access Denied", "https://wiadomosci.onet.pl/blocked", {})
 
     with (
         patch.object(middleware, "_sync_make_request", return_value=mock_result),
         patch("stem.control.Controller.from_port") as mock_from_port,
     ):
-        mock_from_port.return_value.__enter__ = mock_controller_enter
-        mock_from_port.return_value.__exit__ = MagicMock(return_value=None)
+        mock_from_port.return_value.get_newnym_wait.return_value = 0.0
 
-        result = await middleware.process_request(request, spider)
+        with pytest.raises(TorRequestFailed) as exc_info:
+            await middleware.process_request(request, spider)
 
-        # Should return 504 to trigger retry
-        assert result.status == 504
+        assert exc_info.value.reason == FailureReason.BLOCKED
+        assert exc_info.value.attempts == 2
+        mock_from_port.return_value.signal.assert_called()
         # Verify warning log
         spider.logger.warning.assert_called()
 
 
+@pytest.mark.asyncio
+async def test_retry_succeeds_on_another_profile(middleware, spider):
+    """A blocked attempt is retried in place with a different profile."""
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+    middleware.retry_policy = RetryPolicy(max_retries=3, base_delay=0.0)
+    profiles_used = []
+
+    def blocked_then_ok(url, profile, lane=None, guard=None):
+        profiles_used.append(profile)
+        if len(profiles_used) == 1:
+            return FetchResult(403, b"Access Denied", url, {})
+        return FetchResult(200, b"<html>OK</html>", url, {})
+
+    with (
+        patch.object(middleware, "_sync_make_request", side_effect=blocked_then_ok),
+        patch.object(middleware, "_renew_tor_identity", new=AsyncMock()),
+    ):
+        result = await middleware.process_request(request, spider)
+
+    assert result.status == 200
+    assert len(set(profiles_used)) == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_caps_retries(middleware, spider):
+    """When the global retry budget is exhausted the request fails immediately."""
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+    middleware.retry_policy = RetryPolicy(max_retries=3, base_delay=0.0)
+    middleware.retry_budget = RetryBudget(ratio=0.0, min_retries=0)
+
+    with (
+        patch.object(middleware, "_sync_make_request", side_effect=OSError("circuit failed")),
+        patch.object(middleware, "_renew_tor_identity", new=AsyncMock()),
+    ):
+        with pytest.raises(TorRequestFailed) as exc_info:
+            await middleware.process_request(request, spider)
+
+    assert exc_info.value.reason == FailureReason.RETRY_BUDGET
+    assert exc_info.value.attempts == 1
+
+
 @pytest.mark.asyncio
 async def test_profile_rotation(middleware, spider):
     """Test that browser profiles rotate on each request."""
@@ -87,9 +137,9 @@ async def test_profile_rotation(middleware, spider):
 
     profiles_used = []
 
-    def capture_profile(url, profile):
+    def capture_profile(url, profile, lane=None, guard=None):
         profiles_used.append(profile)
-        return (200, b"<html></html>", url, {})
+        return FetchResult(200, b"<html></html>", url, {})
 
     with patch.object(middleware, "_sync_make_request", side_effect=capture_profile):
         for _ in range(3):
@@ -97,3 +147,252 @@ async def test_profile_rotation(middleware, spider):
 
     # Should have used 3 different profiles
     assert len(set(profiles_used)) == 3
+
+
+@pytest.mark.asyncio
+async def test_renew_identity_closes_pooled_sessions(middleware):
+    """Sessions bound to the old circuit must be torn down after NEWNYM."""
+    controller = MagicMock(renew=AsyncMock(return_value=True))
+
+    with (
+        patch.object(middleware, "_controller", return_value=controller),
+        patch.object(middleware.session_pool, "close_circuit") as mock_close,
+    ):
+        await middleware._renew_tor_identity()
+
+    mock_close.assert_called_once_with(("lane0", 0))
+    assert middleware.lanes.default.circuit == ("lane0", 1)
+
+
+@pytest.mark.asyncio
+async def test_renew_skipped_when_lane_rotated_after_request(middleware):
+    """A failure from a request sent before the last rotation must not trigger another NEWNYM."""
+    controller = MagicMock(renew=AsyncMock(return_value=True))
+    lane = middleware.lanes.default
+
+    with patch.object(middleware, "_controller", return_value=controller):
+        await middleware._renew_tor_identity(lane, since=0.0)
+        await middleware._renew_tor_identity(lane, since=0.0)
+
+    controller.renew.assert_awaited_once()
+    assert lane.generation == 1
+
+
+@pytest.mark.asyncio
+async def test_throttle_backs_off_banned_lane(middleware, spider):
+    """A 403 must shrink the lane's budget through the AIMD throttle."""
+    middleware.throttle = AimdThrottle(start_delay=2.0, start_concurrency=2)
+    middleware.retry_policy = RetryPolicy(max_retries=0)
+    request = Request(url="https://wiadomosci.onet.pl/blocked")
+    mock_result = FetchResult(403, b"Access Denied", "https://wiadomosci.onet.pl/blocked", {})
+
+    with (
+        patch.object(middleware, "_sync_make_request", return_value=mock_result),
+        patch.object(middleware, "_renew_tor_identity", new=AsyncMock()),
+        pytest.raises(TorRequestFailed),
+    ):
+        await middleware.process_request(request, spider)
+
+    lane = middleware.lanes.default
+    assert lane.delay == 4.0
+    assert lane.max_in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_timings_recorded_in_meta_and_stats(middleware, spider):
+    """curl timings end up in response.meta and in per-profile / per-lane histograms."""
+    middleware.stats = MagicMock()
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+    timings = {"connect": 0.8, "appconnect": 1.2, "starttransfer": 1.9, "total": 2.1, "bytes": 5120.0}
+    mock_result = FetchResult(200, b"<html></html>", request.url, {}, timings)
+
+    with patch.object(middleware, "_sync_make_request", return_value=mock_result):
+        response = await middleware.process_request(request, spider)
+
+    assert response.meta["tor_timing"]["total"] == 2.1
+    assert response.meta["tor_timing"]["lane"] == "lane0"
+    profile = response.meta["tor_timing"]["profile"]
+
+    middleware._update_timing_stats()
+    middleware.stats.set_value.assert_any_call(
+        f"tor/timing/total/profile/{profile}", middleware._timing_histograms[("total", "profile", profile)].summary()
+    )
+    assert middleware._timing_histograms[("bytes", "lane", "lane0")].count == 1
+
+
+@pytest.mark.asyncio
+async def test_profile_selector_learns_from_bans(middleware, spider):
+    """Bans and successes are fed back to the profile selector for the lane that saw them."""
+    middleware.profile_selector = ThompsonSelector(["chrome120", "safari17_0"], per_lane=True)
+    middleware.retry_policy = RetryPolicy(max_retries=1, base_delay=0.0)
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+    profiles_used = []
+
+    def blocked_then_ok(url, profile, lane=None, guard=None):
+        profiles_used.append(profile)
+        status = 403 if len(profiles_used) == 1 else 200
+        return FetchResult(status, b"<html></html>", url, {})
+
+    with (
+        patch.object(middleware, "_sync_make_request", side_effect=blocked_then_ok),
+        patch.object(middleware, "_renew_tor_identity", new=AsyncMock()),
+    ):
+        await middleware.process_request(request, spider)
+
+    arms = middleware.profile_selector.arms
+    assert arms[f"lane0|{profiles_used[0]}"].failures == 1
+    assert arms[f"lane0|{profiles_used[1]}"].successes == 1
+
+
+@pytest.mark.asyncio
+async def test_first_request_waits_for_bootstrap(middleware, spider):
+    """Requests wait for the asynchronous Tor bootstrap and the startup stats are recorded."""
+    middleware.stats = MagicMock()
+    middleware.check_tor_connection()
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+    mock_result = FetchResult(200, b"<html></html>", request.url, {})
+
+    with (
+        patch.object(middleware.bootstrap, "_bootstrap", new=AsyncMock()) as bootstrap,
+        patch.object(middleware, "_sync_make_request", return_value=mock_result),
+    ):
+        middleware.bootstrap.seconds = 1.5
+        await asyncio.gather(*(middleware.process_request(request, spider) for _ in range(3)))
+
+    bootstrap.assert_awaited_once()
+    middleware.stats.set_value.assert_any_call("tor/bootstrap/seconds", 1.5)
+    assert any(call.args[0] == "tor/startup/first_request_seconds" for call in middleware.stats.set_value.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_requests_fail_when_tor_unavailable(middleware, spider):
+    middleware.check_tor_connection()
+    spider.crawler.engine.close_spider_async = AsyncMock()
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+
+    with patch.object(middleware.bootstrap, "_bootstrap", new=AsyncMock(side_effect=TorUnavailable("no tor"))):
+        for _ in range(2):
+            with pytest.raises(TorRequestFailed) as exc_info:
+                await middleware.process_request(request, spider)
+    await asyncio.sleep(0)
+
+    assert exc_info.value.reason == FailureReason.TOR_UNAVAILABLE
+    # The crawl stops instead of failing every queued request
+    spider.crawler.engine.close_spider_async.assert_awaited_once_with(reason="tor_unavailable")
+
+
+@pytest.mark.asyncio
+async def test_identity_rotated_ahead_of_learned_ban(middleware, spider):
+    """Once the rotation policy has learned the ban point, the lane is rotated before reaching it."""
+    middleware.stats = MagicMock()
+    middleware.rotation_policy = RotationPolicy(min_bans=1)
+    middleware.prewarm_url = "https://www.onet.pl/robots.txt"
+    lane = middleware.lanes.default
+    lane.isolation = True
+    for _ in range(3):
+        middleware.rotation_policy.on_request(("lane0", -1))
+    middleware.rotation_policy.on_ban(("lane0", -1))
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+    mock_result = FetchResult(200, b"<html></html>", request.url, {})
+
+    with patch.object(middleware, "_sync_make_request", return_value=mock_result) as fetch:
+        for _ in range(3):
+            await middleware.process_request(request, spider)
+        await asyncio.gather(*middleware._background_tasks)
+
+    assert lane.generation == 1
+    middleware.stats.inc_value.assert_any_call("tor/rotation/proactive", 1)
+    # The spare circuit for generation 1 was built before the rotation
+    middleware.stats.inc_value.assert_any_call("tor/rotation/prewarmed", 1)
+    assert any(call.args[2].generation == 1 and call.args[0] == middleware.prewarm_url for call in fetch.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_listing_goes_direct_and_falls_back_to_tor_when_blocked(middleware, spider):
+    """Direct routes skip Tor until a block signal demotes them for good."""
+    middleware.stats = MagicMock()
+    middleware.routes = RouteTable([Route("listing", re.compile(r"onet\.pl/[a-z]+$"), direct=True)])
+    middleware.retry_policy = RetryPolicy(max_retries=1, base_delay=0.0)
+    request = Request(url="https://wiadomosci.onet.pl/kraj")
+    lanes_used = []
+
+    def blocked_directly(url, profile, lane=None, guard=None):
+        lanes_used.append(lane.name)
+        status = 403 if lane.name == "direct" else 200
+        return FetchResult(status, b"<html></html>", url, {})
+
+    with (
+        patch.object(middleware, "_sync_make_request", side_effect=blocked_directly),
+        patch.object(middleware, "_renew_tor_identity", new=AsyncMock()) as renew,
+    ):
+        await middleware.process_request(request, spider)
+        await middleware.process_request(request, spider)
+
+    assert lanes_used == ["direct", "lane0", "lane0"]
+    renew.assert_not_awaited()  # a direct block says nothing about the Tor identity
+    middleware.stats.inc_value.assert_any_call("tor/routes/listing/demotions", 1)
+    middleware.stats.inc_value.assert_any_call("tor/routes/listing/tor/success", 1)
+
+
+@pytest.mark.asyncio
+async def test_direct_lane_keeps_its_budget_and_fallback_is_not_a_retry(spider):
+    direct = TorLane(name="direct", proxy="", delay=1.0, max_in_flight=2)
+    with patch("onet_scraper.middlewares.TorMiddleware.check_tor_connection"):
+        middleware = TorMiddleware(
+            throttle=AimdThrottle(start_delay=2.0, start_concurrency=1),
+            direct_lanes=LanePool([direct], ban_cooldown=0.0, randomize_delay=False),
+            routes=RouteTable([Route("listing", re.compile(r"onet\.pl/[a-z]+$"), direct=True)]),
+            retry_policy=RetryPolicy(max_retries=0),
+            retry_budget=RetryBudget(ratio=0.0, min_retries=0),
+        )
+
+    def fetch(url, profile, lane=None, guard=None):
+        if lane.name == "direct" and url.endswith("zablokowany"):
+            raise ConnectionError("reset by peer")
+        return FetchResult(200, b"<html></html>", url, {})
+
+    middleware.stats = MagicMock()
+    with (
+        patch.object(middleware, "_sync_make_request", side_effect=fetch),
+        patch.object(middleware, "_renew_tor_identity", new=AsyncMock()),
+    ):
+        await middleware.process_request(Request(url="https://wiadomosci.onet.pl/kraj"), spider)
+        assert (direct.delay, direct.max_in_flight) == (1.0, 2)
+        direct.next_slot = 0.0
+
+        # No retries and no retry budget left, yet the Tor fallback still goes out
+        response = await middleware.process_request(Request(url="https://wiadomosci.onet.pl/zablokowany"), spider)
+
+    assert response is not None and response.status == 200
+    stats = [call.args[0] for call in middleware.stats.inc_value.call_args_list]
+    assert "tor/routes/fallbacks" in stats
+    assert "tor/retry/count" not in stats
+
+
+def test_canonical_url_middleware_rewrites_variants_and_learns_redirects():
+    canonicalizer = UrlCanonicalizer()
+    stats = MagicMock()
+    mw = CanonicalUrlMiddleware(canonicalizer, stats=stats)
+    request = Request("https://wiadomosci.onet.pl/kraj/stary/abc1")
+    mw.process_spider_input(HtmlResponse(url="https://wiadomosci.onet.pl/kraj/nowy/abc1", body=b"", request=request))
+
+    outputs = list(
+        mw.process_spider_output(
+            None,
+            [
+                Request("https://wiadomosci.onet.pl/kraj/stary/abc1?utm_source=x", meta={"frontier_class": "article"}),
+                Request("https://wiadomosci.onet.pl/kraj"),
+                {"title": "item"},
+            ],
+        )
+    )
+
+    assert outputs[0].url == "https://wiadomosci.onet.pl/kraj/nowy/abc1"
+    assert outputs[0].meta == {
+        "frontier_class": "article",
+        "canonical_from": "https://wiadomosci.onet.pl/kraj/stary/abc1?utm_source=x",
+    }
+    assert outputs[1].url == "https://wiadomosci.onet.pl/kraj"
+    assert outputs[2] == {"title": "item"}
+    stats.inc_value.assert_any_call("onet/canonical/redirects")
+    stats.inc_value.assert_any_call("onet/canonical/rewritten")
@@ -0,0 +1,137 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from scrapy.http import HtmlResponse, Request
+
+from onet_scraper.middlewares import TorMiddleware
+
+
+@pytest.fixture
+def middleware():
+    with patch("onet_scraper.middlewares.TorMiddleware.check_tor_connection"):
+        return TorMiddleware(control_port=9051, engine="asyncio", max_concurrency=2, max_per_circuit=1)
+
+
+@pytest.fixture
+def spider():
+    mock_spider = MagicMock()
+    mock_spider.logger = MagicMock()
+    return mock_spider
+
+
+def fake_curl_response(url):
+    response = MagicMock()
+    response.status_code = 200
+    response.content = b"<html>Async</html>"
+    response.url = url
+    response.headers = {}
+    response.infos = {}
+
+    async def aiter_content():
+        yield response.content
+
+    response.aiter_content = aiter_content
+    response.aclose = AsyncMock()
+    return response
+
+
+def test_unknown_engine_rejected():
+    with patch("onet_scraper.middlewares.TorMiddleware.check_tor_connection"):
+        with pytest.raises(ValueError):
+            TorMiddleware(engine="twisted")
+
+
+@pytest.mark.asyncio
+async def test_asyncio_engine_skips_thread_pool(middleware, spider):
+    """The asyncio engine must not go through asyncio.to_thread."""
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+    session = MagicMock()
+    session.get = AsyncMock(side_effect=lambda url, **kw: fake_curl_response(url))
+
+    with (
+        patch.object(middleware.async_session_pool, "get", return_value=session),
+        patch("onet_scraper.middlewares.asyncio.to_thread") as mock_to_thread,
+    ):
+        result = await middleware.process_request(request, spider)
+
+    mock_to_thread.assert_not_called()
+    assert isinstance(result, HtmlResponse)
+    assert result.body == b"<html>Async</html>"
+
+
+@pytest.mark.asyncio
+async def test_asyncio_engine_bounds_per_circuit_concurrency(middleware):
+    """Only max_per_circuit transfers may be in flight on one circuit."""
+    in_flight = 0
+    peak = 0
+
+    async def slow_get(url, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return fake_curl_response(url)
+
+    session = MagicMock()
+    session.get = slow_get
+    lane = middleware.lanes.default
+
+    with patch.object(middleware.async_session_pool, "get", return_value=session):
+        await asyncio.gather(*(middleware._fetch(f"https://wiadomosci.onet.pl/{i}", "chrome120", lane) for i in range(4)))
+
+    assert peak == 1
+
+
+@pytest.mark.asyncio
+async def test_asyncio_engine_evicts_sessions_of_rotated_circuits(middleware):
+    pool = middleware.async_session_pool
+    pool.max_idle = 0.0
+    stale = MagicMock(close=AsyncMock())
+    stale.get = AsyncMock(side_effect=lambda url, **kw: fake_curl_response(url))
+    pool._session_factory = MagicMock(return_value=stale)
+    await middleware._fetch("https://wiadomosci.onet.pl/1", "chrome120", middleware.lanes.default)
+    middleware.lanes.rotate(middleware.lanes.default)
+    pool._session_factory = MagicMock(return_value=MagicMock(get=stale.get, close=AsyncMock()))
+    await asyncio.sleep(0.001)
+
+    await middleware._fetch("https://wiadomosci.onet.pl/2", "chrome120", middleware.lanes.default)
+
+    stale.close.assert_awaited_once()
+    assert pool.sessions_evicted == 1
+
+
+@pytest.mark.asyncio
+async def test_rotation_lets_transfers_on_the_old_circuit_finish(middleware):
+    lane = middleware.lanes.default
+    lane.isolation = True
+    pool = middleware.async_session_pool
+    release = asyncio.Event()
+
+    async def slow_get(url, **kwargs):
+        await release.wait()
+        return fake_curl_response(url)
+
+    old = MagicMock(close=AsyncMock())
+    old.get = slow_get
+    pool._session_factory = MagicMock(return_value=old)
+    fetch = asyncio.ensure_future(middleware._fetch("https://wiadomosci.onet.pl/1", "chrome120", lane))
+    await asyncio.sleep(0)
+
+    await middleware._renew_tor_identity(lane)
+
+    old.close.assert_not_awaited()
+    assert ("lane0", 0) in middleware._circuit_semaphores
+    release.set()
+    result = await fetch
+    assert result.body == b"<html>Async</html>"
+    assert ("lane0", 0) not in middleware._circuit_semaphores
+
+    # Closed by the next transfer's eviction pass, now that nothing uses it
+    new = MagicMock(close=AsyncMock())
+    new.get = AsyncMock(side_effect=lambda url, **kw: fake_curl_response(url))
+    pool._session_factory = MagicMock(return_value=new)
+    await middleware._fetch("https://wiadomosci.onet.pl/2", "chrome120", lane)
+    old.close.assert_awaited_once()
+    new.close.assert_not_awaited()
@@ -0,0 +1,95 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from scrapy.http import Request
+
+from onet_scraper.middlewares import FetchResult, TorMiddleware
+from onet_scraper.utils.hedging import HedgeBudget, LatencyTracker
+from onet_scraper.utils.tor_lanes import LanePool, TorLane
+
+
+@pytest.fixture
+def middleware():
+    lanes = LanePool(
+        [TorLane(name=f"lane{i}", proxy="socks5h://127.0.0.1:9050", isolation=True, delay=0.0) for i in range(2)],
+        randomize_delay=False,
+    )
+    tracker = LatencyTracker(min_samples=1)
+    tracker.add(0.01)
+    with patch("onet_scraper.middlewares.TorMiddleware.check_tor_connection"):
+        return TorMiddleware(
+            engine="asyncio",
+            lanes=lanes,
+            hedge_enabled=True,
+            hedge_budget=HedgeBudget(max_ratio=1.0),
+            latency_tracker=tracker,
+            stats=MagicMock(),
+        )
+
+
+@pytest.fixture
+def spider():
+    mock_spider = MagicMock()
+    mock_spider.logger = MagicMock()
+    return mock_spider
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled(middleware, spider):
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+    cancelled = []
+
+    async def fetch(url, profile, lane, guard=None):
+        if lane.name == "lane0":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(lane.name)
+                raise
+        return FetchResult(200, f"<html>{lane.name}</html>".encode(), url, {})
+
+    with patch.object(middleware, "_async_make_request", side_effect=fetch):
+        result = await asyncio.wait_for(middleware.process_request(request, spider), timeout=2)
+
+    assert result.body == b"<html>lane1</html>"
+    assert cancelled == ["lane0"]
+    middleware.stats.inc_value.assert_any_call("tor/hedge/issued", 1)
+    middleware.stats.inc_value.assert_any_call("tor/hedge/won", 1)
+    assert all(lane.in_flight == 0 for lane in middleware.lanes.lanes)
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_budget(middleware, spider):
+    middleware.hedge_budget = HedgeBudget(max_ratio=0.0)
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+    lanes_used = []
+
+    async def fetch(url, profile, lane, guard=None):
+        lanes_used.append(lane.name)
+        await asyncio.sleep(0.05)
+        return FetchResult(200, b"<html></html>", url, {})
+
+    with patch.object(middleware, "_async_make_request", side_effect=fetch):
+        await middleware.process_request(request, spider)
+
+    assert lanes_used == ["lane0"]
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_on_a_single_lane(middleware, spider):
+    middleware.lanes = LanePool([TorLane(name="lane0", proxy="socks5h://127.0.0.1:9050", delay=0.0)], randomize_delay=False)
+    request = Request(url="https://wiadomosci.onet.pl/artykul")
+    lanes_used = []
+
+    async def fetch(url, profile, lane, guard=None):
+        lanes_used.append(lane.name)
+        await asyncio.sleep(0.05)
+        return FetchResult(200, b"<html></html>", url, {})
+
+    with patch.object(middleware, "_async_make_request", side_effect=fetch):
+        await middleware.process_request(request, spider)
+
+    assert lanes_used == ["lane0"]
+    assert middleware.hedge_budget.hedges == 0
+    assert ("tor/hedge/issued", 1) not in [call.args for call in middleware.stats.inc_value.call_args_list]
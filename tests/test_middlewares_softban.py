@@ -1,9 +1,11 @@
 from unittest.mock import MagicMock, patch
 
 import pytest
-from scrapy.http import HtmlResponse, Request
+from scrapy.http import Request
 
-from onet_scraper.middlewares import TorMiddleware
+from onet_scraper.exceptions import FailureReason, TorRequestFailed
+from onet_scraper.middlewares import FetchResult, TorMiddleware
+from onet_scraper.utils.retry import RetryPolicy
 
 
 @pytest.fixture
@@ -24,9 +26,11 @@ async def test_soft_ban_302_redirect(middleware, spider):
     """Verify that redirect to homepage is treated as soft ban (IP rotation)."""
     request = Request(url="https://wiadomosci.onet.pl/artykul-polityczny")
 
+    middleware.retry_policy = RetryPolicy(max_retries=0)
+
     # Mock: followed redirect landed on homepage (soft ban detection)
     # New implementation uses allow_redirects=True, so we get final URL
-    mock_result: tuple[int, bytes, str, dict[str, str]] = (200, b"<html>Homepage</html>", "https://www.onet.pl", {})
+    mock_result = FetchResult(200, b"<html>Homepage</html>", "https://www.onet.pl", {})
 
     # Mock stem Controller
     mock_controller = MagicMock()
@@ -38,13 +42,14 @@ async def test_soft_ban_302_redirect(middleware, spider):
     ):
         mock_from_port.return_value.__enter__ = mock_controller_enter
         mock_from_port.return_value.__exit__ = MagicMock(return_value=None)
+        mock_from_port.return_value.get_newnym_wait.return_value = 0.0
 
-        response = await middleware.process_request(request, spider)
+        with pytest.raises(TorRequestFailed) as exc_info:
+            await middleware.process_request(request, spider)
 
-        # 1. Verify we got a 504 (Retry) response due to soft ban detection
-        assert isinstance(response, HtmlResponse)
-        assert response.status == 504
-        assert response.body == b"Tor Soft Ban / Block"
+        # 1. Verify the request failed with a typed soft ban reason (IP was rotated)
+        assert exc_info.value.reason == FailureReason.SOFT_BAN
+        mock_from_port.return_value.signal.assert_called()
 
         # 2. Verify Warning Log was called
         spider.logger.warning.assert_called()
@@ -0,0 +1,221 @@
+import gzip
+import http.server
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from scrapy.http import Request
+
+from onet_scraper.exceptions import FailureReason, TorRequestFailed
+from onet_scraper.middlewares import TorMiddleware
+from onet_scraper.utils.body_guard import BodyGuard, BodyRejected
+from onet_scraper.utils.tor_lanes import TorLane
+
+PAGES = {
+    "/article": ("text/html; charset=utf-8", b"<html><body>article</body></html>"),
+    "/large": ("text/html", b"<p>" * 200_000),
+    "/file.pdf": ("application/pdf", b"%PDF" * 1000),
+    "/stale": (
+        "text/html",
+        b'<html><head><script type="application/ld+json">{"datePublished": "2020-01-02T10:00:00+01:00"}</script>'
+        + b"<p>" * 30_000,
+    ),
+}
+# Served with Transfer-Encoding: chunked, so no Content-Length is announced
+CHUNKED = {"/chunked": ("text/html", b"<p>" * 200_000)}
+# Served gzip-compressed; Content-Length is the compressed size
+GZIPPED = {"/gzip": ("text/html", gzip.compress(b"<p>" * 200_000))}
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        content_type, body = {**PAGES, **CHUNKED, **GZIPPED}[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if self.path in CHUNKED:
+            self.send_header("Transfer-Encoding", "chunked")
+            body = b"".join(b"%x\r\n%s\r\n" % (len(part), part) for part in _parts(body)) + b"0\r\n\r\n"
+        else:
+            if self.path in GZIPPED:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass  # Client aborted the transfer
+
+    def log_message(self, *args):
+        pass
+
+
+def _parts(body: bytes, size: int = 16_384):
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Connections reset by aborted transfers
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = _Server(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(params=["thread", "asyncio"])
+def middleware(request):
+    with patch("onet_scraper.middlewares.TorMiddleware.check_tor_connection"):
+        return TorMiddleware(control_port=9051, engine=request.param, max_body_size=100_000)
+
+
+@pytest.fixture
+def lane():
+    # Plain HTTP without a proxy, so real curl transfers can run against the local server
+    return TorLane(name="direct", proxy="", delay=0.0)
+
+
+@pytest.mark.asyncio
+async def test_html_body_streamed_in_full(middleware, lane, server_url):
+    result = await middleware._fetch(f"{server_url}/article", "chrome120", lane)
+
+    assert result.status == 200
+    assert result.body == PAGES["/article"][1]
+    await middleware.async_session_pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_oversized_body_aborted(middleware, lane, server_url):
+    guard = BodyGuard(max_bytes=100_000)
+
+    with pytest.raises(BodyRejected) as exc_info:
+        await middleware._fetch(f"{server_url}/large", "chrome120", lane, guard)
+
+    assert exc_info.value.reason == FailureReason.TOO_LARGE
+    assert exc_info.value.bytes_saved == len(PAGES["/large"][1])  # Content-Length announced it
+    await middleware.async_session_pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_aborted_chunked_body_saves_an_unknown_amount(middleware, lane, server_url):
+    with pytest.raises(BodyRejected) as exc_info:
+        await middleware._fetch(f"{server_url}/chunked", "chrome120", lane, BodyGuard(max_bytes=100_000))
+
+    assert exc_info.value.reason == FailureReason.TOO_LARGE
+    assert exc_info.value.received > 100_000
+    assert exc_info.value.bytes_saved is None
+    await middleware.async_session_pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_aborted_compressed_body_saves_an_unknown_amount(middleware, lane, server_url):
+    with pytest.raises(BodyRejected) as exc_info:
+        await middleware._fetch(f"{server_url}/gzip", "chrome120", lane, BodyGuard(max_bytes=100_000))
+
+    assert exc_info.value.received > 100_000
+    assert exc_info.value.bytes_saved is None
+    await middleware.async_session_pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_non_html_aborted_and_session_still_usable(middleware, lane, server_url):
+    with pytest.raises(BodyRejected) as exc_info:
+        await middleware._fetch(f"{server_url}/file.pdf", "chrome120", lane)
+
+    assert exc_info.value.reason == FailureReason.NOT_HTML
+    result = await middleware._fetch(f"{server_url}/article", "chrome120", lane)
+    assert result.body == PAGES["/article"][1]
+    await middleware.async_session_pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_stale_article_aborted_once_date_arrives(middleware, lane, server_url):
+    guard = middleware._body_guard(Request(url=f"{server_url}/stale", meta={"freshness_days": 3}))
+
+    with pytest.raises(BodyRejected) as exc_info:
+        await middleware._fetch(f"{server_url}/stale", "chrome120", lane, guard)
+
+    assert exc_info.value.reason == FailureReason.STALE
+    assert exc_info.value.received < len(PAGES["/stale"][1])
+    await middleware.async_session_pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_stale_article_skipped_not_failed(lane):
+    with patch("onet_scraper.middlewares.TorMiddleware.check_tor_connection"):
+        middleware = TorMiddleware(control_port=9051, stats=MagicMock())
+    spider = MagicMock()
+    request = Request(url="https://wiadomosci.onet.pl/kraj/stary/abc123", meta={"freshness_days": 3})
+    rejection = BodyRejected(FailureReason.STALE, "published 2020-01-02", received=4096)
+
+    with patch.object(middleware, "_sync_make_request", side_effect=rejection) as fetch:
+        with pytest.raises(TorRequestFailed) as exc_info:
+            await middleware.process_request(request, spider)
+
+    assert exc_info.value.reason == FailureReason.STALE
+    fetch.assert_called_once()
+    middleware.stats.inc_value.assert_any_call("tor/stream/aborted/stale", 1)
+    middleware.stats.inc_value.assert_any_call("tor/skipped/stale", 1)
+    assert all(call.args[0] != "tor/failed/count" for call in middleware.stats.inc_value.call_args_list)
+
+
+def test_freshness_scan_only_for_marked_requests():
+    with patch("onet_scraper.middlewares.TorMiddleware.check_tor_connection"):
+        middleware = TorMiddleware(control_port=9051)
+
+    assert middleware._body_guard(Request(url="https://wiadomosci.onet.pl/")).scanner is None
+    marked = Request(url="https://wiadomosci.onet.pl/kraj/a/b1", meta={"freshness_days": 3})
+    assert middleware._body_guard(marked).scanner is not None
+    middleware.stale_abort = False
+    assert middleware._body_guard(marked).scanner is None
+
+
+@pytest.mark.asyncio
+async def test_rejected_body_is_not_retried(lane):
+    with patch("onet_scraper.middlewares.TorMiddleware.check_tor_connection"):
+        middleware = TorMiddleware(control_port=9051, stats=MagicMock())
+    spider = MagicMock()
+    request = Request(url="https://wiadomosci.onet.pl/raport.pdf")
+    rejection = BodyRejected(FailureReason.NOT_HTML, "Content-Type application/pdf", bytes_saved=5000)
+
+    with patch.object(middleware, "_sync_make_request", side_effect=rejection) as fetch:
+        with pytest.raises(TorRequestFailed) as exc_info:
+            await middleware.process_request(request, spider)
+
+    assert exc_info.value.reason == FailureReason.NOT_HTML
+    fetch.assert_called_once()
+    middleware.stats.inc_value.assert_any_call("tor/stream/bytes_saved", 5000)
+    middleware.stats.inc_value.assert_any_call("tor/stream/aborted/not_html", 1)
+
+
+@pytest.mark.asyncio
+async def test_abort_of_unannounced_body_counted_separately(lane):
+    with patch("onet_scraper.middlewares.TorMiddleware.check_tor_connection"):
+        middleware = TorMiddleware(control_port=9051, stats=MagicMock())
+    request = Request(url="https://wiadomosci.onet.pl/kraj/a/abc1")
+    rejection = BodyRejected(FailureReason.TOO_LARGE, "body exceeded 100 bytes", received=150)
+
+    with patch.object(middleware, "_sync_make_request", side_effect=rejection):
+        with pytest.raises(TorRequestFailed):
+            await middleware.process_request(request, MagicMock())
+
+    middleware.stats.inc_value.assert_any_call("tor/stream/aborted/unknown_length", 1)
+    assert "tor/stream/bytes_saved" not in [c.args[0] for c in middleware.stats.inc_value.call_args_list]
+
+
+def test_request_can_widen_allowed_content_types():
+    with patch("onet_scraper.middlewares.TorMiddleware.check_tor_connection"):
+        middleware = TorMiddleware(control_port=9051)
+    request = Request(url="https://wiadomosci.onet.pl/sitemap.xml", meta={"allowed_content_types": ("text/xml",)})
+
+    guard = middleware._body_guard(request)
+    guard.check_headers(200, "text/xml; charset=utf-8", None)
+
+    assert guard.content_types == ("text/xml",)
@@ -2,7 +2,8 @@ import json
 
 import pytest
 
-from onet_scraper.pipelines import JsonWriterPipeline
+from onet_scraper.pipelines import JsonWriterPipeline, SeenStorePipeline
+from onet_scraper.utils.seen_store import SeenStore, article_keys
 
 
 @pytest.fixture
@@ -61,3 +62,13 @@ def test_close_spider_closes_file(pipeline, spider, mocker):
     pipeline.close_spider(spider)
 
     mock_file.close.assert_called_once()
+
+
+def test_seen_store_pipeline_records_saved_articles(spider):
+    store = SeenStore(":memory:", ttl=3600)
+    pipeline = SeenStorePipeline(store)
+    item = {"url": "https://wiadomosci.onet.pl/kraj/tytul/abc123", "id": "story9"}
+
+    assert pipeline.process_item(item, spider) is item
+    assert store.contains_any(["id:story9"])
+    assert store.contains_any(article_keys("https://wiadomosci.onet.pl/kraj/tytul/abc123"))
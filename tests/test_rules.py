@@ -1,6 +1,10 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
 from scrapy.http import HtmlResponse
 
 from onet_scraper.spiders.onet import OnetSpider
+from onet_scraper.utils.seen_store import SeenStore, article_keys
 
 
 def test_rules_match_article_urls():
@@ -81,3 +85,68 @@ def test_rules_deny_patterns():
     for url in denied_urls:
         # Assert that NONE of the denied URLs were extracted
         assert url not in extracted_urls, f"Should NOT extract denied URL: {url}"
+
+
+def test_stale_card_links_dropped_before_scheduling():
+    spider = OnetSpider()
+    spider.crawler = MagicMock()
+    today = datetime.now().strftime("%Y-%m-%d")
+    html = f"""
+    <div class="ods-c-card-wrapper"><a href="/kraj/swiezy/abc1">A</a><time datetime="{today}T08:00">dziś</time></div>
+    <div class="ods-c-card-wrapper"><a href="/kraj/stary/abc2">B</a><time datetime="2020-01-02T08:00">x</time></div>
+    <div class="ods-c-card-wrapper"><a href="/kraj/bez-daty/abc3">C</a></div>
+    """
+    response = HtmlResponse(url="https://wiadomosci.onet.pl/", body=html.encode("utf-8"))
+
+    # Dropped links come out as None, which Scrapy ignores
+    requests = [r for r in spider._requests_to_follow(response) if r is not None and r.url.count("/") > 4]
+
+    assert sorted(r.url for r in requests) == [
+        "https://wiadomosci.onet.pl/kraj/bez-daty/abc3",
+        "https://wiadomosci.onet.pl/kraj/swiezy/abc1",
+    ]
+    assert all(r.meta["freshness_days"] == spider.FRESHNESS_DAYS for r in requests)
+    spider.crawler.stats.inc_value.assert_called_once_with("onet/skipped/card_date")
+
+
+def test_pagination_stops_when_page_is_stale():
+    spider = OnetSpider()
+    spider.crawler = MagicMock()
+    html = """
+    <div class="ods-c-card-wrapper"><a href="/kraj/stary/abc2">B</a><time datetime="2020-01-02T08:00">x</time></div>
+    <a class="next" href="https://wiadomosci.onet.pl/kraj?page=3">Dalej</a>
+    """
+    response = HtmlResponse(url="https://wiadomosci.onet.pl/kraj?page=2", body=html.encode("utf-8"))
+
+    requests = [r for r in spider._requests_to_follow(response) if r is not None]
+
+    assert requests == []
+    spider.crawler.stats.inc_value.assert_any_call("onet/pagination/pruned")
+
+
+def test_links_saved_by_earlier_runs_not_scheduled():
+    spider = OnetSpider()
+    spider.crawler = MagicMock()
+    spider.seen_store = SeenStore(":memory:", ttl=3600)
+    spider.seen_store.add(article_keys("https://wiadomosci.onet.pl/kraj/znany/abc1"))
+    html = """
+    <div class="ods-c-card-wrapper"><a href="/kraj/znany/abc1">A</a></div>
+    <div class="ods-c-card-wrapper"><a href="/kraj/nowy/abc2">B</a></div>
+    """
+    response = HtmlResponse(url="https://wiadomosci.onet.pl/", body=html.encode("utf-8"))
+
+    requests = [r for r in spider._requests_to_follow(response) if r is not None]
+
+    assert [r.url for r in requests] == ["https://wiadomosci.onet.pl/kraj/nowy/abc2"]
+    spider.crawler.stats.inc_value.assert_called_once_with("onet/skipped/seen")
+
+
+def test_article_links_tagged_with_listing_position():
+    spider = OnetSpider()
+    html = "".join(f'<div class="ods-c-card-wrapper"><a href="/kraj/artykul/abc{i}">{i}</a></div>' for i in range(3))
+    response = HtmlResponse(url="https://wiadomosci.onet.pl/", body=html.encode("utf-8"))
+
+    requests = [r for r in spider._requests_to_follow(response) if r is not None and r.url.count("/") > 4]
+
+    assert [r.meta["listing_position"] for r in requests] == [0, 1, 2]
+    assert {r.meta["frontier_class"] for r in requests} == {"article"}
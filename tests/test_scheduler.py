@@ -0,0 +1,172 @@
+import json
+import time
+from unittest.mock import MagicMock
+
+from scrapy import Spider
+from scrapy.crawler import Crawler
+from scrapy.http import Request
+from scrapy.pqueues import ScrapyPriorityQueue
+from scrapy.squeues import LifoMemoryQueue
+from scrapy.utils.request import RequestFingerprinter
+
+from onet_scraper.dupefilters import BloomDupeFilter
+from onet_scraper.scheduler import FrontierScheduler
+from onet_scraper.utils.bloom import AgingBloomFilter
+from onet_scraper.utils.checkpoint import CheckpointLog, PendingRequest
+from onet_scraper.utils.frontier import FrontierPolicy
+
+
+class _Spider(Spider):
+    name = "test"
+
+    def parse_item(self, response):
+        pass
+
+
+def make_scheduler(policy, checkpoint_dir=None, stats=None, open_spider=True):
+    crawler = Crawler(_Spider)
+    crawler.spider = _Spider()
+    crawler.spider.crawler = crawler
+    crawler.stats = stats or MagicMock()
+    fingerprinter = RequestFingerprinter()
+    scheduler = FrontierScheduler(
+        BloomDupeFilter(AgingBloomFilter(), fingerprinter=fingerprinter),
+        mqclass=LifoMemoryQueue,
+        pqclass=ScrapyPriorityQueue,
+        stats=crawler.stats,
+        crawler=crawler,
+    )
+    scheduler.frontier = policy
+    scheduler.fingerprinter = fingerprinter
+    if checkpoint_dir is not None:
+        scheduler.checkpoint = CheckpointLog(str(checkpoint_dir / "frontier.ckpt"))
+        scheduler.checkpoint_interval = 0
+    if open_spider:
+        scheduler.open(crawler.spider)
+    return scheduler
+
+
+def test_articles_dequeued_before_listings():
+    scheduler = make_scheduler(FrontierPolicy())
+    scheduler.enqueue_request(Request("https://wiadomosci.onet.pl/kraj?page=2", meta={"frontier_class": "pagination"}))
+    scheduler.enqueue_request(Request("https://wiadomosci.onet.pl/kraj", meta={"frontier_class": "category"}))
+    scheduler.enqueue_request(Request("https://wiadomosci.onet.pl/kraj/a/abc1", meta={"frontier_class": "article"}))
+
+    order = [scheduler.next_request().url for _ in range(3)]
+
+    assert order == [
+        "https://wiadomosci.onet.pl/kraj/a/abc1",
+        "https://wiadomosci.onet.pl/kraj",
+        "https://wiadomosci.onet.pl/kraj?page=2",
+    ]
+
+
+def test_requests_over_the_bound_wait_for_a_free_slot():
+    scheduler = make_scheduler(FrontierPolicy(max_pending={"pagination": 1}))
+    pages = [
+        Request(f"https://wiadomosci.onet.pl/{section}?page=2", meta={"frontier_class": "pagination"})
+        for section in ("kraj", "swiat", "sport")
+    ]
+
+    assert all(scheduler.enqueue_request(page) for page in pages)
+    scheduler.stats.inc_value.assert_any_call("frontier/deferred/pagination")
+    assert len(scheduler) == 3
+
+    order = [scheduler.next_request().url for _ in range(3)]
+
+    assert order == [page.url for page in pages]
+    assert scheduler.next_request() is None
+    assert scheduler.frontier.pending["pagination"] == 0
+
+
+def test_deferred_duplicate_is_filtered_when_released():
+    scheduler = make_scheduler(FrontierPolicy(max_pending={"pagination": 1}))
+    page = Request("https://wiadomosci.onet.pl/kraj?page=2", meta={"frontier_class": "pagination"})
+    scheduler.enqueue_request(page)
+    scheduler.enqueue_request(page.replace())
+
+    assert scheduler.next_request().url == page.url
+    assert scheduler.next_request() is None
+    assert len(scheduler) == 0
+
+
+def test_deferred_requests_survive_a_restart(tmp_path):
+    first = make_scheduler(FrontierPolicy(max_pending={"pagination": 1}), tmp_path)
+    for section in ("kraj", "swiat"):
+        first.enqueue_request(Request(f"https://wiadomosci.onet.pl/{section}?page=2", meta={"frontier_class": "pagination"}))
+    first.close("shutdown")
+
+    resumed = make_scheduler(FrontierPolicy(max_pending={"pagination": 1}), tmp_path)
+
+    assert sorted(resumed.next_request().url for _ in range(2)) == [
+        "https://wiadomosci.onet.pl/kraj?page=2",
+        "https://wiadomosci.onet.pl/swiat?page=2",
+    ]
+
+
+def test_interrupted_crawl_resumes_frontier_dupefilter_and_counters(tmp_path):
+    stats = MagicMock()
+    stats.get_stats.return_value = {"onet/skipped/seen": 7, "onet/discovery/mode": "crawl", "item_scraped_count": 3}
+    first = make_scheduler(FrontierPolicy(), tmp_path, stats)
+    spider = first.spider
+    first.enqueue_request(Request("https://wiadomosci.onet.pl/kraj", meta={"frontier_class": "category"}))
+    for i in range(3):
+        first.enqueue_request(
+            Request(f"https://wiadomosci.onet.pl/kraj/a/abc{i}", callback=spider.parse_item, meta={"frontier_class": "article"})
+        )
+    first.next_request()
+    first.close("shutdown")
+
+    resumed = make_scheduler(FrontierPolicy(), tmp_path)
+
+    assert len(resumed) == 3
+    resumed.stats.inc_value.assert_any_call("onet/skipped/seen", 7)
+    assert ("item_scraped_count", 3) not in [c.args for c in resumed.stats.inc_value.call_args_list]
+    assert resumed.frontier.pending == {"category": 1, "article": 2}
+    # Already seen by the restored dupefilter
+    assert not resumed.enqueue_request(Request("https://wiadomosci.onet.pl/kraj/a/abc2"))
+    # A fresher article still goes ahead of the restored listing
+    resumed.enqueue_request(Request("https://wiadomosci.onet.pl/kraj/a/new", meta={"frontier_class": "article"}))
+    order = [resumed.next_request() for _ in range(4)]
+
+    names = [request.url.rsplit("/", 1)[-1] for request in order]
+    assert sorted(names[:3]) == ["abc0", "abc1", "new"]
+    assert names[3] == "kraj"
+    assert all(request.callback == resumed.spider.parse_item for request in order if "abc" in request.url)
+    assert resumed.next_request() is None
+    resumed.close("finished")
+    assert not (tmp_path / "frontier.ckpt").exists()
+
+
+def test_resume_after_a_torn_checkpoint_rewrites_it(tmp_path):
+    first = make_scheduler(FrontierPolicy(), tmp_path)
+    first.enqueue_request(
+        Request("https://wiadomosci.onet.pl/kraj/a/abc0", callback=first.spider.parse_item, meta={"frontier_class": "article"})
+    )
+    first.close("shutdown")
+    # Crash in the middle of appending the next segment
+    with open(tmp_path / "frontier.ckpt", "ab") as f:
+        f.write(b"OCKP\x02")
+
+    resumed = make_scheduler(FrontierPolicy(), tmp_path)
+    resumed.enqueue_request(
+        Request("https://wiadomosci.onet.pl/kraj/a/abc1", callback=resumed.spider.parse_item, meta={"frontier_class": "article"})
+    )
+    resumed.close("shutdown")
+
+    # What the resumed crawl added is not lost behind the torn segment
+    assert len(make_scheduler(FrontierPolicy(), tmp_path)) == 2
+
+
+def test_resume_of_100k_frontier_is_fast(tmp_path):
+    data = json.dumps(["https://wiadomosci.onet.pl/kraj/artykul/abc1", "parse_item", None, False, {"depth": 1}, {}]).encode()
+    rows = [PendingRequest(i.to_bytes(20, "big"), i % 100, "article", data) for i in range(100_000)]
+    CheckpointLog(str(tmp_path / "frontier.ckpt")).write_full(rows, {})
+
+    scheduler = make_scheduler(FrontierPolicy(), tmp_path, open_spider=False)
+
+    started = time.perf_counter()
+    scheduler.open(scheduler.crawler.spider)
+
+    assert time.perf_counter() - started < 1.0
+    assert len(scheduler) == 100_000
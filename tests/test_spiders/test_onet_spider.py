@@ -1,6 +1,8 @@
 from datetime import datetime
+from unittest.mock import MagicMock
 
 import pytest
+from scrapy.exceptions import DontCloseSpider
 from scrapy.http import HtmlResponse, Request
 
 from onet_scraper.spiders.onet import OnetSpider
@@ -273,3 +275,111 @@ def test_parse_item_deep_fallbacks(spider):
 
     assert item["author"] == "Deep Author"
     assert item["date"] == today_date
+
+
+def test_unknown_discovery_mode_rejected():
+    with pytest.raises(ValueError):
+        OnetSpider(discovery="rss-only")
+
+
+def test_parse_feed_schedules_fresh_articles_to_parse_item():
+    spider = OnetSpider(discovery="sitemap")
+    today = datetime.now().strftime("%Y-%m-%d")
+    body = f"""<?xml version="1.0"?>
+    <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+      <url><loc>https://wiadomosci.onet.pl/kraj/swiezy/abc1</loc><lastmod>{today}T08:00:00</lastmod></url>
+      <url><loc>https://wiadomosci.onet.pl/kraj/stary/abc2</loc><lastmod>2020-01-02</lastmod></url>
+      <url><loc>https://wiadomosci.onet.pl/autorzy/jan-kowalski/abc3</loc></url>
+    </urlset>"""
+    response = HtmlResponse(url="https://wiadomosci.onet.pl/sitemap-news.xml", body=body.encode("utf-8"))
+
+    requests = list(spider.parse_feed(response))
+
+    assert [r.url for r in requests] == ["https://wiadomosci.onet.pl/kraj/swiezy/abc1"]
+    assert requests[0].callback == spider.parse_item
+    assert requests[0].meta["freshness_days"] == spider.FRESHNESS_DAYS
+
+
+def test_parse_feed_follows_sitemap_index_as_xml():
+    spider = OnetSpider(discovery="sitemap")
+    body = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+      <sitemap><loc>https://wiadomosci.onet.pl/sitemap-1.xml</loc></sitemap></sitemapindex>"""
+    response = HtmlResponse(url="https://wiadomosci.onet.pl/sitemap.xml", body=body)
+
+    (request,) = spider.parse_feed(response)
+
+    assert request.callback == spider.parse_feed
+    assert "application/xml" in request.meta["allowed_content_types"]
+
+
+def test_continuous_mode_tracks_listing_changes():
+    spider = OnetSpider(mode="continuous")
+    html = '<div class="ods-c-card-wrapper"><a href="/kraj/pierwszy/abc1">A</a></div>'
+    spider.parse_listing(HtmlResponse(url="https://wiadomosci.onet.pl/kraj", body=html.encode("utf-8")))
+    html += '<div class="ods-c-card-wrapper"><a href="/kraj/drugi/abc2">B</a></div>'
+    response = HtmlResponse(url="https://wiadomosci.onet.pl/kraj", body=html.encode("utf-8"))
+
+    spider.parse_listing(response)
+
+    assert spider.revisits is not None
+    page = spider.revisits.pages["https://wiadomosci.onet.pl/kraj"]
+    assert page.polls == 2
+    assert len(page.links) == 2
+
+
+def test_continuous_mode_keeps_spider_open_and_polls_due_pages():
+    spider = OnetSpider(mode="continuous")
+    spider.crawler = MagicMock()
+    assert spider.revisits is not None
+    spider.revisits.observe("https://wiadomosci.onet.pl/", set(), now=0)
+
+    with pytest.raises(DontCloseSpider):
+        spider.spider_idle()
+
+    (request,) = [call.args[0] for call in spider.crawler.engine.crawl.call_args_list]
+    assert request.url == "https://wiadomosci.onet.pl/"
+    assert request.dont_filter
+
+
+def related_article(depth=0):
+    today = datetime.now().strftime("%Y-%m-%d")
+    url = "https://wiadomosci.onet.pl/kraj/artykul/abc1"
+    cards = f"""
+        <p class="hyphenate">Treść.</p>
+        <div class="ods-c-card-wrapper"><a href="/kraj/artykul/abc1">Ten sam</a></div>
+        <div class="ods-c-card-wrapper"><a href="/swiat/powiazany/def2">Powiązany</a><span class="date">{today}</span></div>
+        <div class="ods-o-card"><a href="/kraj/najczesciej-czytany/ghi3">Najczęściej czytany</a></div>
+        <div class="ods-o-card"><a href="/kraj/stary/jkl4">Stary</a><span class="date">2020-01-01</span></div>
+        <div class="ods-o-card"><a href="/sport/mecz/mno5">Sport</a></div>
+    """
+    body = create_mock_response(url, "Title", None, cards).body
+    return HtmlResponse(url=url, body=body, encoding="utf-8", request=Request(url, meta={"related_depth": depth}))
+
+
+def test_parse_item_follows_fresh_related_articles():
+    spider = OnetSpider()
+    spider.related_depth = 1
+
+    item, *results = spider.parse_item(related_article())
+    requests = [r for r in results if isinstance(r, Request)]
+
+    assert not isinstance(item, Request)
+    assert len(requests) == len(results)
+    assert item["url"] == "https://wiadomosci.onet.pl/kraj/artykul/abc1"
+    assert [r.url for r in requests] == [
+        "https://wiadomosci.onet.pl/swiat/powiazany/def2",
+        "https://wiadomosci.onet.pl/kraj/najczesciej-czytany/ghi3",
+    ]
+    assert [r.meta["listing_position"] for r in requests] == [0, 1]
+    assert requests[0].meta["card_date"] == datetime.now().strftime("%Y-%m-%d")
+    assert all(r.meta["frontier_class"] == "related" and r.meta["related_depth"] == 1 for r in requests)
+    assert all(r.meta["freshness_days"] == spider.FRESHNESS_DAYS for r in requests)
+
+
+def test_parse_item_related_discovery_is_bounded():
+    spider = OnetSpider()
+
+    assert len(list(spider.parse_item(related_article()))) == 1
+
+    spider.related_depth = 1
+    assert len(list(spider.parse_item(related_article(depth=1)))) == 1
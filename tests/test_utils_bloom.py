@@ -0,0 +1,78 @@
+import hashlib
+
+import pytest
+
+from onet_scraper.utils.bloom import AgingBloomFilter, BloomFilter, ScalableBloomFilter
+
+
+def key(i):
+    return hashlib.sha1(str(i).encode()).digest()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(key(i))
+
+    assert all(key(i) in bloom for i in range(1000))
+    false_positives = sum(key(i) in bloom for i in range(1000, 11000))
+    assert false_positives < 300  # 1% of 10000, with plenty of slack
+
+
+def test_scalable_filter_grows_and_keeps_error_rate():
+    bloom = ScalableBloomFilter(initial_capacity=100, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(key(i))
+
+    assert len(bloom.filters) > 1
+    assert len(bloom) == 1000
+    assert all(key(i) in bloom for i in range(1000))
+    assert sum(key(i) in bloom for i in range(1000, 11000)) < 300
+
+
+def test_aging_filter_forgets_old_keys():
+    now = [0.0]
+    bloom = AgingBloomFilter(capacity=100, error_rate=0.001, max_age=100, slices=4, clock=lambda: now[0])
+
+    assert bloom.add(b"first")
+    assert not bloom.add(b"first")
+    now[0] = 60
+    assert b"first" in bloom
+    now[0] = 101
+    assert b"first" not in bloom
+    assert bloom.add(b"first")
+
+
+def test_aging_filter_memory_stays_flat():
+    now = [0.0]
+    bloom = AgingBloomFilter(capacity=100, error_rate=0.001, max_age=100, slices=4, clock=lambda: now[0])
+    sizes = []
+    for step in range(20):
+        now[0] = step * 25.0
+        for i in range(80):
+            bloom.add(key(step * 1000 + i))
+        sizes.append(bloom.nbytes)
+
+    assert len(bloom.slices) <= 4
+    assert max(sizes[4:]) == sizes[4]
+
+
+def test_snapshot_round_trip():
+    now = [1000.0]
+    bloom = AgingBloomFilter(capacity=50, error_rate=0.001, max_age=100, clock=lambda: now[0])
+    for i in range(120):
+        bloom.add(key(i))
+
+    restored = AgingBloomFilter(capacity=50, error_rate=0.001, max_age=100, clock=lambda: now[0])
+    restored.load_bytes(bloom.to_bytes())
+
+    assert len(restored) == 120
+    assert all(key(i) in restored for i in range(120))
+    now[0] = 1200.0
+    restored.load_bytes(bloom.to_bytes())
+    assert len(restored) == 0  # Aged out while "stopped"
+
+
+def test_corrupt_snapshot_rejected():
+    with pytest.raises(ValueError):
+        AgingBloomFilter().load_bytes(b"not a snapshot")
@@ -0,0 +1,88 @@
+import pytest
+
+from onet_scraper.exceptions import FailureReason
+from onet_scraper.utils.body_guard import BodyGuard, BodyRejected
+from onet_scraper.utils.date_scanner import StaleDateScanner
+
+
+def test_html_body_is_collected():
+    guard = BodyGuard(max_bytes=100)
+    guard.check_headers(200, "text/html; charset=utf-8", "10")
+    guard.feed(b"<html>")
+    guard.feed(b"</html>")
+
+    assert guard.body == b"<html></html>"
+    assert guard.rejected is None
+
+
+def test_non_html_rejected_at_headers():
+    guard = BodyGuard()
+
+    with pytest.raises(BodyRejected) as exc_info:
+        guard.check_headers(200, "application/pdf", "5000")
+
+    assert exc_info.value.reason == FailureReason.NOT_HTML
+    assert exc_info.value.bytes_saved == 5000
+    assert guard.rejected is exc_info.value
+
+
+def test_announced_size_over_limit_rejected_at_headers():
+    guard = BodyGuard(max_bytes=1000)
+
+    with pytest.raises(BodyRejected) as exc_info:
+        guard.check_headers(200, "text/html", 5000)
+
+    assert exc_info.value.reason == FailureReason.TOO_LARGE
+    assert exc_info.value.received == 0
+
+
+def test_body_over_limit_rejected_mid_stream():
+    guard = BodyGuard(max_bytes=10)
+    guard.check_headers(200, "text/html", None)
+    guard.feed(b"12345")
+
+    with pytest.raises(BodyRejected) as exc_info:
+        guard.feed(b"1234567890")
+
+    assert exc_info.value.reason == FailureReason.TOO_LARGE
+    assert exc_info.value.received == 15
+
+
+def test_error_responses_pass_through_for_ban_detection():
+    guard = BodyGuard(max_bytes=5)
+    guard.check_headers(403, "text/plain", "100")
+    guard.feed(b"Access Denied")
+
+    assert guard.body == b"Access Denied"
+
+
+def test_stale_date_rejected_mid_stream():
+    guard = BodyGuard(scanner=StaleDateScanner(days_limit=3))
+    guard.check_headers(200, "text/html", "10000", "")
+    guard.feed(b"<html><head>")
+
+    with pytest.raises(BodyRejected) as exc_info:
+        guard.feed(b'<script>{"datePublished": "2020-01-02T10:00:00"}</script>')
+
+    assert exc_info.value.reason == FailureReason.STALE
+    assert exc_info.value.bytes_saved == 10000 - exc_info.value.received
+
+
+def test_compressed_body_aborted_mid_stream_saves_an_unknown_amount():
+    guard = BodyGuard(max_bytes=10)
+    guard.check_headers(200, "text/html", "8", "gzip")
+
+    with pytest.raises(BodyRejected) as exc_info:
+        guard.feed(b"<p>" * 5)
+
+    assert exc_info.value.bytes_saved is None
+
+
+def test_unknown_encoding_aborted_mid_stream_saves_an_unknown_amount():
+    guard = BodyGuard(max_bytes=10)
+    guard.check_headers(200, "text/html", "10")
+
+    with pytest.raises(BodyRejected) as exc_info:
+        guard.feed(b"<p>" * 5)
+
+    assert exc_info.value.bytes_saved is None
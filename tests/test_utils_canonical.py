@@ -0,0 +1,56 @@
+from onet_scraper.spiders.onet import OnetSpider
+from onet_scraper.utils.canonical import UrlCanonicalizer, canonical_url
+
+
+def test_variants_collapse_to_one_url():
+    variants = [
+        "https://wiadomosci.onet.pl/kraj/nowy-rzad/abc1",
+        "http://wiadomosci.onet.pl/kraj/nowy-rzad/abc1/",
+        "https://WWW.wiadomosci.onet.pl/kraj/nowy-rzad/abc1#komentarze",
+        "https://wiadomosci.onet.pl/kraj/nowy-rzad/abc1?utm_source=fb&utm_medium=social&fbclid=x1",
+        "https://wiadomosci.onet.pl/kraj/nowy-rzad/abc1?srcc=ucs&ocid=1",
+    ]
+
+    assert {canonical_url(url) for url in variants} == {"https://wiadomosci.onet.pl/kraj/nowy-rzad/abc1"}
+
+
+def test_meaningful_parts_are_kept():
+    assert canonical_url("https://wiadomosci.onet.pl/kraj?utm_source=x&page=2") == "https://wiadomosci.onet.pl/kraj?page=2"
+    assert canonical_url("https://wiadomosci.onet.pl/") == "https://wiadomosci.onet.pl/"
+    # www. only goes when it sits in front of a subdomain
+    assert canonical_url("https://www.onet.pl/informacje") == "https://www.onet.pl/informacje"
+    assert canonical_url("http://example.com/a/") == "http://example.com/a"
+
+
+def test_redirects_resolve_later_links():
+    canonicalizer = UrlCanonicalizer()
+
+    assert canonicalizer.record_redirect(
+        "https://wiadomosci.onet.pl/kraj/stary/abc1", "https://wiadomosci.onet.pl/kraj/nowy/abc1"
+    )
+    assert canonicalizer.record_redirect(
+        "https://wiadomosci.onet.pl/kraj/nowy/abc1", "https://wiadomosci.onet.pl/swiat/nowy/abc1"
+    )
+    # A soft ban to the front page teaches nothing
+    assert not canonicalizer.record_redirect("https://wiadomosci.onet.pl/kraj/inny/def2", "https://www.onet.pl/")
+
+    assert canonicalizer.canonical("http://wiadomosci.onet.pl/kraj/stary/abc1/?utm_source=x") == (
+        "https://wiadomosci.onet.pl/swiat/nowy/abc1"
+    )
+    assert canonicalizer.canonical("https://wiadomosci.onet.pl/kraj/inny/def2") == "https://wiadomosci.onet.pl/kraj/inny/def2"
+
+
+def test_redirect_map_is_bounded():
+    canonicalizer = UrlCanonicalizer(max_redirects=2)
+    for i in range(3):
+        canonicalizer.record_redirect(f"https://wiadomosci.onet.pl/a/{i}", f"https://wiadomosci.onet.pl/b/{i}")
+
+    assert list(canonicalizer.redirects) == ["https://wiadomosci.onet.pl/a/1", "https://wiadomosci.onet.pl/a/2"]
+
+
+def test_articles_deduplicated_by_spider_id():
+    canonicalizer = UrlCanonicalizer(OnetSpider.ARTICLE_PATTERN, OnetSpider.ID_PATTERN)
+
+    assert canonicalizer.dedupe_key("https://wiadomosci.onet.pl/kraj/tytul/abc123/?utm_source=x") == "article:abc123"
+    assert canonicalizer.dedupe_key("https://wiadomosci.onet.pl/swiat/inny-tytul/abc123") == "article:abc123"
+    assert canonicalizer.dedupe_key("https://wiadomosci.onet.pl/kraj/") == "https://wiadomosci.onet.pl/kraj"
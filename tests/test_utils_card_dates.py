@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from scrapy.http import HtmlResponse
+
+from onet_scraper.utils.card_dates import harvest_card_dates, parse_card_date, url_date
+
+NOW = datetime(2024, 5, 10, 12, 0)
+
+
+def test_parse_card_date_formats():
+    assert parse_card_date("2024-05-01T08:00:00+02:00", NOW) == "2024-05-01"
+    assert parse_card_date("Opublikowano 3.05.2024, 10:15", NOW) == "2024-05-03"
+    assert parse_card_date("2 godz. temu", NOW) == "2024-05-10"
+    assert parse_card_date("wczoraj, 18:30", NOW) == "2024-05-09"
+    assert parse_card_date("3 dni temu", NOW) == "2024-05-07"
+    assert parse_card_date("tydzień temu", NOW) == "2024-05-03"
+    assert parse_card_date("Polityka", NOW) is None
+    assert parse_card_date(None, NOW) is None
+
+
+def test_url_date():
+    assert url_date("https://wiadomosci.onet.pl/2023/11/02/kraj/artykul") == "2023-11-02"
+    assert url_date("https://wiadomosci.onet.pl/kraj/artykul/abc123") is None
+
+
+def test_harvest_card_dates_maps_links_to_their_card():
+    html = """
+    <div class="ods-c-card-wrapper">
+        <a href="/kraj/stary/abc1">Stary</a><time datetime="2020-01-02T10:00:00">2 stycznia</time>
+    </div>
+    <div class="ods-o-card"><a href="/swiat/nowy/def2">Nowy</a><span class="ods-m-date">12.03.2024</span></div>
+    <div class="ods-o-card"><a href="/swiat/bez-daty/ghi3">Bez daty</a></div>
+    """
+    response = HtmlResponse(url="https://wiadomosci.onet.pl/", body=html.encode("utf-8"))
+
+    assert harvest_card_dates(response) == {
+        "https://wiadomosci.onet.pl/kraj/stary/abc1": "2020-01-02",
+        "https://wiadomosci.onet.pl/swiat/nowy/def2": "2024-03-12",
+    }
+
+
+def test_harvest_card_dates_ignores_dates_in_the_headline():
+    html = """
+    <div class="ods-c-card-wrapper">
+        <a href="/kraj/rocznica/abc1"><h3>Rocznica katastrofy z 10.04.2010</h3></a>
+        <span class="ods-m-date">2 godz. temu</span>
+    </div>
+    <div class="ods-o-card"><a href="/kraj/wspomnienie/def2">Co się stało 10.04.2010</a></div>
+    """
+    response = HtmlResponse(url="https://wiadomosci.onet.pl/", body=html.encode("utf-8"))
+
+    dates = harvest_card_dates(response)
+
+    assert dates == {"https://wiadomosci.onet.pl/kraj/rocznica/abc1": datetime.now().strftime("%Y-%m-%d")}
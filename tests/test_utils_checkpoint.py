@@ -0,0 +1,105 @@
+import os
+from hashlib import sha1
+
+from scrapy import Spider
+from scrapy.http import Request
+
+from onet_scraper.utils.checkpoint import CheckpointLog, PendingRequest, decode_requests, encode_requests
+
+
+class _Spider(Spider):
+    name = "test"
+
+    def parse_item(self, response):
+        pass
+
+
+def row(url, priority=0, **meta):
+    spider = _Spider()
+    request = Request(url, callback=spider.parse_item, priority=priority, meta=meta)
+    return PendingRequest.from_request(request, sha1(url.encode()).digest(), spider)
+
+
+def test_request_round_trip():
+    spider = _Spider()
+    request = Request(
+        "https://wiadomosci.onet.pl/kraj/a/abc1",
+        callback=spider.parse_item,
+        priority=120,
+        meta={"frontier_class": "article", "download_slot": object()},
+        cb_kwargs={"rule": 1},
+    )
+
+    pending = PendingRequest.from_request(request, b"\0" * 20, spider)
+    assert pending is not None
+    (decoded,) = decode_requests(encode_requests([pending]))
+    restored = decoded.to_request(spider)
+
+    assert restored is not None
+    assert restored.url == request.url
+    assert restored.callback == spider.parse_item
+    assert restored.priority == 120
+    assert restored.cb_kwargs == {"rule": 1}
+    # Values that are not JSON, like download slots, do not survive a restart
+    assert restored.meta == {"frontier_class": "article"}
+    assert (decoded.priority, decoded.kind) == (120, "article")
+
+
+def test_request_whose_callback_is_gone_is_not_restored():
+    pending = row("https://wiadomosci.onet.pl/kraj/a/abc1")
+
+    assert pending.to_request(Spider(name="other")) is None
+
+
+def test_requests_with_foreign_callbacks_or_bodies_are_not_checkpointed():
+    spider = _Spider()
+
+    assert PendingRequest.from_request(Request("https://onet.pl", callback=print), b"\0" * 20, spider) is None
+    assert PendingRequest.from_request(Request("https://onet.pl", method="POST", body=b"x"), b"\0" * 20, spider) is None
+
+
+def test_log_replays_full_and_incremental_segments(tmp_path):
+    log = CheckpointLog(str(tmp_path / "frontier.ckpt"))
+    first, second, third = (
+        row("https://onet.pl/a", 5, frontier_class="article"),
+        row("https://onet.pl/b"),
+        row("https://onet.pl/c"),
+    )
+    log.write_full([first, second], {"onet/skipped/seen": 3})
+    log.append([third], [second.fingerprint], {"onet/skipped/seen": 4})
+
+    state = CheckpointLog(log.path).load()
+
+    assert state is not None
+    assert list(state.pending) == [first.fingerprint, third.fingerprint]
+    assert state.pending[first.fingerprint] == first
+    assert state.stats == {"onet/skipped/seen": 4}
+
+
+def test_damaged_tail_is_ignored(tmp_path):
+    log = CheckpointLog(str(tmp_path / "frontier.ckpt"))
+    log.write_full([row("https://onet.pl/a")], {})
+    full_size = os.path.getsize(log.path)
+    log.append([row("https://onet.pl/b")], [], {})
+    # Crash in the middle of appending the next segment
+    with open(log.path, "r+b") as f:
+        f.truncate(full_size + 12)
+
+    state = log.load()
+
+    assert state is not None and state.damaged
+    restored = [request.to_request(_Spider()) for request in state.pending.values()]
+    assert [request.url for request in restored if request is not None] == ["https://onet.pl/a"]
+
+
+def test_compaction_once_deltas_outgrow_the_full_segment(tmp_path):
+    log = CheckpointLog(str(tmp_path / "frontier.ckpt"), compact_ratio=2.0, min_compact_size=0)
+    assert log.needs_compaction()
+    log.write_full([row(f"https://onet.pl/{i}") for i in range(10)], {})
+    assert not log.needs_compaction()
+
+    for i in range(10):
+        log.append([row(f"https://onet.pl/new/{i}")], [], {})
+
+    assert log.needs_compaction()
+    assert CheckpointLog(str(tmp_path / "missing.ckpt")).load() is None
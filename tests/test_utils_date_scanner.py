@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from onet_scraper.utils.date_scanner import StaleDateScanner
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def test_stale_json_ld_date_detected():
+    scanner = StaleDateScanner(days_limit=3)
+
+    assert scanner.feed(f'{{"@type": "NewsArticle", "datePublished": "{days_ago(10)}T08:00:00+01:00"}}'.encode())
+    assert scanner.date is not None
+    assert scanner.date.startswith(days_ago(10))
+
+
+def test_recent_date_not_stale():
+    scanner = StaleDateScanner(days_limit=3)
+
+    assert not scanner.feed(f'"datePublished":"{days_ago(1)}T08:00:00"'.encode())
+    assert scanner.done
+
+
+def test_marker_split_across_chunks():
+    scanner = StaleDateScanner(days_limit=3)
+    html = f'<span class="ods-m-date-authorship__publication">{days_ago(7)} 10:00</span>'.encode()
+
+    assert not scanner.feed(b"<html>" + html[:30])
+    assert scanner.feed(html[30:])
+
+
+def test_unparseable_date_is_not_stale():
+    scanner = StaleDateScanner(days_limit=3)
+
+    assert not scanner.feed(b'<span class="ods-m-date-authorship__publication">12 stycznia, 10:00</span>')
+    assert not scanner.done
+    assert scanner.date is None
+
+
+def test_unparseable_visual_date_does_not_hide_a_later_json_ld_date():
+    scanner = StaleDateScanner(days_limit=3)
+
+    assert not scanner.feed(b'<span class="ods-m-date-authorship__publication">Dzisiaj 10:00 </span>')
+    assert scanner.feed(f'<script>{{"datePublished": "{days_ago(10)}T08:00:00+01:00"}}</script>'.encode())
+    assert scanner.date is not None
+    assert scanner.date.startswith(days_ago(10))
+
+
+def test_scanning_stops_after_limit():
+    scanner = StaleDateScanner(days_limit=3, max_scan_bytes=100)
+    scanner.feed(b"x" * 100)
+
+    assert scanner.done
+    assert not scanner.feed(f'"datePublished":"{days_ago(10)}"'.encode())
@@ -2,7 +2,7 @@ from datetime import datetime, timedelta
 
 from scrapy.http import HtmlResponse
 
-from onet_scraper.utils.extractors import extract_json_ld, parse_is_recent
+from onet_scraper.utils.extractors import extract_json_ld, is_stale, parse_is_recent
 
 # --- Tests for parse_is_recent ---
 
@@ -33,6 +33,14 @@ def test_parse_is_recent_invalid_format():
     assert parse_is_recent(None) is False
 
 
+def test_is_stale_only_for_known_old_dates():
+    days_ago_5 = (datetime.now() - timedelta(days=5)).strftime("%Y-%m-%d")
+    assert is_stale(days_ago_5, days_limit=3) is True
+    assert is_stale(datetime.now().strftime("%Y-%m-%d"), days_limit=3) is False
+    assert is_stale("not-a-date") is False
+    assert is_stale(None) is False
+
+
 def test_parse_is_recent_ISO_format():
     today = datetime.now().strftime("%Y-%m-%d")
     iso_date = f"{today}T12:00:00+01:00"
@@ -0,0 +1,48 @@
+import gzip
+
+from onet_scraper.utils.feeds import FeedEntry, iter_feed_entries
+
+NEWS_SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">
+  <url>
+    <loc>https://wiadomosci.onet.pl/kraj/pierwszy/abc1</loc>
+    <lastmod>2024-05-10T12:00:00+02:00</lastmod>
+    <news:news><news:publication_date>2024-05-09T08:00:00+02:00</news:publication_date></news:news>
+  </url>
+  <url><loc>https://wiadomosci.onet.pl/swiat/drugi/def2</loc></url>
+</urlset>"""
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://wiadomosci.onet.pl/sitemap-1.xml</loc><lastmod>2024-05-10</lastmod></sitemap>
+</sitemapindex>"""
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Onet</title><link>https://wiadomosci.onet.pl/</link>
+  <item><title>A</title><link>https://wiadomosci.onet.pl/kraj/a/xyz9</link>
+  <pubDate>Thu, 09 May 2024 08:00:00 +0200</pubDate></item>
+</channel></rss>"""
+
+
+def test_news_sitemap_prefers_publication_date():
+    assert list(iter_feed_entries(NEWS_SITEMAP)) == [
+        FeedEntry("https://wiadomosci.onet.pl/kraj/pierwszy/abc1", "2024-05-09T08:00:00+02:00"),
+        FeedEntry("https://wiadomosci.onet.pl/swiat/drugi/def2", None),
+    ]
+
+
+def test_sitemap_index_entries_are_marked():
+    assert list(iter_feed_entries(gzip.compress(SITEMAP_INDEX))) == [
+        FeedEntry("https://wiadomosci.onet.pl/sitemap-1.xml", "2024-05-10", index=True)
+    ]
+
+
+def test_rss_dates_normalized():
+    assert list(iter_feed_entries(RSS)) == [FeedEntry("https://wiadomosci.onet.pl/kraj/a/xyz9", "2024-05-09T08:00:00+02:00")]
+
+
+def test_truncated_feed_keeps_complete_entries():
+    entries = list(iter_feed_entries(NEWS_SITEMAP[: NEWS_SITEMAP.index(b"<url><loc>https://wiadomosci.onet.pl/swiat")]))
+
+    assert [entry.url for entry in entries] == ["https://wiadomosci.onet.pl/kraj/pierwszy/abc1"]
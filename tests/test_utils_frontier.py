@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from scrapy.http import Request
+
+from onet_scraper.utils.frontier import FrontierPolicy
+
+
+def request(kind=None, **meta):
+    if kind is not None:
+        meta["frontier_class"] = kind
+    return Request("https://wiadomosci.onet.pl/x", meta=meta)
+
+
+def test_articles_outrank_listings_and_pagination():
+    policy = FrontierPolicy()
+    article, category, pagination = request("article"), request("category"), request("pagination")
+    for r in (article, category, pagination):
+        assert policy.admit(r)
+
+    assert article.priority > category.priority > pagination.priority
+
+
+def test_top_of_listing_and_fresh_cards_go_first():
+    policy = FrontierPolicy(position_slots=20, age_penalty=10)
+    today = datetime.now().strftime("%Y-%m-%d")
+    two_days_ago = (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d")
+
+    top = request("article", listing_position=0, card_date=today)
+    lower = request("article", listing_position=15, card_date=today)
+    older = request("article", listing_position=0, card_date=two_days_ago)
+
+    assert policy.priority(top) == 120
+    assert policy.priority(lower) == 105
+    assert policy.priority(older) == 100
+
+
+def test_bounded_class_refuses_until_dequeued():
+    policy = FrontierPolicy(max_pending={"pagination": 1})
+    first, second = request("pagination"), request("pagination")
+
+    assert policy.admit(first)
+    policy.on_enqueued(first)
+    assert not policy.admit(second)
+    policy.on_dequeued(first)
+    assert policy.admit(second)
+
+
+def test_untagged_requests_untouched_and_priority_added_once():
+    policy = FrontierPolicy()
+    plain = request()
+    assert policy.admit(plain)
+    assert plain.priority == 0
+
+    article = request("article")
+    policy.admit(article)
+    retry = article.replace(priority=article.priority - 1)
+    policy.admit(retry)
+    assert retry.priority == article.priority - 1
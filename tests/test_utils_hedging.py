@@ -0,0 +1,41 @@
+from onet_scraper.utils.hedging import HedgeBudget, LatencyTracker
+
+
+def test_percentile_needs_min_samples():
+    tracker = LatencyTracker(min_samples=5)
+    for latency in range(4):
+        tracker.add(float(latency))
+
+    assert tracker.percentile(90) is None
+
+    tracker.add(4.0)
+    assert tracker.percentile(90) == 4.0
+
+
+def test_percentile_nearest_rank():
+    tracker = LatencyTracker(min_samples=1)
+    for latency in range(1, 101):
+        tracker.add(float(latency))
+
+    assert tracker.percentile(50) == 50.0
+    assert tracker.percentile(90) == 90.0
+    assert tracker.percentile(99) == 99.0
+
+
+def test_tracker_keeps_recent_window():
+    tracker = LatencyTracker(size=3, min_samples=1)
+    for latency in [100.0, 1.0, 2.0, 3.0]:
+        tracker.add(latency)
+
+    assert tracker.percentile(100) == 3.0
+
+
+def test_hedge_budget_caps_extra_load():
+    budget = HedgeBudget(max_ratio=0.1)
+    for _ in range(20):
+        budget.record_request()
+
+    granted = sum(budget.try_acquire() for _ in range(10))
+
+    assert granted == 2
+    assert budget.rate == 0.1
@@ -0,0 +1,39 @@
+from onet_scraper.utils.histograms import StreamingHistogram
+
+
+def test_empty_histogram():
+    histogram = StreamingHistogram()
+
+    assert histogram.quantile(0.5) is None
+    assert histogram.summary() == {"count": 0}
+
+
+def test_quantiles_within_relative_error():
+    histogram = StreamingHistogram(min_value=0.001, growth=1.1)
+    for ms in range(1, 1001):
+        histogram.add(ms / 1000)
+
+    for q, expected in [(0.5, 0.5), (0.9, 0.9), (0.99, 0.99)]:
+        value = histogram.quantile(q)
+        assert value is not None
+        assert abs(value - expected) / expected < 0.1
+
+
+def test_summary_tracks_count_mean_and_max():
+    histogram = StreamingHistogram()
+    for value in [1.0, 2.0, 3.0]:
+        histogram.add(value)
+
+    summary = histogram.summary()
+    assert summary["count"] == 3
+    assert summary["mean"] == 2.0
+    assert summary["max"] == 3.0
+
+
+def test_memory_is_bounded_by_bucket_count():
+    histogram = StreamingHistogram(min_value=0.001, growth=1.1)
+    for i in range(100_000):
+        histogram.add((i % 30_000) / 1000)
+
+    assert len(histogram._buckets) < 150
+    assert histogram.count == 100_000
@@ -0,0 +1,61 @@
+import pytest
+from scrapy.http import HtmlResponse
+from scrapy.linkextractors import LinkExtractor
+from scrapy.spiders import CrawlSpider
+
+from onet_scraper.spiders.onet import OnetSpider
+from onet_scraper.utils.link_classifier import LinkClassifier
+
+LISTING = """
+<html><head><base href="https://wiadomosci.onet.pl/"></head><body>
+<nav>
+  <a href="/kraj">Kraj</a> <a href=" /swiat ">Świat</a> <a href="/pogoda">Pogoda</a>
+  <a href="https://przegladsportowy.onet.pl/pilka">Sport</a> <a href="/szukaj">Szukaj</a>
+  <a href="/kraj/nowy-rzad/abc1">Menu: nowy rząd</a>
+  <a href="mailto:redakcja@onet.pl">Kontakt</a> <a>bez linku</a>
+</nav>
+<div class="ods-c-card-wrapper">
+  <a href="/kraj/nowy-rzad/abc1">Nowy rząd</a> <a href="/kraj/nowy-rzad/abc1#komentarze">Komentarze</a>
+  <div class="ods-c-card-wrapper"><a href="/swiat/szczyt-nato/def2"><span>Szczyt</span> NATO</a></div>
+</div>
+<div class="ods-o-card"><a href="/swiat/szczyt-nato/def2">NATO</a><a href="/kraj/sport-i-polityka/ghi3">Sport</a></div>
+<div class="promo ods-o-card"><a href="/oferta/kredyt/zzz9">Oferta</a><a href="/kraj/zdjecie/img.jpg">Foto</a></div>
+<div class="ods-c-card-wrapper"><a href="kraj/relatywny/jkl4" rel="nofollow">Relatywny</a></div>
+<a href="/archiwum/2026-10-01">Archiwum</a>
+<div class="pagination"><a class="ods-pagination__next" href="/kraj?page=2">Dalej</a>
+  <a class="prev" href="/kraj?page=0">Wstecz</a></div>
+</body></html>
+"""
+
+
+def listing(body=LISTING, url="https://wiadomosci.onet.pl/kraj"):
+    return HtmlResponse(url=url, body=body.encode("utf-8"), encoding="utf-8")
+
+
+def test_extract_matches_each_link_extractor():
+    spider = OnetSpider()
+    response = listing()
+
+    expected = [rule.link_extractor.extract_links(response) for rule in spider.rules]
+
+    assert LinkClassifier(rule.link_extractor for rule in spider.rules).extract(response) == expected
+    # The fixture exercises every rule
+    assert all(expected)
+
+
+def test_spider_follows_the_same_requests_as_crawl_spider():
+    response = listing()
+    spider = OnetSpider()
+    ours = [r for r in spider._requests_to_follow(response) if r is not None]
+    reference = [r for r in CrawlSpider._requests_to_follow(OnetSpider(), response) if r is not None]
+
+    assert [(r.url, getattr(r.callback, "__name__", None), r.meta) for r in ours] == [
+        (r.url, getattr(r.callback, "__name__", None), r.meta) for r in reference
+    ]
+    # The page and its parsed tree are not kept alive once its links are followed
+    assert spider._page_links[0] is None
+
+
+def test_rejects_extractor_options_it_cannot_replicate():
+    with pytest.raises(ValueError):
+        LinkClassifier([LinkExtractor(canonicalize=True)])
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from onet_scraper.utils.pagination import PaginationPruner
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def test_section_is_first_path_segment():
+    assert PaginationPruner.section("https://wiadomosci.onet.pl/kraj?page=3") == "kraj"
+    assert PaginationPruner.section("https://wiadomosci.onet.pl/swiat/2") == "swiat"
+    assert PaginationPruner.section("https://wiadomosci.onet.pl/") == ""
+
+
+def test_follows_while_newest_article_is_fresh():
+    pruner = PaginationPruner(days_limit=3)
+
+    assert pruner.should_follow("https://wiadomosci.onet.pl/kraj", [days_ago(10), days_ago(1)])
+    assert pruner.should_follow("https://wiadomosci.onet.pl/kraj", [])
+
+
+def test_stale_page_exhausts_its_section_only():
+    pruner = PaginationPruner(days_limit=3)
+
+    assert not pruner.should_follow("https://wiadomosci.onet.pl/kraj?page=4", [days_ago(5), days_ago(9)])
+    # Later pages of the section are pruned even without dates of their own
+    assert not pruner.should_follow("https://wiadomosci.onet.pl/kraj?page=2", [])
+    assert pruner.should_follow("https://wiadomosci.onet.pl/swiat?page=4", [days_ago(0)])
+
+
+def test_exhausted_section_is_paginated_again_once_fresh_or_expired():
+    pruner = PaginationPruner(days_limit=3, ttl=600.0)
+    assert not pruner.should_follow("https://wiadomosci.onet.pl/kraj?page=4", [days_ago(5)], now=0.0)
+
+    # The first page, polled again, shows a new article
+    assert pruner.should_follow("https://wiadomosci.onet.pl/kraj", [days_ago(0), days_ago(5)], now=60.0)
+    assert pruner.should_follow("https://wiadomosci.onet.pl/kraj?page=2", [], now=61.0)
+
+    assert not pruner.should_follow("https://wiadomosci.onet.pl/kraj?page=3", [days_ago(6)], now=100.0)
+    assert not pruner.should_follow("https://wiadomosci.onet.pl/kraj?page=2", [], now=700.0)
+    assert pruner.should_follow("https://wiadomosci.onet.pl/kraj?page=2", [], now=701.0)
@@ -0,0 +1,97 @@
+import json
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+from onet_scraper.utils.profile_selector import RoundRobinSelector, ThompsonSelector, selector_from_settings
+
+PROFILES = ["chrome120", "safari17_0", "edge101"]
+
+
+def test_round_robin_cycles_profiles():
+    selector = RoundRobinSelector(PROFILES)
+
+    assert [selector.choose() for _ in range(4)] == PROFILES + ["chrome120"]
+
+
+def test_thompson_prefers_profile_that_is_not_banned():
+    selector = ThompsonSelector(PROFILES, rng=random.Random(1))
+    for _ in range(30):
+        selector.update("chrome120", success=False)
+        selector.update("safari17_0", success=True, latency=1.0)
+        selector.update("edge101", success=False)
+
+    picks = [selector.choose() for _ in range(100)]
+
+    assert picks.count("safari17_0") > 90
+
+
+def test_thompson_latency_breaks_ties():
+    selector = ThompsonSelector(PROFILES[:2], rng=random.Random(2), latency_target=2.0)
+    for _ in range(50):
+        selector.update("chrome120", success=True, latency=20.0)
+        selector.update("safari17_0", success=True, latency=0.5)
+
+    picks = [selector.choose() for _ in range(100)]
+
+    assert picks.count("safari17_0") > 90
+
+
+def test_thompson_per_lane_statistics():
+    selector = ThompsonSelector(PROFILES, per_lane=True)
+    selector.update("chrome120", success=False, lane="lane0")
+    selector.update("chrome120", success=True, lane="lane1")
+
+    assert selector.arms["lane0|chrome120"].failures == 1
+    assert selector.arms["lane1|chrome120"].successes == 1
+
+
+def test_thompson_forgets_old_evidence():
+    selector = ThompsonSelector(PROFILES, max_observations=10)
+    for _ in range(20):
+        selector.update("chrome120", success=False)
+    for _ in range(10):
+        selector.update("chrome120", success=True)
+
+    arm = selector.arms["chrome120"]
+    assert arm.successes + arm.failures == pytest.approx(10)
+    assert arm.successes > 5
+
+
+def test_thompson_state_survives_restart(tmp_path):
+    state_file = tmp_path / "stats" / "profiles.json"
+    selector = ThompsonSelector(PROFILES, state_file=str(state_file))
+    selector.update("edge101", success=True, latency=1.5)
+    selector.save()
+
+    restored = ThompsonSelector(PROFILES, state_file=str(state_file))
+
+    assert restored.arms["edge101"].successes == 1
+    assert restored.arms["edge101"].latency_ewma == 1.5
+
+
+def test_thompson_ignores_corrupt_state(tmp_path):
+    state_file = tmp_path / "profiles.json"
+    state_file.write_text(json.dumps({"arms": {"chrome120": {"bogus": 1}}}))
+
+    selector = ThompsonSelector(PROFILES, state_file=str(state_file))
+
+    assert selector.arms == {}
+
+
+def test_selector_from_settings():
+    settings = MagicMock()
+    settings.get.side_effect = lambda key, default=None: {"TOR_PROFILE_STRATEGY": "thompson"}.get(key, default)
+    settings.getbool.return_value = True
+    settings.getfloat.return_value = 3.0
+
+    selector = selector_from_settings(settings, PROFILES)
+
+    assert isinstance(selector, ThompsonSelector)
+    assert selector.per_lane is True
+    assert selector.state_file is None
+
+    settings.get.side_effect = lambda key, default=None: "random" if key == "TOR_PROFILE_STRATEGY" else default
+    with pytest.raises(ValueError):
+        selector_from_settings(settings, PROFILES)
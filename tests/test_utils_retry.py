@@ -0,0 +1,35 @@
+from onet_scraper.utils.retry import RetryBudget, RetryPolicy
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+
+    for attempt, ceiling in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (10, 5.0)]:
+        delays = [policy.backoff(attempt) for _ in range(50)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+
+
+def test_budget_allows_minimum_retries_when_quiet():
+    budget = RetryBudget(ratio=0.1, min_retries=2, window=60.0)
+
+    assert budget.try_acquire(now=0.0)
+    assert budget.try_acquire(now=0.0)
+    assert not budget.try_acquire(now=0.0)
+
+
+def test_budget_scales_with_request_rate():
+    budget = RetryBudget(ratio=0.2, min_retries=0, window=60.0)
+    for _ in range(50):
+        budget.record_request(now=0.0)
+
+    granted = sum(budget.try_acquire(now=1.0) for _ in range(20))
+
+    assert granted == 10
+
+
+def test_budget_window_expires_old_retries():
+    budget = RetryBudget(ratio=0.0, min_retries=1, window=10.0)
+
+    assert budget.try_acquire(now=0.0)
+    assert not budget.try_acquire(now=5.0)
+    assert budget.try_acquire(now=11.0)
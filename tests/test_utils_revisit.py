@@ -0,0 +1,53 @@
+from onet_scraper.utils.revisit import RevisitScheduler
+
+
+def links(*ids):
+    return {f"https://wiadomosci.onet.pl/kraj/a/{i}" for i in ids}
+
+
+def test_first_poll_sets_baseline():
+    scheduler = RevisitScheduler(initial_interval=300)
+
+    assert scheduler.observe("front", links(1, 2, 3), now=0) == 0
+    assert scheduler.due(now=299) == []
+    assert scheduler.due(now=300) == ["front"]
+
+
+def test_fast_page_polled_more_often_than_slow_page():
+    scheduler = RevisitScheduler(min_interval=60, max_interval=3600, initial_interval=300)
+    scheduler.observe("front", links(1, 2, 3), now=0)
+    scheduler.observe("regional", links(1, 2, 3), now=0)
+
+    # Front page gains 5 articles in 300s, the regional section none
+    assert scheduler.observe("front", links(1, 2, 3, 4, 5, 6, 7, 8), now=300) == 5
+    assert scheduler.observe("regional", links(1, 2, 3), now=300) == 0
+
+    assert scheduler.pages["front"].interval == 60
+    assert scheduler.pages["regional"].interval == 600
+
+
+def test_interval_follows_change_rate():
+    scheduler = RevisitScheduler(min_interval=10, max_interval=3600, initial_interval=300, target_new=1)
+    scheduler.observe("section", links(1), now=0)
+
+    scheduler.observe("section", links(1, 2), now=300)
+
+    assert scheduler.pages["section"].interval == 300  # One new article per 300s
+
+
+def test_quiet_page_backs_off_to_max_interval():
+    scheduler = RevisitScheduler(max_interval=1000, initial_interval=300)
+    scheduler.observe("regional", links(1), now=0)
+    for step in range(1, 6):
+        scheduler.observe("regional", links(1), now=step * 1000)
+
+    assert scheduler.pages["regional"].interval == 1000
+
+
+def test_due_pushes_page_back_until_observed():
+    scheduler = RevisitScheduler(initial_interval=100)
+    scheduler.observe("front", links(1), now=0)
+
+    assert scheduler.due(now=100) == ["front"]
+    assert scheduler.due(now=150) == []  # Poll in flight
+    assert scheduler.due(now=200) == ["front"]  # Poll never answered, try again
@@ -0,0 +1,62 @@
+from collections import deque
+
+from onet_scraper.utils.rotation import RotationPolicy, survival_quantile
+
+
+def test_survival_quantile_uncensored():
+    observations = deque((float(lifetime), True) for lifetime in range(1, 11))
+
+    assert survival_quantile(observations, 0.1) == 1.0
+    assert survival_quantile(observations, 0.5) == 5.0
+
+
+def test_survival_quantile_accounts_for_censoring():
+    # Half the identities were retired early without a ban; they must not count as survivors forever
+    observations = deque([(5.0, False)] * 5 + [(10.0, True)] * 5)
+
+    assert survival_quantile(observations, 0.1) == 10.0
+    assert survival_quantile(deque([(5.0, False)] * 5), 0.1) is None
+
+
+def test_policy_learns_request_limit_after_min_bans():
+    policy = RotationPolicy(ban_risk=0.1, min_bans=3)
+    for identity in range(3):
+        circuit = ("lane0", identity)
+        for _ in range(20):
+            policy.on_request(circuit)
+        assert not policy.should_rotate(circuit)
+        policy.on_ban(circuit)
+
+    assert policy.request_limit == 20
+
+    circuit = ("lane0", 3)
+    for _ in range(18):
+        policy.on_request(circuit)
+    assert policy.should_prewarm(circuit)
+    assert not policy.should_rotate(circuit)
+    # The 20th request got banned before, so the 19th is the last one sent
+    policy.on_request(circuit)
+    assert policy.should_rotate(circuit)
+
+
+def test_short_age_limit_is_ignored():
+    policy = RotationPolicy(min_bans=1, min_age_limit=30.0)
+    policy.on_request(("lane0", 0))
+    policy.on_ban(("lane0", 0))
+    policy.on_request(("lane0", 1))
+
+    assert policy.age_limit is not None and policy.age_limit < 30.0
+    # One request per identity is the learned limit; age alone would have rotated already
+    assert policy.should_rotate(("lane0", 1))
+    policy.request_limit = None
+    assert not policy.should_rotate(("lane0", 1))
+
+
+def test_retired_identity_recorded_as_censored():
+    policy = RotationPolicy(min_bans=1)
+    policy.on_request(("lane0", 0))
+    policy.on_retire(("lane0", 0))
+    policy.on_retire(("lane0", 1))  # never used: nothing to learn
+
+    assert policy.retired == 1
+    assert policy.request_limit is None
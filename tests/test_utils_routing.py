@@ -0,0 +1,48 @@
+import re
+
+from onet_scraper.utils.routing import DEFAULT_ROUTES, Route, RouteTable
+
+
+def make_table(**kwargs):
+    routes = [Route(spec["name"], re.compile(spec["pattern"]), direct=spec["direct"]) for spec in DEFAULT_ROUTES]
+    return RouteTable(routes, **kwargs)
+
+
+def test_default_routes_classify_listings_and_articles():
+    table = make_table()
+
+    assert table.classify("https://wiadomosci.onet.pl/").name == "listing"
+    assert table.classify("https://wiadomosci.onet.pl/kraj").name == "listing"
+    assert table.classify("https://wiadomosci.onet.pl/kraj?page=2").name == "listing"
+    assert table.classify("https://wiadomosci.onet.pl/kraj/nowa-ustawa/abc123").name == "article"
+    assert table.classify("https://www.onet.pl/informacje").name == "other"
+
+
+def test_only_direct_routes_skip_tor():
+    table = make_table()
+
+    assert table.classify("https://wiadomosci.onet.pl/swiat").via_direct
+    assert not table.classify("https://wiadomosci.onet.pl/swiat/tytul/xyz789").via_direct
+    assert not table.fallback.via_direct
+
+
+def test_route_demoted_after_block_signals():
+    table = make_table(demote_after=2)
+    listing = table.classify("https://wiadomosci.onet.pl/kraj")
+
+    assert table.on_block(listing) is False
+    assert listing.via_direct
+    assert table.on_block(listing) is True
+    assert not listing.via_direct
+    assert table.on_block(listing) is False  # already demoted
+
+
+def test_demotion_is_permanent_across_runs(tmp_path):
+    state_file = str(tmp_path / "routes.json")
+    table = make_table(state_file=state_file)
+    table.on_block(table.classify("https://wiadomosci.onet.pl/kraj"))
+
+    restored = make_table(state_file=state_file)
+
+    assert not restored.classify("https://wiadomosci.onet.pl/kraj").via_direct
+    assert restored.classify("https://wiadomosci.onet.pl/kraj").demoted
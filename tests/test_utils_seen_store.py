@@ -0,0 +1,30 @@
+from onet_scraper.utils.seen_store import SeenStore, article_keys
+
+
+def test_article_keys_canonical_url_and_ids():
+    keys = article_keys("https://Wiadomosci.onet.pl/kraj/tytul/abc123/?utm_source=x#komentarze", "story9")
+
+    assert keys == ["url:wiadomosci.onet.pl/kraj/tytul/abc123", "id:story9", "id:abc123"]
+    assert article_keys("http://wiadomosci.onet.pl/kraj/tytul/abc123")[0] == keys[0]
+
+
+def test_seen_entries_expire_after_ttl():
+    store = SeenStore(":memory:", ttl=100)
+    store.add(["url:a", "id:1"], now=1000)
+
+    assert store.contains_any(["id:1"], now=1050)
+    assert not store.contains_any(["id:2"], now=1050)
+    assert not store.contains_any(["url:a"], now=1101)
+    assert store.purge(now=1101) == 2
+    assert len(store) == 0
+
+
+def test_store_persists_across_runs(tmp_path):
+    path = str(tmp_path / "state" / "seen.sqlite3")
+    first = SeenStore(path, ttl=3600)
+    first.add(article_keys("https://wiadomosci.onet.pl/kraj/tytul/abc123"))
+    first.close()
+
+    second = SeenStore(path, ttl=3600)
+    assert second.contains_any(article_keys("https://wiadomosci.onet.pl/kraj/tytul/abc123?utm=1"))
+    second.close()
@@ -0,0 +1,153 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from curl_cffi.const import CurlInfo
+
+from onet_scraper.utils.session_pool import AsyncSessionPool, SessionPool
+
+
+def make_pool(**kwargs):
+    factory = MagicMock(side_effect=lambda **kw: MagicMock())
+    return SessionPool(proxy="socks5://127.0.0.1:9050", session_factory=factory, **kwargs), factory
+
+
+def fake_response(num_connects):
+    response = MagicMock()
+    response.infos = {CurlInfo.NUM_CONNECTS: num_connects}
+    return response
+
+
+def test_session_is_reused_for_same_key():
+    pool, factory = make_pool()
+
+    session = pool.acquire("chrome120", 0)
+    pool.release("chrome120", 0, session, fake_response(1))
+    again = pool.acquire("chrome120", 0)
+
+    assert again is session
+    assert factory.call_count == 1
+
+
+def test_different_profile_or_circuit_gets_new_session():
+    pool, factory = make_pool()
+
+    session = pool.acquire("chrome120", 0)
+    pool.release("chrome120", 0, session)
+
+    assert pool.acquire("safari17_0", 0) is not session
+    assert pool.acquire("chrome120", 1) is not session
+    assert factory.call_count == 3
+
+
+def test_reuse_ratio_counts_reused_connections():
+    pool, _ = make_pool()
+
+    session = pool.acquire("chrome120", 0)
+    pool.release("chrome120", 0, session, fake_response(1))
+    session = pool.acquire("chrome120", 0)
+    pool.release("chrome120", 0, session, fake_response(0))
+
+    assert pool.requests == 2
+    assert pool.connections_reused == 1
+    assert pool.reuse_ratio == 0.5
+
+
+def test_idle_sessions_are_evicted():
+    pool, _ = make_pool(max_idle=10.0)
+
+    session = pool.acquire("chrome120", 0)
+    pool.release("chrome120", 0, session)
+    pool.evict_idle(now=10**9)
+
+    session.close.assert_called_once()
+    assert pool.sessions_evicted == 1
+
+
+def test_close_circuit_tears_down_only_that_circuit():
+    pool, _ = make_pool()
+
+    old = pool.acquire("chrome120", 0)
+    new = pool.acquire("chrome120", 1)
+    pool.release("chrome120", 0, old)
+    pool.release("chrome120", 1, new)
+
+    pool.close_circuit(0)
+
+    old.close.assert_called_once()
+    new.close.assert_not_called()
+    assert pool.acquire("chrome120", 1) is new
+
+
+def test_discard_closes_session():
+    pool, _ = make_pool()
+
+    session = pool.acquire("chrome120", 0)
+    pool.discard(session)
+
+    session.close.assert_called_once()
+    assert pool.acquire("chrome120", 0) is not session
+
+
+@pytest.mark.asyncio
+async def test_async_pool_shares_session_and_closes_circuit():
+    factory = MagicMock(side_effect=lambda **kw: MagicMock(close=AsyncMock()))
+    pool = AsyncSessionPool(proxy="socks5://127.0.0.1:9050", session_factory=factory)
+
+    session = pool.get("chrome120", 0)
+    assert pool.get("chrome120", 0) is session
+    other = pool.get("chrome120", 1)
+    for circuit in (0, 0, 1):
+        pool.release("chrome120", circuit)
+
+    await pool.close_circuit(0)
+
+    session.close.assert_awaited_once()
+    other.close.assert_not_awaited()
+    assert pool.get("chrome120", 0) is not session
+
+
+@pytest.mark.asyncio
+async def test_async_pool_defers_closing_a_retired_circuit_until_transfers_finish():
+    factory = MagicMock(side_effect=lambda **kw: MagicMock(close=AsyncMock()))
+    pool = AsyncSessionPool(proxy="socks5://127.0.0.1:9050", session_factory=factory)
+    session = pool.get("chrome120", 0)
+
+    await pool.close_circuit(0)
+    await pool.evict_idle()
+
+    session.close.assert_not_awaited()
+    assert pool.get("chrome120", 1) is not session
+
+    pool.release("chrome120", 0)
+    await pool.evict_idle()
+
+    session.close.assert_awaited_once()
+    assert pool.sessions_evicted == 0
+
+
+def test_empty_proxy_means_direct_connection():
+    pool, factory = make_pool()
+
+    pool.acquire("chrome120", ("direct", 0), proxy="")
+    pool.acquire("chrome120", ("lane0", 0))
+
+    assert factory.call_args_list[0].kwargs["proxies"] is None
+    assert factory.call_args_list[1].kwargs["proxies"]["https"] == "socks5://127.0.0.1:9050"
+
+
+@pytest.mark.asyncio
+async def test_async_pool_evicts_only_idle_sessions_without_transfers():
+    factory = MagicMock(side_effect=lambda **kw: MagicMock(close=AsyncMock()))
+    pool = AsyncSessionPool(proxy="socks5://127.0.0.1:9050", max_idle=10.0, session_factory=factory)
+
+    busy = pool.get("chrome120", 0)
+    idle = pool.get("chrome120", 1)
+    pool.release("chrome120", 1, fake_response(1))
+
+    await pool.evict_idle(now=10**9)
+
+    busy.close.assert_not_awaited()
+    idle.close.assert_awaited_once()
+    assert pool.sessions_evicted == 1
+    assert pool.requests == 1
+    assert pool.get("chrome120", 0) is busy
@@ -0,0 +1,73 @@
+from scrapy.settings import Settings
+
+from onet_scraper.utils.throttle import AimdThrottle
+
+
+def test_additive_increase_after_healthy_window():
+    throttle = AimdThrottle(start_delay=2.0, min_delay=0.5, delay_step=0.25, window=3, target_latency=5.0)
+
+    for _ in range(3):
+        state = throttle.on_success("lane0", latency=1.0)
+
+    assert state.concurrency == 2
+    assert state.delay == 1.75
+    assert state.increases == 1
+
+
+def test_increase_is_bounded():
+    throttle = AimdThrottle(start_delay=0.5, min_delay=0.5, max_concurrency=2, window=1)
+
+    for _ in range(10):
+        state = throttle.on_success("lane0", latency=1.0)
+
+    assert state.concurrency == 2
+    assert state.delay == 0.5
+
+
+def test_multiplicative_decrease_on_ban():
+    throttle = AimdThrottle(start_delay=2.0, start_concurrency=4, max_delay=30.0, backoff_factor=2.0)
+
+    state = throttle.on_ban("lane0")
+    assert (state.concurrency, state.delay) == (2, 4.0)
+
+    state = throttle.on_ban("lane0")
+    assert (state.concurrency, state.delay) == (1, 8.0)
+
+    for _ in range(5):
+        state = throttle.on_ban("lane0")
+    assert (state.concurrency, state.delay) == (1, 30.0)
+
+
+def test_high_latency_blocks_increase():
+    throttle = AimdThrottle(window=2, target_latency=5.0)
+
+    for _ in range(10):
+        state = throttle.on_success("lane0", latency=12.0)
+
+    assert state.increases == 0
+    assert state.concurrency == 1
+
+
+def test_state_is_tracked_per_lane():
+    throttle = AimdThrottle(start_delay=2.0)
+
+    throttle.on_ban("lane0")
+
+    assert throttle.state("lane0").delay == 4.0
+    assert throttle.state("lane1").delay == 2.0
+
+
+def test_from_settings_starts_from_lane_budget():
+    throttle = AimdThrottle.from_settings(Settings({"TOR_LANE_DELAY": 3.0, "TOR_LANE_CONCURRENCY": 2}))
+
+    state = throttle.state("lane0")
+    assert (state.delay, state.concurrency) == (3.0, 2)
+
+
+def test_seeded_key_starts_from_its_own_budget():
+    throttle = AimdThrottle(start_delay=2.0, start_concurrency=1, window=1)
+    throttle.seed("direct", 1.0, 2)
+
+    state = throttle.on_success("direct", latency=0.1)
+
+    assert (state.delay, state.concurrency) == (0.75, 3)
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import stat
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from onet_scraper.utils.tor_bootstrap import TorBootstrap, TorUnavailable
+
+
+def make_controller(established=True):
+    controller = MagicMock()
+    controller.wait_until_established = AsyncMock(return_value=established)
+    return controller
+
+
+async def start_server():
+    server = await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def free_port():
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_attaches_to_running_tor():
+    server, port = await start_server()
+    controller = make_controller()
+    bootstrap = TorBootstrap("127.0.0.1", port, controller)
+
+    async with server:
+        await asyncio.gather(bootstrap.ensure_ready(), bootstrap.ensure_ready())
+
+    assert not bootstrap.launched
+    assert bootstrap.seconds is not None
+    controller.wait_until_established.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_attached_tor_without_control_port_is_used():
+    server, port = await start_server()
+    controller = make_controller()
+    controller.wait_until_established.side_effect = ConnectionRefusedError("no control port")
+    bootstrap = TorBootstrap("127.0.0.1", port, controller)
+
+    async with server:
+        await bootstrap.ensure_ready()
+
+    assert bootstrap.seconds is not None
+
+
+@pytest.mark.asyncio
+async def test_launches_tor_and_waits_for_control_listener(tmp_path):
+    fake_tor = tmp_path / "tor"
+    fake_tor.write_text('#!/bin/sh\necho "[notice] Opened Control listener on 127.0.0.1:9051"\nexec sleep 30\n')
+    fake_tor.chmod(fake_tor.stat().st_mode | stat.S_IEXEC)
+    controller = make_controller()
+    bootstrap = TorBootstrap("127.0.0.1", free_port(), controller, binary=str(fake_tor), timeout=5.0)
+
+    await bootstrap.ensure_ready()
+    assert bootstrap.launched
+    controller.wait_until_established.assert_awaited_once_with(5.0)
+
+    process = bootstrap.process
+    await bootstrap.close()
+    assert process is not None and process.returncode is not None
+
+
+@pytest.mark.asyncio
+async def test_missing_binary_fails_fast(tmp_path):
+    bootstrap = TorBootstrap("127.0.0.1", free_port(), make_controller(), binary=os.fspath(tmp_path / "missing"))
+
+    with pytest.raises(TorUnavailable):
+        await bootstrap.ensure_ready()
+
+
+@pytest.mark.asyncio
+async def test_no_circuit_within_timeout():
+    server, port = await start_server()
+    bootstrap = TorBootstrap("127.0.0.1", port, make_controller(established=False), timeout=1.0)
+
+    async with server:
+        with pytest.raises(TorUnavailable, match="did not establish a circuit"):
+            await bootstrap.ensure_ready()
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from onet_scraper.utils.tor_control import TorController
+
+
+@pytest.fixture
+def stem_controller():
+    controller = MagicMock()
+    controller.is_alive.return_value = True
+    controller.get_newnym_wait.return_value = 0.0
+    with patch("onet_scraper.utils.tor_control.Controller.from_port", return_value=controller):
+        yield controller
+
+
+@pytest.mark.asyncio
+async def test_concurrent_renewals_share_one_newnym(stem_controller):
+    tor = TorController(circuit_timeout=0.0)
+
+    results = await asyncio.gather(*(tor.renew() for _ in range(5)))
+
+    assert results == [True] * 5
+    stem_controller.signal.assert_called_once()
+    assert tor.renewals_requested == 5
+    assert tor.renewals_coalesced == 4
+
+
+@pytest.mark.asyncio
+async def test_control_connection_is_reused(stem_controller):
+    tor = TorController(circuit_timeout=0.0)
+
+    await tor.renew()
+    await tor.renew()
+
+    assert stem_controller.signal.call_count == 2
+    stem_controller.authenticate.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_renewal_respects_newnym_cooldown(stem_controller):
+    stem_controller.get_newnym_wait.return_value = 0.05
+    tor = TorController(circuit_timeout=0.0)
+
+    start = time.monotonic()
+    await tor.renew()
+
+    assert time.monotonic() - start >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_renewal_waits_for_new_circuit(stem_controller):
+    tor = TorController(circuit_timeout=2.0)
+
+    def build_circuit(signal):
+        tor._on_circuit_event(MagicMock(status="BUILT"))
+
+    stem_controller.signal.side_effect = build_circuit
+    start = time.monotonic()
+    assert await tor.renew() is True
+    assert time.monotonic() - start < 1.0
+
+
+@pytest.mark.asyncio
+async def test_failed_renewal_drops_connection(stem_controller):
+    stem_controller.signal.side_effect = RuntimeError("control port gone")
+    tor = TorController(circuit_timeout=0.0)
+
+    assert await tor.renew() is False
+    assert tor.renewals_failed == 1
+    stem_controller.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_wait_until_established_follows_bootstrap_events(stem_controller):
+    stem_controller.get_info.return_value = "0"
+    tor = TorController()
+    events = [
+        MagicMock(action="BOOTSTRAP", arguments={"PROGRESS": "50", "SUMMARY": "Loading relay descriptors"}),
+        MagicMock(action="BOOTSTRAP", arguments={"PROGRESS": "100", "SUMMARY": "Done"}),
+    ]
+
+    def fire_events(listener, *event_types):
+        for event in events:
+            threading.Thread(target=listener, args=(event,)).start()
+
+    stem_controller.add_event_listener.side_effect = fire_events
+
+    assert await tor.wait_until_established(timeout=1.0) is True
+    assert tor.bootstrap_progress == 100
+    stem_controller.remove_event_listener.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_wait_until_established_when_circuit_already_up(stem_controller):
+    stem_controller.get_info.return_value = "1"
+    tor = TorController()
+
+    assert await tor.wait_until_established(timeout=0.1) is True
+
+
+@pytest.mark.asyncio
+async def test_wait_until_established_times_out(stem_controller):
+    stem_controller.get_info.return_value = "0"
+    tor = TorController()
+
+    assert await tor.wait_until_established(timeout=0.05) is False
@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+from scrapy.settings import Settings
+
+from onet_scraper.utils.tor_lanes import LanePool, TorLane
+
+
+def make_pool(count, delay=0.0, **kwargs):
+    lanes = [TorLane(name=f"lane{i}", proxy="socks5h://127.0.0.1:9050", isolation=True, delay=delay) for i in range(count)]
+    return LanePool(lanes, randomize_delay=False, **kwargs)
+
+
+def test_isolated_lane_uses_unique_credentials():
+    lane = TorLane(name="lane3", proxy="socks5h://127.0.0.1:9050", isolation=True)
+    assert lane.proxy_url == "socks5h://lane3-0:x@127.0.0.1:9050"
+
+    lane.generation += 1
+    assert lane.proxy_url == "socks5h://lane3-1:x@127.0.0.1:9050"
+
+
+def test_from_settings_builds_isolated_lanes():
+    settings = Settings({"TOR_LANE_ISOLATION": True, "TOR_LANE_COUNT": 4, "TOR_LANE_DELAY": 1.5})
+    pool = LanePool.from_settings(settings, tor_proxy="socks5h://tor:9050", control_port=9051)
+
+    assert [lane.name for lane in pool.lanes] == ["lane0", "lane1", "lane2", "lane3"]
+    assert all(lane.delay == 1.5 for lane in pool.lanes)
+    assert len({lane.proxy_url for lane in pool.lanes}) == 4
+
+
+def test_from_settings_explicit_lanes():
+    settings = Settings({"TOR_LANES": [{"proxy": "socks5h://tor-a:9050", "control_port": 9051}, "socks5h://tor-b:9050"]})
+    pool = LanePool.from_settings(settings, tor_proxy="unused", control_port=0)
+
+    assert [lane.proxy for lane in pool.lanes] == ["socks5h://tor-a:9050", "socks5h://tor-b:9050"]
+    assert pool.lanes[0].control_port == 9051
+
+
+@pytest.mark.asyncio
+async def test_requests_spread_across_lanes_without_waiting():
+    pool = make_pool(4, delay=10.0)
+
+    start = time.monotonic()
+    lanes = await asyncio.gather(*(pool.acquire() for _ in range(4)))
+
+    assert time.monotonic() - start < 1.0
+    assert {lane.name for lane in lanes} == {"lane0", "lane1", "lane2", "lane3"}
+
+
+@pytest.mark.asyncio
+async def test_lane_delay_is_enforced_per_lane():
+    pool = make_pool(1, delay=0.05)
+
+    lane = await pool.acquire()
+    pool.release(lane)
+    start = time.monotonic()
+    await pool.acquire()
+
+    assert time.monotonic() - start >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_rotate_only_touches_banned_lane():
+    pool = make_pool(2, ban_cooldown=0.0)
+    banned, healthy = pool.lanes
+
+    old_circuit = pool.rotate(banned)
+
+    assert old_circuit == ("lane0", 0)
+    assert banned.circuit == ("lane0", 1)
+    assert healthy.circuit == ("lane1", 0)
+
+
+@pytest.mark.asyncio
+async def test_acquire_prefers_non_excluded_lane():
+    pool = make_pool(2)
+
+    lane = await pool.acquire(exclude={"lane0"})
+
+    assert lane.name == "lane1"
+
+
+def test_try_acquire_never_waits_or_falls_back_to_excluded_lanes():
+    pool = make_pool(2)
+    busy = pool.lanes[1]
+    busy.in_flight = busy.max_in_flight
+
+    assert pool.try_acquire(exclude={"lane0"}) is None
+    lane = pool.try_acquire()
+    assert lane is not None and lane.name == "lane0"
+    assert lane.in_flight == 1
+
+
+def test_proactive_rotate_skips_cooldown():
+    pool = make_pool(1, ban_cooldown=60.0)
+    lane = pool.default
+
+    pool.rotate(lane, cooldown=False)
+
+    assert lane.next_slot < time.monotonic() + 60.0
+    assert lane.proxy_url == lane.proxy_url_for(1)